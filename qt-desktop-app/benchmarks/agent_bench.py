@@ -0,0 +1,68 @@
+"""工位代理请求开销基准测试
+
+在临时目录启动工位代理, 通过本地模拟串口服务器 (tcp_loopback_bench.StandInServer) 打开一个串口,
+测量:
+    1. ping 往返 (纯套接字 + 编解码开销)
+    2. request 事务往返 (经代理下发 0x21 并等待应答)
+    3. 同一串口上直接用 TcpTransport 的往返 (基线)
+
+用法:
+    python benchmarks/agent_bench.py [--count 2000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from tcp_loopback_bench import SRC_DIR, STATUS_QUERY, StandInServer, bench_transport, summarize  # noqa: E402
+
+sys.path.insert(0, SRC_DIR)
+
+from core.agent_client import AgentClient  # noqa: E402
+from controllers.agent_server import AgentServer  # noqa: E402
+from core.codec import to_hex  # noqa: E402
+
+
+def bench_calls(client, count, op, **params):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.call(op, **params)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="工位代理请求开销基准测试")
+    parser.add_argument("--count", type=int, default=2000, help="每项往返次数")
+    args = parser.parse_args()
+
+    stand_in = StandInServer()
+    path = os.path.join(tempfile.mkdtemp(), "agent.sock")
+    server = AgentServer(path)
+    server.start()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = AgentClient(path)
+    try:
+        client.call('open', port=stand_in.url, baud=9600)
+        print(f"{'路径':<20}{'中位(us)':>10}{'P99(us)':>10}{'最大(us)':>10}")
+        ping = summarize("ping", bench_calls(client, args.count, 'ping'))
+        request = summarize("request (0x21)", bench_calls(
+            client, args.count, 'request', port=stand_in.url, data=to_hex(STATUS_QUERY)))
+        direct = summarize("TcpTransport 直连", bench_transport(stand_in, args.count))
+        print(f"每个请求的代理开销: {ping * 1e6:.1f} us, 事务相对直连额外开销: {(request - direct) * 1e6:.1f} us")
+    finally:
+        client.close()
+        server.stop()
+        stand_in.close()
+        time.sleep(0.2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""启动耗时基准测试
+
+测量各界面模块的冷导入耗时, 以及从启动进程到主窗口首帧绘制的时间。
+每次测量都在新的解释器进程中进行, 结果取中位数。
+
+用法:
+    python benchmarks/startup_benchmark.py [--runs 5] [--offscreen]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+MODULES = [
+    "core.codec",
+    "core.transactions",
+    "core.telemetry",
+    "views.main_window",
+    "views.control_panel",
+    "views.motor_panel",
+    "views.net_panel",
+    "views.station_panel",
+]
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def measure_import(module, runs, env):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+            cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def measure_first_paint(runs, env):
+    samples = []
+    env = dict(env, APP_STARTUP_BENCH="1")
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "main.py"], cwd=SRC_DIR, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        for line in process.stdout:
+            if line.strip() == "FIRST_PAINT":
+                samples.append(time.perf_counter() - start)
+                break
+        process.wait(timeout=30)
+    return statistics.median(samples) if samples else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时基准测试")
+    parser.add_argument("--runs", type=int, default=5, help="每项测量次数")
+    parser.add_argument("--offscreen", action="store_true", help="使用 Qt offscreen 平台 (无显示环境)")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+
+    print(f"{'模块':<24}{'冷导入(ms)':>12}")
+    for module in MODULES:
+        try:
+            elapsed = measure_import(module, args.runs, env)
+            print(f"{module:<24}{elapsed * 1000:>12.1f}")
+        except subprocess.CalledProcessError as e:
+            print(f"{module:<24}{'失败':>12}  {e.stderr.strip().splitlines()[-1] if e.stderr else ''}")
+
+    first_paint = measure_first_paint(args.runs, env)
+    if first_paint is None:
+        print("首帧绘制: 未测到 (请检查 PyQt6 与显示环境)")
+    else:
+        print(f"进程启动到首帧绘制: {first_paint * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
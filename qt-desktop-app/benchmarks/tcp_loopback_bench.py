@@ -0,0 +1,154 @@
+"""网络串口回环基准测试
+
+在本机启动一个模拟串口服务器 (收到 0x21 状态查询回复状态帧, 其余帧原样回显),
+分别测量:
+    1. 原始阻塞套接字的请求-应答往返时间 (基线)
+    2. TcpTransport 直接读写的往返时间
+    3. 经过串口注册表 (发送调度 + 读线程 + 时间戳分发) 的完整路径往返时间
+差值即为传输层和共享串口路径引入的额外开销。
+
+用法:
+    python benchmarks/tcp_loopback_bench.py [--count 2000]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+from core.codec import CMD_STATUS, FrameParser, build_frame  # noqa: E402
+from core.transport import TcpTransport  # noqa: E402
+
+STATUS_REPLY = build_frame(CMD_STATUS, bytes([0x0B, 0x05, 0xDC, 0x01, 0x36, 0x28, 0x00, 0x64]))
+STATUS_QUERY = build_frame(CMD_STATUS)
+
+
+class StandInServer:
+    """模拟网络串口服务器, 每个连接一个线程"""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.listener = socket.create_server((host, port))
+        self.address = self.listener.getsockname()
+        self.running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"tcp://{self.address[0]}:{self.address[1]}"
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        parser = FrameParser()
+        with conn:
+            while self.running:
+                try:
+                    data = conn.recv(4096)
+                except OSError:
+                    return
+                if not data:
+                    return
+                for frame in parser.feed(data):
+                    conn.sendall(STATUS_REPLY if frame[2] == CMD_STATUS else bytes(frame))
+
+    def close(self):
+        self.running = False
+        self.listener.close()
+
+
+def summarize(name, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    median = statistics.median(samples)
+    print(f"{name:<20}{median * 1e6:>10.1f}{p99 * 1e6:>10.1f}{samples[-1] * 1e6:>10.1f}")
+    return median
+
+
+def bench_raw_socket(server, count):
+    sock = socket.create_connection(server.address)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        sock.sendall(STATUS_QUERY)
+        received = 0
+        while received < len(STATUS_REPLY):
+            received += len(sock.recv(4096))
+        samples.append(time.perf_counter() - start)
+    sock.close()
+    return samples
+
+
+def bench_transport(server, count):
+    transport = TcpTransport(server.url, timeout=1.0)
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        transport.write(STATUS_QUERY)
+        received = 0
+        while received < len(STATUS_REPLY):
+            received += len(transport.read(len(STATUS_REPLY) - received))
+        samples.append(time.perf_counter() - start)
+    transport.close()
+    return samples
+
+
+def bench_shared_port(server, count):
+    from controllers.port_registry import get_port_registry
+
+    parser = FrameParser()
+    reply = threading.Event()
+
+    def on_data(chunk):
+        if parser.feed(chunk):
+            reply.set()
+
+    lease = get_port_registry().acquire(server.url, 9600, "bench", on_data=on_data)
+    samples = []
+    try:
+        for _ in range(count):
+            reply.clear()
+            start = time.perf_counter()
+            lease.send(STATUS_QUERY)
+            if not reply.wait(1.0):
+                print("等待应答超时")
+                break
+            samples.append(time.perf_counter() - start)
+    finally:
+        lease.release()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="网络串口回环基准测试")
+    parser.add_argument("--count", type=int, default=2000, help="每项往返次数")
+    args = parser.parse_args()
+
+    server = StandInServer()
+    print(f"模拟服务器: {server.url}")
+    print(f"{'路径':<20}{'中位(us)':>10}{'P99(us)':>10}{'最大(us)':>10}")
+    try:
+        baseline = summarize("原始套接字", bench_raw_socket(server, args.count))
+        transport = summarize("TcpTransport", bench_transport(server, args.count))
+        shared = summarize("串口注册表完整路径", bench_shared_port(server, args.count))
+    finally:
+        server.close()
+    print(f"传输层额外开销: {(transport - baseline) * 1e6:.1f} us, "
+          f"完整路径额外开销: {(shared - baseline) * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""工位代理入口 (无界面)
+
+持有串口并通过本地 Unix 套接字提供请求/数据流接口, 供测试脚本、MES 对接程序和界面共同使用。
+
+用法:
+    python agent.py [--socket PATH] [--open /dev/ttyUSB0,9600[,simulator]] ...
+"""
+
+import argparse
+import signal
+
+from controllers.agent_server import AgentServer, AgentError, ROLE_TESTER
+from core.alarms import get_alarm_engine
+from core.archive import get_telemetry_archive
+from core.telemetry import get_telemetry_store
+
+
+def parse_open_spec(spec):
+    """解析 端口[,波特率[,角色]] (网络串口地址本身带冒号, 所以用逗号分隔)"""
+    parts = [part.strip() for part in spec.split(',')]
+    port = parts[0]
+    baud_rate = int(parts[1]) if len(parts) > 1 and parts[1] else 9600
+    role = parts[2] if len(parts) > 2 and parts[2] else ROLE_TESTER
+    return port, baud_rate, role
+
+
+def main():
+    parser = argparse.ArgumentParser(description="工位代理")
+    parser.add_argument("--socket", help="Unix 套接字路径 (默认 ~/.qt_desktop_app/agent.sock)")
+    parser.add_argument("--no-archive", action="store_true", help="不归档遥测数据")
+    parser.add_argument("--open", action="append", default=[], metavar="PORT[,BAUD[,ROLE]]",
+                        help="启动时打开的串口, 角色为 tester (默认) 或 simulator, 可重复")
+    args = parser.parse_args()
+
+    server = AgentServer(args.socket)
+    try:
+        server.start()
+    except AgentError as e:
+        print(e)
+        return 1
+
+    # 每个状态样本都经过报警规则评估 (规则见 ~/.qt_desktop_app/alarms.json)
+    get_telemetry_store().add_listener(get_alarm_engine().evaluate)
+
+    archive = None
+    if not args.no_archive:
+        archive = get_telemetry_archive()
+        archive.attach(get_telemetry_store())
+
+    for spec in args.open:
+        port, baud_rate, role = parse_open_spec(spec)
+        try:
+            server.open_port(port, baud_rate, role)
+        except Exception as e:
+            print(f"打开串口失败 {port}: {e}")
+
+    signal.signal(signal.SIGTERM, lambda *_: server.stop())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if archive is not None:
+            archive.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
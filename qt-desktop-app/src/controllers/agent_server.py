@@ -0,0 +1,480 @@
+"""工位代理服务
+
+无界面进程持有串口 (通过串口注册表), 在本地 Unix 套接字上提供多路复用的请求/数据流接口。
+多个客户端 (测试脚本、MES 对接程序、界面) 可以同时下发命令和订阅遥测数据,
+客户端断开不会关闭串口。
+
+请求 (op):
+    ping                                    连通性测试
+    list                                    已打开串口
+    open        port, baud=9600, role       打开串口 (已打开时直接返回); role 为 tester 或 simulator
+    close       port                        关闭串口
+    send        port, data, priority        发送一帧, 不等待应答
+    request     port, data, timeout         发送一帧并等待应答 (经事务引擎串行化, reply_cmd 默认同 CMD)
+    status      port                        最近一次解析的 0x21 状态
+    stats       port                        发送队列、链路与事务统计
+    subscribe   port ('*' 表示全部), streams (rx/tx/status/link/alarm)
+    unsubscribe port, streams
+"""
+
+import os
+import selectors
+import socket
+import threading
+
+from core.agent_protocol import (pack, MessageDecoder, socket_path, STREAMS,
+                                 STREAM_RX, STREAM_TX, STREAM_STATUS, STREAM_LINK, STREAM_ALARM)
+from core.alarms import get_alarm_engine
+from core.clock import StampedFrame
+from controllers.port_registry import get_port_registry, PortLeaseError, EVENT_CONNECTED
+from core.codec import CMD_STOP, FrameParser, build_frame, parse_hex, to_hex
+from core.simulators import simulator_reply
+from core.telemetry import get_telemetry_store
+from core.transactions import TransactionEngine
+from controllers.write_scheduler import PRIORITY_REPLY, PRIORITY_USER
+
+ROLE_TESTER = 'tester'        # 测试电机板: 解析状态应答
+ROLE_SIMULATOR = 'simulator'  # 测试控制板: 模拟电机板自动应答
+
+# 单个客户端待发送数据超过此值时丢弃数据流消息 (应答不丢)
+CLIENT_BACKLOG_LIMIT = 4 * 1024 * 1024
+RECV_SIZE = 65536
+
+
+class AgentError(Exception):
+    """请求参数错误或执行失败, 以错误应答返回给客户端"""
+
+
+class AgentPort:
+    """代理持有的一个串口: 租约 + 分帧 + 事务引擎, 状态样本写入遥测存储"""
+
+    def __init__(self, server, port_name, baud_rate, role):
+        self.server = server
+        self.port_name = port_name
+        self.baud_rate = baud_rate
+        self.role = role
+        self.parser = FrameParser()
+        self.telemetry = get_telemetry_store()
+        self.lease = get_port_registry().acquire(
+            port_name, baud_rate, f"agent:{role}",
+            on_data=self._on_data, on_sent=self._on_sent, on_event=self._on_event)
+        self.transactions = TransactionEngine(self.lease.send)
+        if role == ROLE_TESTER:
+            get_alarm_engine().register_stop(port_name, self.stop_motor)
+
+    def stop_motor(self):
+        """报警 stop 动作: 经事务引擎发送 0x80"""
+        self.transactions.submit(build_frame(CMD_STOP))
+
+    def close(self):
+        get_alarm_engine().unregister_stop(self.port_name, self.stop_motor)
+        self.transactions.cancel_all("串口已关闭")
+        self.lease.release()
+
+    def _on_data(self, chunk):
+        """读线程回调"""
+        self.server.publish(self.port_name, STREAM_RX,
+                            {'ts_ns': chunk.ts_ns, 'data': to_hex(chunk)})
+        for frame in self.parser.feed(chunk):
+            frame = StampedFrame(frame, chunk.ts_ns)
+            self.transactions.feed(frame)
+            if self.role == ROLE_SIMULATOR:
+                reply = simulator_reply(frame)
+                if reply:
+                    self.lease.send(reply, PRIORITY_REPLY)
+                continue
+            sample = self.telemetry.record_frame(self.port_name, frame)
+            if sample is not None:
+                self.server.publish(self.port_name, STREAM_STATUS, sample)
+
+    def _on_sent(self, frame):
+        self.server.publish(self.port_name, STREAM_TX,
+                            {'ts_ns': frame.ts_ns, 'data': to_hex(frame)})
+
+    def _on_event(self, event):
+        self.parser.reset()
+        if event != EVENT_CONNECTED:
+            self.transactions.cancel_all("串口连接断开")
+        self.server.publish(self.port_name, STREAM_LINK, {'event': event})
+
+    def info(self):
+        return {
+            'port': self.port_name,
+            'baud': self.baud_rate,
+            'role': self.role,
+            'connected': self.lease.is_connected,
+        }
+
+
+class _Client:
+    """一个已连接的客户端"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.decoder = MessageDecoder()
+        self.out = bytearray()
+        self.subscriptions = set()   # (port, stream), port 可为 '*'
+        self.dropped = 0
+
+    def wants(self, port, stream):
+        return (port, stream) in self.subscriptions or ('*', stream) in self.subscriptions
+
+
+class AgentServer:
+    """单线程 selectors 事件循环; 串口线程产生的消息通过唤醒套接字交给事件循环发送"""
+
+    def __init__(self, path=None):
+        self.path = path or socket_path()
+        self.ports = {}
+        self.clients = {}
+        self.running = False
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()          # 保护 clients 的发送缓冲区与订阅
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._listener = None
+        self._open_lock = threading.Lock()     # 串行化 open_port (打开串口在工作线程中进行)
+        self._handlers = {
+            'ping': self._op_ping,
+            'list': self._op_list,
+            'open': self._op_open,
+            'close': self._op_close,
+            'send': self._op_send,
+            'request': self._op_request,
+            'status': self._op_status,
+            'stats': self._op_stats,
+            'subscribe': self._op_subscribe,
+            'unsubscribe': self._op_unsubscribe,
+        }
+        get_alarm_engine().add_listener(self._on_alarm)
+
+    def _on_alarm(self, event):
+        """报警 ui 动作: 推送给订阅了 alarm 数据流的客户端"""
+        self.publish(event['source'], STREAM_ALARM, event)
+
+    # ===== 生命周期 =====
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if os.path.exists(self.path):
+            # 上次异常退出遗留的套接字文件; 若仍有代理在监听则拒绝启动
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                os.unlink(self.path)
+            else:
+                probe.close()
+                raise AgentError(f"代理已在运行: {self.path}")
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.path)
+        self._listener.listen(16)
+        self._listener.setblocking(False)
+        self._selector.register(self._listener, selectors.EVENT_READ, 'accept')
+        self._selector.register(self._wake_r, selectors.EVENT_READ, 'wake')
+        self.running = True
+        print(f"工位代理已启动: {self.path}")
+
+    def serve_forever(self):
+        if not self.running:
+            self.start()
+        try:
+            while self.running:
+                for key, events in self._selector.select(timeout=1.0):
+                    if key.data == 'accept':
+                        self._accept()
+                    elif key.data == 'wake':
+                        self._drain_wake()
+                    else:
+                        client = key.data
+                        if events & selectors.EVENT_READ:
+                            self._read_client(client)
+                        if events & selectors.EVENT_WRITE and client.sock.fileno() >= 0:
+                            self._flush_client(client)
+        finally:
+            self._shutdown()
+
+    def stop(self):
+        """可从任意线程调用"""
+        self.running = False
+        self._wake()
+
+    def _shutdown(self):
+        get_alarm_engine().remove_listener(self._on_alarm)
+        for client in list(self.clients.values()):
+            self._drop_client(client)
+        with self._open_lock:
+            ports = list(self.ports.values())
+            self.ports.clear()
+        for port in ports:
+            port.close()
+        self._selector.close()
+        if self._listener:
+            self._listener.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+        print("工位代理已停止")
+
+    # ===== 连接与收发 =====
+
+    def _accept(self):
+        try:
+            sock, _ = self._listener.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        client = _Client(sock)
+        with self._lock:
+            self.clients[sock.fileno()] = client
+        self._selector.register(sock, selectors.EVENT_READ, client)
+
+    def _drop_client(self, client):
+        with self._lock:
+            self.clients.pop(client.sock.fileno(), None)
+        try:
+            self._selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+    def _read_client(self, client):
+        try:
+            data = client.sock.recv(RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._drop_client(client)
+            return
+        try:
+            messages = client.decoder.feed(data)
+        except ValueError as e:
+            print(f"代理客户端消息错误: {e}")
+            self._drop_client(client)
+            return
+        for message in messages:
+            self._dispatch(client, message)
+        self._flush_client(client)
+
+    def _dispatch(self, client, message):
+        if not isinstance(message, dict):
+            self._queue(client, {'id': None, 'ok': False, 'error': "消息必须为 JSON 对象"})
+            return
+        request_id = message.get('id')
+        handler = self._handlers.get(message.get('op'))
+        try:
+            if handler is None:
+                raise AgentError(f"未知操作: {message.get('op')}")
+            result = handler(client, message)
+        except (AgentError, PortLeaseError, ValueError, KeyError, OSError) as e:
+            self._queue(client, {'id': request_id, 'ok': False, 'error': str(e)})
+            return
+        except Exception as e:
+            # 单个请求的意外错误只影响该请求, 不能让事件循环退出
+            print(f"代理请求处理失败 ({message.get('op')}): {e!r}")
+            self._queue(client, {'id': request_id, 'ok': False, 'error': f"内部错误: {e!r}"})
+            return
+        if result is not _DEFERRED:
+            self._queue(client, {'id': request_id, 'ok': True, 'result': result})
+
+    def _queue(self, client, message, droppable=False):
+        """追加到客户端发送缓冲区 (任意线程)"""
+        data = pack(message)
+        with self._lock:
+            if droppable and len(client.out) > CLIENT_BACKLOG_LIMIT:
+                client.dropped += 1
+                return False
+            client.out += data
+        return True
+
+    def _flush_client(self, client):
+        with self._lock:
+            if not client.out:
+                return
+            try:
+                sent = client.sock.send(client.out)
+            except (BlockingIOError, InterruptedError):
+                sent = 0
+            except OSError:
+                sent = -1
+            if sent > 0:
+                del client.out[:sent]
+            pending = bool(client.out)
+        if sent < 0:
+            self._drop_client(client)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if pending else 0)
+        try:
+            self._selector.modify(client.sock, events, client)
+        except (KeyError, ValueError):
+            pass
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass
+
+    def _drain_wake(self):
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        with self._lock:
+            clients = [client for client in self.clients.values() if client.out]
+        for client in clients:
+            self._flush_client(client)
+
+    def publish(self, port, stream, payload):
+        """串口线程调用: 推送数据流消息给订阅者"""
+        with self._lock:
+            targets = [client for client in self.clients.values() if client.wants(port, stream)]
+        if not targets:
+            return
+        message = dict(payload, stream=stream, port=port)
+        for client in targets:
+            self._queue(client, message, droppable=True)
+        self._wake()
+
+    def _reply_later(self, client, request_id, message):
+        """在其他线程完成的请求 (事务应答)"""
+        message['id'] = request_id
+        self._queue(client, message)
+        self._wake()
+
+    # ===== 请求处理 =====
+
+    def _port(self, message):
+        port = self.ports.get(message.get('port'))
+        if port is None:
+            raise AgentError(f"串口未打开: {message.get('port')}")
+        return port
+
+    def _op_ping(self, client, message):
+        return {'pid': os.getpid()}
+
+    def _op_list(self, client, message):
+        return [port.info() for port in list(self.ports.values())]
+
+    def open_port(self, name, baud_rate=9600, role=ROLE_TESTER):
+        """打开串口 (已打开时直接返回), 返回串口信息"""
+        if role not in (ROLE_TESTER, ROLE_SIMULATOR):
+            raise AgentError(f"未知角色: {role}")
+        with self._open_lock:
+            port = self.ports.get(name)
+            if port is None:
+                port = AgentPort(self, name, baud_rate, role)
+                self.ports[name] = port
+            elif port.baud_rate != baud_rate:
+                raise AgentError(f"{name} 已以 {port.baud_rate} 波特率打开")
+            return port.info()
+
+    def _op_open(self, client, message):
+        """打开串口可能阻塞 (网络串口连接最长数秒), 在工作线程中完成后再应答"""
+        name = message.get('port')
+        baud_rate = message.get('baud', 9600)
+        role = message.get('role', ROLE_TESTER)
+        if not isinstance(name, str) or not name:
+            raise AgentError("port 必须为非空字符串")
+        if not isinstance(baud_rate, int) or isinstance(baud_rate, bool) or baud_rate <= 0:
+            raise AgentError(f"baud 必须为正整数: {baud_rate!r}")
+        if role not in (ROLE_TESTER, ROLE_SIMULATOR):
+            raise AgentError(f"未知角色: {role}")
+        request_id = message.get('id')
+
+        def run():
+            try:
+                info = self.open_port(name, baud_rate, role)
+            except Exception as e:
+                self._reply_later(client, request_id, {'ok': False, 'error': str(e)})
+                return
+            if not self.running:
+                # 打开期间代理已停止
+                with self._open_lock:
+                    port = self.ports.pop(name, None)
+                if port is not None:
+                    port.close()
+                self._reply_later(client, request_id, {'ok': False, 'error': "代理已停止"})
+                return
+            self._reply_later(client, request_id, {'ok': True, 'result': info})
+
+        threading.Thread(target=run, name=f"agent-open-{name}", daemon=True).start()
+        return _DEFERRED
+
+    def _op_close(self, client, message):
+        port = self._port(message)
+        self.ports.pop(port.port_name, None)
+        port.close()
+        return None
+
+    def _op_send(self, client, message):
+        port = self._port(message)
+        priority = int(message.get('priority', PRIORITY_USER))
+        if not port.lease.send(parse_hex(message['data']), priority):
+            raise AgentError("发送失败 (队列已满或无写权限)")
+        return None
+
+    def _op_request(self, client, message):
+        port = self._port(message)
+        request_id = message.get('id')
+        frame = parse_hex(message['data'])
+        reply_cmd = message.get('reply_cmd')
+        if reply_cmd is not None and (isinstance(reply_cmd, bool) or not isinstance(reply_cmd, int)
+                                      or not 0 <= reply_cmd <= 0xFF):
+            raise AgentError(f"reply_cmd 必须为 0-255 的整数: {reply_cmd!r}")
+        timeout = message.get('timeout')
+        if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float))
+                                    or not 0 < timeout < float('inf')):
+            raise AgentError(f"timeout 必须为正数: {timeout!r}")
+
+        def done(txn):
+            if txn.error:
+                self._reply_later(client, request_id, {'ok': False, 'error': txn.error})
+            else:
+                self._reply_later(client, request_id, {'ok': True, 'result': {
+                    'data': to_hex(txn.reply), 'ts_ns': txn.reply_ns, 'latency_ms': txn.latency_ms}})
+
+        port.transactions.submit(frame, reply_cmd, timeout, callback=done)
+        return _DEFERRED
+
+    def _op_status(self, client, message):
+        port = self._port(message)
+        return port.telemetry.latest(port.port_name)
+
+    def _op_stats(self, client, message):
+        port = self._port(message)
+        return {
+            'write': port.lease.write_stats(),
+            'transactions': port.transactions.stats(),
+            'dropped_bytes': port.parser.dropped_bytes,
+            'client_dropped': client.dropped,
+        }
+
+    def _subscription_keys(self, message):
+        port = message.get('port', '*')
+        streams = message.get('streams') or list(STREAMS)
+        unknown = set(streams) - set(STREAMS)
+        if unknown:
+            raise AgentError(f"未知数据流: {', '.join(sorted(unknown))}")
+        return {(port, stream) for stream in streams}
+
+    def _op_subscribe(self, client, message):
+        keys = self._subscription_keys(message)
+        with self._lock:
+            client.subscriptions |= keys
+        return sorted(f"{port}:{stream}" for port, stream in client.subscriptions)
+
+    def _op_unsubscribe(self, client, message):
+        keys = self._subscription_keys(message)
+        with self._lock:
+            client.subscriptions -= keys
+        return sorted(f"{port}:{stream}" for port, stream in client.subscriptions)
+
+
+# 请求已受理, 应答稍后由其他线程发出
+_DEFERRED = object()
@@ -0,0 +1,170 @@
+"""高精度周期发送器
+
+在独立线程中按绝对截止时间 (单调时钟) 发送预先编码好的帧,
+周期不受 GUI 负载影响, 也不会因为单次延迟而累积漂移。
+同时统计每次发送相对计划时间的滞后 (平均值 / p99 / 最大值)。
+滞后以帧实际写出串口的时刻计算 (由写线程的发送回调调用 record_sent), 包含排队等待的时间。
+心跳帧以发送器的标记 (tag) 提交, 写出回调按标记识别, 手动发送的相同内容的帧不计入。
+"""
+
+import collections
+import threading
+import time
+
+# 距离截止时间小于该值时改为忙等, 弥补 sleep 的唤醒误差
+SPIN_THRESHOLD_NS = 1_000_000
+# 最多保留的未确认写出的计划时刻
+MAX_UNSENT = 64
+
+
+class PeriodicTransmitter:
+    """周期心跳发送器
+
+    send_func(frame, period, tag) 在发送线程中调用 (通常只是以 tag 为合并标识放入写队列)。
+    set_frame() 可以在运行中原子地替换帧和周期, 下一拍立即生效。
+    帧实际写出后由使用方调用 record_sent(tag, ts_ns), 未调用时没有滞后统计。
+    统计值 (ticks / missed / 滞后) 由发送线程和写线程共同更新, 都在 _lock 内读写。
+    """
+
+    def __init__(self, send_func, history=4096, name="heartbeat"):
+        self.send_func = send_func
+        self.name = name
+        self.tag = f"{name}-{id(self):x}"   # 本发送器的心跳帧标记
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._config = None          # (frame, period_ns, generation)
+        self._generation = 0
+        self._thread = None
+        self._running = False
+
+        self._lateness = collections.deque(maxlen=history)   # 单位: ns
+        self._unsent = collections.deque(maxlen=MAX_UNSENT)  # 已放入写队列、尚未确认写出的计划时刻
+        self.ticks = 0
+        self.missed = 0
+        self.max_lateness_ns = 0
+
+    def set_frame(self, frame, period):
+        """原子地替换发送帧和周期(秒), 并从当前时刻重新开始计时"""
+        with self._lock:
+            self._generation += 1
+            self._config = (bytes(frame), int(period * 1_000_000_000), self._generation)
+            self._unsent.clear()
+        self._wakeup.set()
+
+    def start(self, frame=None, period=None):
+        if frame is not None:
+            self.set_frame(frame, period)
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        with self._lock:
+            self._config = None
+            self._unsent.clear()
+        self._wakeup.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+        self._thread = None
+
+    @property
+    def is_active(self):
+        return self._running and self._config is not None
+
+    def record_sent(self, tag, ts_ns):
+        """帧实际写出时调用 (写线程或其转发的信号), 以写出时刻计算相对计划时间的滞后
+
+        tag 不是本发送器的标记时忽略 (其他使用方发送的帧)。
+        写出的帧对应不晚于 ts_ns 的最近一拍; 更早的拍已被新帧替换或过期丢弃, 计为丢拍。
+        """
+        if tag != self.tag:
+            return
+        with self._lock:
+            if self._config is None:
+                return
+            deadline = None
+            while self._unsent and self._unsent[0] <= ts_ns:
+                if deadline is not None:
+                    self.missed += 1
+                deadline = self._unsent.popleft()
+            if deadline is None:
+                return
+            lateness = ts_ns - deadline
+            self._lateness.append(lateness)
+            if lateness > self.max_lateness_ns:
+                self.max_lateness_ns = lateness
+
+    def reset_stats(self):
+        with self._lock:
+            self._lateness.clear()
+            self._unsent.clear()
+            self.ticks = 0
+            self.missed = 0
+            self.max_lateness_ns = 0
+
+    def stats(self):
+        """返回滞后统计 (毫秒)"""
+        with self._lock:
+            samples = sorted(self._lateness)
+            ticks, missed, max_lateness_ns = self.ticks, self.missed, self.max_lateness_ns
+        if not samples:
+            return {'ticks': ticks, 'missed': missed, 'mean_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        return {
+            'ticks': ticks,
+            'missed': missed,
+            'mean_ms': sum(samples) / len(samples) / 1e6,
+            'p99_ms': p99 / 1e6,
+            'max_ms': max_lateness_ns / 1e6,
+        }
+
+    def _wait_until(self, deadline_ns, generation):
+        """等待到截止时间; 配置被替换时提前返回 False"""
+        while True:
+            if not self._running or self._current_generation() != generation:
+                return False
+            remaining = deadline_ns - time.monotonic_ns()
+            if remaining <= 0:
+                return True
+            if remaining > SPIN_THRESHOLD_NS:
+                if self._wakeup.wait((remaining - SPIN_THRESHOLD_NS) / 1e9):
+                    self._wakeup.clear()
+            # 最后1ms忙等
+
+    def _current_generation(self):
+        config = self._config
+        return config[2] if config else None
+
+    def _run(self):
+        while self._running:
+            with self._lock:
+                config = self._config
+            if config is None:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            frame, period_ns, generation = config
+            next_deadline = time.monotonic_ns()
+            while self._running:
+                if not self._wait_until(next_deadline, generation):
+                    break
+                with self._lock:
+                    self._unsent.append(next_deadline)
+                    self.ticks += 1
+                try:
+                    self.send_func(frame, period_ns / 1e9, self.tag)
+                except Exception as e:
+                    print(f"心跳发送失败: {e}")
+
+                # 按绝对时间推进; 严重滞后时跳过错过的拍, 不连发补偿
+                next_deadline += period_ns
+                now = time.monotonic_ns()
+                if now - next_deadline > period_ns:
+                    skipped = (now - next_deadline) // period_ns
+                    with self._lock:
+                        self.missed += skipped
+                    next_deadline += skipped * period_ns
@@ -0,0 +1,167 @@
+"""固件盘点
+
+对所有枚举到的串口并行发送 0x20 (可选再发 0x21), 汇总每块板的固件版本和状态。
+每个串口一个协程 (与测试流程执行器相同的 PortSession), 总耗时约等于最慢的一个串口。
+
+超时按设备自适应: 已知设备取上次应答延迟的 ADAPT_FACTOR 倍 (不低于 MIN_TIMEOUT),
+超时后再以 DEFAULT_TIMEOUT 重试一次; 未知设备直接使用 DEFAULT_TIMEOUT。
+结果按设备唯一标识 (PortInfo.stable_id) 缓存, TTL 内再次盘点直接使用缓存,
+适配器重新插拔后设备名变化也不影响。盘点期间在串口注册表中预留串口; 本进程中已打开或
+已被预留 (如扫码工位正在测试) 的串口和 busy 中的串口跳过。其他进程已打开的本地串口打开失败。
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+from controllers.port_registry import PortLeaseError, get_port_registry
+from controllers.port_watcher import PortInfo, get_port_watcher
+from core.codec import CMD_STATUS, CMD_VERSION, build_frame, decode_status, decode_version
+from core.plan_runner import PortSession
+from core.transactions import TransactionError
+
+DEFAULT_BAUD = 9600
+DEFAULT_TIMEOUT = 0.3       # 未知设备的应答超时 (秒)
+MIN_TIMEOUT = 0.05
+ADAPT_FACTOR = 4.0
+CACHE_TTL = 300.0
+
+
+class InventoryCache:
+    """按设备唯一标识缓存盘点结果"""
+
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._latency = {}       # 唯一标识 -> 上次应答延迟 (秒), 不随 TTL 过期
+        self._lock = threading.Lock()
+
+    def get(self, stable_id):
+        with self._lock:
+            entry = self._entries.get(stable_id)
+        if entry is None or time.monotonic() - entry['cached_at'] > self.ttl:
+            return None
+        return entry
+
+    def put(self, stable_id, entry):
+        entry['cached_at'] = time.monotonic()
+        with self._lock:
+            self._entries[stable_id] = entry
+            if entry.get('latency_ms') is not None:
+                self._latency[stable_id] = entry['latency_ms'] / 1000
+
+    def timeout_for(self, stable_id):
+        with self._lock:
+            latency = self._latency.get(stable_id)
+        if latency is None:
+            return DEFAULT_TIMEOUT
+        return min(DEFAULT_TIMEOUT, max(MIN_TIMEOUT, latency * ADAPT_FACTOR))
+
+    def invalidate(self, stable_id=None):
+        with self._lock:
+            if stable_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(stable_id, None)
+
+
+class InventorySweep:
+    """并行盘点
+
+    run(ports) 的 ports 为 PortInfo 或设备名列表, 省略时使用串口监视器当前枚举到的全部串口。
+    返回按设备名排序的结果字典列表: device / stable_id / description / version / status /
+    latency_ms / error / cached。
+    """
+
+    def __init__(self, cache=None, baud_rate=DEFAULT_BAUD, read_status=False, busy=()):
+        self.cache = cache or get_inventory_cache()
+        self.busy = set(busy)    # 由其他进程 (如多工位工作进程) 占用的串口
+        self.baud_rate = baud_rate
+        self.read_status = read_status
+
+    def run(self, ports=None, force=False):
+        if ports is None:
+            ports = get_port_watcher().ports()
+        ports = [port if isinstance(port, PortInfo) else PortInfo(port) for port in ports]
+        return asyncio.run(self._run_all(ports, force))
+
+    async def _run_all(self, ports, force):
+        # 打开/关闭串口是阻塞调用, 每个串口一个线程, 避免关闭时的读线程等待被串行化
+        asyncio.get_running_loop().set_default_executor(
+            concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(ports)), thread_name_prefix="inventory"))
+        results = await asyncio.gather(*(self._probe_cached(info, force) for info in ports))
+        return sorted(results, key=lambda entry: entry['device'])
+
+    async def _probe_cached(self, info, force):
+        stable_id = info.stable_id
+        if not force:
+            entry = self.cache.get(stable_id)
+            if entry is not None:
+                entry = dict(entry, device=info.device, cached=True)
+                entry.pop('cached_at')
+                return entry
+        entry = await self._probe(info)
+        if entry['error'] is None:
+            self.cache.put(stable_id, dict(entry))
+        return entry
+
+    async def _probe(self, info):
+        entry = {'device': info.device, 'stable_id': info.stable_id, 'description': info.description,
+                 'version': None, 'status': None, 'latency_ms': None, 'error': None, 'cached': False}
+        if info.device in self.busy:
+            entry['error'] = "串口已被占用"
+            return entry
+        registry = get_port_registry()
+        try:
+            # 已打开的串口不再重复打开, 避免与使用方争抢应答
+            registry.reserve(info.device, "固件盘点")
+        except PortLeaseError:
+            entry['error'] = "串口已被占用"
+            return entry
+        try:
+            return await self._probe_port(info, entry)
+        finally:
+            registry.unreserve(info.device)
+
+    async def _probe_port(self, info, entry):
+        session = PortSession(info.device, self.baud_rate, DEFAULT_TIMEOUT)
+        try:
+            await session.open()
+        except Exception as e:
+            entry['error'] = f"打开失败: {e}"
+            return entry
+        try:
+            txn = await self._request(session, build_frame(CMD_VERSION), self.cache.timeout_for(info.stable_id))
+            entry['version'] = decode_version(txn.reply)
+            entry['latency_ms'] = txn.latency_ms
+            if self.read_status:
+                txn = await self._request(session, build_frame(CMD_STATUS), self.cache.timeout_for(info.stable_id))
+                entry['status'] = decode_status(txn.reply)
+        except TransactionError as e:
+            entry['error'] = str(e)
+        finally:
+            await asyncio.get_running_loop().run_in_executor(None, session.close)
+        return entry
+
+    async def _request(self, session, frame, timeout):
+        """先用自适应超时, 超时后以默认超时重试一次"""
+        try:
+            return await session.request(frame, timeout)
+        except TransactionError:
+            if timeout >= DEFAULT_TIMEOUT:
+                raise
+            return await session.request(frame, DEFAULT_TIMEOUT)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_inventory_cache():
+    """返回进程级盘点缓存单例"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = InventoryCache()
+        return _cache
@@ -0,0 +1,516 @@
+"""进程内串口注册表
+
+同一个物理串口在进程内只打开一次, 由注册表以租约 (lease) 的形式分发给各使用方
+(日志显示、模拟器、测试器、抓包等)。接收数据分发给所有租约, 最后一个租约释放时才关闭串口。
+发送方可以申请独占写权限, 持有期间其他租约的发送请求会被拒绝。
+自行打开设备的使用方 (扫码工位的测试流程、固件盘点) 先预留串口, 预留期间不发放租约, 反之亦然。
+
+USB 转串口适配器掉线时串口不会被关闭: 读线程按设备唯一标识 (VID:PID:序列号) 退避重连,
+掉线期间心跳帧直接丢弃, 其余命令 (包括掉线时发送队列中尚未写出的和写出失败的那一帧) 暂存,
+重连成功后先按原优先级补发 (已过截止时间的丢弃), 再接收新命令, 保证先后顺序。
+"""
+
+import collections
+import itertools
+import threading
+import time
+
+from core.clock import StampedFrame
+from controllers.port_watcher import get_port_watcher
+from core.transport import open_transport, is_network_url
+from controllers.write_scheduler import WriteDeferred, WriteScheduler, PRIORITY_HEARTBEAT, PRIORITY_USER
+
+# 读线程阻塞读取的超时时间, 关闭串口时最多等待这么久
+READ_TIMEOUT = 0.2
+
+# 重连退避: 首次 0.1s, 每次翻倍, 最长 2s; 设备重新出现时立即重试
+RECONNECT_INITIAL_DELAY = 0.1
+RECONNECT_MAX_DELAY = 2.0
+# 掉线期间最多暂存的命令数, 超出时丢弃最早的
+OFFLINE_BUFFER_SIZE = 32
+
+# 连接事件 (on_event 回调参数)
+EVENT_DISCONNECTED = 'disconnected'
+EVENT_CONNECTED = 'connected'
+
+
+class PortLeaseError(Exception):
+    """租约申请失败 (波特率冲突、独占写权限已被占用或串口已被预留)"""
+
+
+class PortLease:
+    """串口租约 - 使用方通过租约收发数据
+
+    on_data(chunk): 读线程中调用, chunk 为 StampedFrame
+    on_sent(frame): 发送线程中调用, frame 为 StampedFrame (tag 为发送时的 coalesce_key)
+    on_event(event): 掉线/重连时在读线程中调用, event 为 EVENT_DISCONNECTED 或 EVENT_CONNECTED
+    """
+
+    def __init__(self, port, lease_id, consumer, on_data=None, on_sent=None, on_event=None):
+        self.port = port
+        self.lease_id = lease_id
+        self.consumer = consumer
+        self.on_data = on_data
+        self.on_sent = on_sent
+        self.on_event = on_event
+        self.active = True
+
+    @property
+    def serial_port(self):
+        return self.port.serial_port
+
+    @property
+    def is_open(self):
+        return self.active and self.port.is_open
+
+    @property
+    def is_connected(self):
+        """串口已打开且设备在线 (重连期间为 False)"""
+        return self.active and self.port.connected
+
+    @property
+    def is_exclusive_writer(self):
+        return self.port.exclusive_writer is self
+
+    def send(self, data, priority=PRIORITY_USER, deadline=None, coalesce_key=None):
+        """通过共享发送队列发送; 无写权限时返回 False"""
+        if not self.active:
+            return False
+        return self.port.submit(self, data, priority, deadline, coalesce_key)
+
+    def request_exclusive(self):
+        """申请独占写权限"""
+        return self.port.claim_writer(self)
+
+    def release_exclusive(self):
+        self.port.release_writer(self)
+
+    def write_stats(self):
+        if not self.port.write_scheduler:
+            return None
+        stats = self.port.write_scheduler.stats()
+        stats.update(self.port.link_stats())
+        return stats
+
+    def release(self):
+        """释放租约, 最后一个租约释放时关闭串口"""
+        if self.active:
+            self.active = False
+            self.port.registry.release(self)
+
+
+class SharedPort:
+    """注册表中的一个已打开串口: 一个读线程、一个发送调度器, 多个租约"""
+
+    def __init__(self, registry, port_name, baud_rate):
+        self.registry = registry
+        self.port_name = port_name      # 注册表中的名称 (打开时的设备名)
+        self.device = port_name         # 当前实际设备名, 重连后可能变化
+        self.stable_id = None
+        self.baud_rate = baud_rate
+        self.serial_port = None
+        self.write_scheduler = None
+        self.leases = {}
+        self.exclusive_writer = None
+        self.running = False
+        self.connected = False          # 新命令直接进入发送队列 (否则暂存)
+        self._writable = False          # 发送线程可以写串口 (重连补发期间先于 connected 置位)
+        self._reader = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = collections.deque()   # 掉线期间暂存的 (data, priority, deadline_at, key)
+        self.ready = threading.Event()        # 打开结束 (成功或失败), 等待同一串口的其他 acquire
+        self.open_error = None
+
+        # 连接统计
+        self.disconnects = 0
+        self.reconnects = 0
+        self.dropped_offline = 0
+
+    @property
+    def is_open(self):
+        return bool(self.running and self.serial_port is not None)
+
+    def _open_device(self, device):
+        return open_transport(device, self.baud_rate, READ_TIMEOUT)
+
+    def open(self):
+        self.serial_port = self._open_device(self.port_name)
+        # 网络串口按地址重连, 本地串口按设备唯一标识重连
+        info = None if is_network_url(self.port_name) else get_port_watcher().info_for(self.port_name)
+        self.stable_id = info.stable_id if info else None
+        self.running = True
+        self.connected = True
+        self._writable = True
+        self.write_scheduler = WriteScheduler(self._write, on_sent=self._on_sent,
+                                              name=f"writer-{self.port_name}", on_deferred=self._defer)
+        self.write_scheduler.start()
+        self._reader = threading.Thread(target=self._read_loop, name=f"reader-{self.port_name}", daemon=True)
+        self._reader.start()
+        print(f"Serial port {self.port_name} opened at {self.baud_rate} baud.")
+
+    def close(self):
+        self.running = False
+        self.connected = False
+        self._writable = False
+        self._wake.set()
+        if self.write_scheduler:
+            self.write_scheduler.stop()
+            self.write_scheduler = None
+        serial_port = self.serial_port
+        if serial_port is not None and serial_port.is_open:
+            serial_port.close()
+            print(f"Serial port {self.port_name} closed.")
+        if self._reader and self._reader is not threading.current_thread():
+            self._reader.join(READ_TIMEOUT * 2)
+        self._reader = None
+        self._pending.clear()
+
+    def _write(self, data):
+        """发送线程写函数, 总是写到当前 (可能已重连的) 串口对象; 掉线时帧转入暂存
+
+        写出错 (适配器在写的过程中被拔出) 同样视为掉线: 队列转入暂存、关闭句柄让读线程去重连,
+        这一帧也经 WriteDeferred 放到暂存最前面。
+        """
+        if not self._writable:
+            raise WriteDeferred(f"{self.port_name} 已断开")
+        serial_port = self.serial_port
+        try:
+            serial_port.write(data)
+        except OSError as e:
+            if not self.running:
+                raise
+            print(f"写串口 {self.port_name} 失败: {e}")
+            self._mark_link_lost()
+            try:
+                serial_port.close()
+            except Exception:
+                pass
+            raise WriteDeferred(f"{self.port_name} 已断开") from e
+
+    def _subscribers(self):
+        with self._lock:
+            return list(self.leases.values())
+
+    def _read_loop(self):
+        """读线程: 阻塞等待首字节, 到达后立即打时间戳并分发给所有租约; 设备掉线时负责重连"""
+        while self.running:
+            try:
+                data = self.serial_port.read(1)
+                if not data:
+                    continue
+                ts_ns = time.monotonic_ns()
+                waiting = self.serial_port.in_waiting
+                if waiting:
+                    data += self.serial_port.read(waiting)
+            except Exception as e:
+                if self.running:
+                    print(f"Error reading from serial port: {e}")
+                    self._handle_link_lost()
+                continue
+            for lease in self._subscribers():
+                if lease.on_data:
+                    try:
+                        lease.on_data(StampedFrame(data, ts_ns))
+                    except Exception as e:
+                        print(f"串口数据分发失败 ({lease.consumer}): {e}")
+
+    # ===== 掉线重连 =====
+
+    def _handle_link_lost(self):
+        """读出错视为设备掉线: 关闭句柄, 发送队列转入暂存, 通知租约, 然后退避重连"""
+        self._mark_link_lost()
+        self.disconnects += 1
+        try:
+            self.serial_port.close()
+        except Exception:
+            pass
+        print(f"串口 {self.port_name} 连接断开, 开始重连")
+        self._emit_event(EVENT_DISCONNECTED)
+
+        watcher = get_port_watcher()
+        listener = self._on_ports_changed
+        watcher.add_listener(listener)
+        try:
+            delay = RECONNECT_INITIAL_DELAY
+            while self.running:
+                self._wake.wait(delay)
+                self._wake.clear()
+                if not self.running:
+                    return
+                device = self._resolve_device(watcher)
+                if device is None:
+                    delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                    continue
+                try:
+                    serial_port = self._open_device(device)
+                except Exception:
+                    delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                    continue
+                if not self.running:
+                    serial_port.close()
+                    return
+                self.serial_port = serial_port
+                self.device = device
+                self._flush_pending()
+                self.reconnects += 1
+                print(f"串口 {self.port_name} 已重新连接 ({device})")
+                self._emit_event(EVENT_CONNECTED)
+                return
+        finally:
+            watcher.remove_listener(listener)
+
+    def _mark_link_lost(self):
+        """停止写串口, 新命令和发送队列中尚未写出的帧转入暂存"""
+        with self._lock:
+            self.connected = False
+            self._writable = False
+            if self.write_scheduler:
+                for data, priority, deadline, coalesce_key in self.write_scheduler.drain():
+                    self._buffer_offline(data, priority, deadline, coalesce_key)
+
+    def _resolve_device(self, watcher):
+        """按设备唯一标识查找当前设备名; 没有标识时沿用原设备名"""
+        if self.stable_id is None:
+            return self.device
+        info = watcher.find_by_stable_id(self.stable_id)
+        return info.device if info else None
+
+    def _on_ports_changed(self, ports):
+        # 串口监视器发现设备变化时立即唤醒重连, 不必等退避结束
+        self._wake.set()
+
+    def _emit_event(self, event):
+        for lease in self._subscribers():
+            if lease.on_event:
+                try:
+                    lease.on_event(event)
+                except Exception as e:
+                    print(f"连接事件通知失败 ({lease.consumer}): {e}")
+
+    def _buffer_offline(self, data, priority, deadline, coalesce_key, first=False):
+        """掉线期间的发送策略: 心跳帧丢弃, 其余命令暂存 (调用方持有 _lock)
+
+        first 为 True 时放在最前 (发送线程正在写出时掉线的帧, 早于队列中的其他帧)。
+        """
+        if priority == PRIORITY_HEARTBEAT:
+            self.dropped_offline += 1
+            return False
+        deadline_at = time.monotonic() + deadline if deadline is not None else None
+        if coalesce_key is not None:
+            for entry in list(self._pending):
+                if entry[3] == coalesce_key:
+                    self._pending.remove(entry)
+        if len(self._pending) >= OFFLINE_BUFFER_SIZE:
+            self._pending.popleft()
+            self.dropped_offline += 1
+        entry = (bytes(data), priority, deadline_at, coalesce_key)
+        if first:
+            self._pending.appendleft(entry)
+        else:
+            self._pending.append(entry)
+        return True
+
+    def _defer(self, data, priority, deadline, coalesce_key):
+        """发送线程回调: 写出时串口已掉线"""
+        with self._lock:
+            if self.connected:
+                # 等锁期间已经重连并补发完毕, 直接重新排队
+                self.write_scheduler.submit(data, priority, deadline, coalesce_key)
+            else:
+                self._buffer_offline(data, priority, deadline, coalesce_key, first=True)
+
+    def _flush_pending(self):
+        """重连后补发暂存的命令, 补发完成后新命令才直接进入发送队列"""
+        with self._lock:
+            self._writable = True
+            now = time.monotonic()
+            for data, priority, deadline_at, coalesce_key in self._pending:
+                if deadline_at is not None and now > deadline_at:
+                    self.dropped_offline += 1
+                    continue
+                deadline = deadline_at - now if deadline_at is not None else None
+                if self.write_scheduler:
+                    self.write_scheduler.submit(data, priority, deadline, coalesce_key)
+            self._pending.clear()
+            self.connected = True
+
+    def link_stats(self):
+        return {
+            'connected': self.connected,
+            'disconnects': self.disconnects,
+            'reconnects': self.reconnects,
+            'pending': len(self._pending),
+            'dropped_offline': self.dropped_offline,
+        }
+
+    def _on_sent(self, data, ts_ns, coalesce_key):
+        for lease in self._subscribers():
+            if lease.on_sent:
+                try:
+                    lease.on_sent(StampedFrame(data, ts_ns, coalesce_key))
+                except Exception as e:
+                    print(f"发送通知失败 ({lease.consumer}): {e}")
+
+    def submit(self, lease, data, priority, deadline, coalesce_key):
+        writer = self.exclusive_writer
+        if writer is not None and writer is not lease:
+            print(f"发送被拒绝: {self.port_name} 的写权限由 {writer.consumer} 独占")
+            return False
+        if not self.write_scheduler:
+            return False
+        with self._lock:
+            if not self.connected:
+                return self._buffer_offline(data, priority, deadline, coalesce_key)
+        return self.write_scheduler.submit(data, priority, deadline, coalesce_key)
+
+    def claim_writer(self, lease):
+        with self._lock:
+            if self.exclusive_writer is not None and self.exclusive_writer is not lease:
+                return False
+            self.exclusive_writer = lease
+            return True
+
+    def release_writer(self, lease):
+        with self._lock:
+            if self.exclusive_writer is lease:
+                self.exclusive_writer = None
+
+
+class PortRegistry:
+    """进程级串口注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ports = {}
+        self._reserved = {}      # 串口名 -> 预留方名称
+        self._ids = itertools.count(1)
+
+    def acquire(self, port_name, baud_rate, consumer, on_data=None, on_sent=None, on_event=None,
+                exclusive_writer=False):
+        """申请串口租约; 串口未打开时打开它, 已打开时直接复用
+
+        打开失败时抛出 serial.SerialException, 参数冲突时抛出 PortLeaseError。
+        打开 (网络串口可能要连接数秒) 在注册表锁外进行, 只有同一串口的其他 acquire 需要等待。
+        """
+        with self._lock:
+            if port_name in self._reserved:
+                raise PortLeaseError(f"{port_name} 正被 {self._reserved[port_name]} 使用")
+            port = self._ports.get(port_name)
+            opening = port is None
+            if opening:
+                # 先占位, 其他使用方看到的是正在打开的串口
+                port = self._ports[port_name] = SharedPort(self, port_name, baud_rate)
+            elif port.baud_rate != baud_rate:
+                raise PortLeaseError(f"{port_name} 已以 {port.baud_rate} 波特率打开, 无法以 {baud_rate} 共享")
+
+        if opening:
+            return self._open_port(port, consumer, on_data, on_sent, on_event, exclusive_writer)
+        port.ready.wait()
+        if port.open_error is not None:
+            raise port.open_error
+        with self._lock:
+            if self._ports.get(port_name) is not port:
+                raise PortLeaseError(f"{port_name} 已关闭")
+            return self._add_lease(port, consumer, on_data, on_sent, on_event, exclusive_writer)
+
+    def _open_port(self, port, consumer, on_data, on_sent, on_event, exclusive_writer):
+        """在锁外打开占位的串口, 成功后发放第一个租约, 失败时撤销占位"""
+        try:
+            port.open()
+        except Exception as e:
+            with self._lock:
+                if self._ports.get(port.port_name) is port:
+                    del self._ports[port.port_name]
+            port.open_error = e
+            port.ready.set()
+            raise
+        try:
+            with self._lock:
+                if self._ports.get(port.port_name) is not port:
+                    # 打开期间注册表已关闭 (close_all)
+                    port.open_error = PortLeaseError(f"{port.port_name} 已关闭")
+                    raise port.open_error
+                return self._add_lease(port, consumer, on_data, on_sent, on_event, exclusive_writer)
+        except PortLeaseError:
+            port.close()
+            raise
+        finally:
+            port.ready.set()
+
+    def _add_lease(self, port, consumer, on_data, on_sent, on_event, exclusive_writer):
+        """在注册表锁内为已打开的串口发放租约"""
+        lease = PortLease(port, next(self._ids), consumer, on_data, on_sent, on_event)
+        if exclusive_writer and not port.claim_writer(lease):
+            if not port.leases:
+                self._close_port(port)
+            raise PortLeaseError(f"{port.port_name} 的写权限已被 {port.exclusive_writer.consumer} 独占")
+        with port._lock:
+            port.leases[lease.lease_id] = lease
+        return lease
+
+    def release(self, lease):
+        with self._lock:
+            port = lease.port
+            port.release_writer(lease)
+            with port._lock:
+                port.leases.pop(lease.lease_id, None)
+                remaining = len(port.leases)
+            if remaining == 0:
+                self._close_port(port)
+
+    def _close_port(self, port):
+        port.close()
+        if self._ports.get(port.port_name) is port:
+            del self._ports[port.port_name]
+
+    def get(self, port_name):
+        """返回已打开的串口, 未打开时返回 None"""
+        with self._lock:
+            return self._ports.get(port_name)
+
+    def reserve(self, port_name, consumer):
+        """预留串口供使用方自行打开; 串口已打开或已被预留时抛出 PortLeaseError"""
+        with self._lock:
+            if port_name in self._reserved:
+                raise PortLeaseError(f"{port_name} 正被 {self._reserved[port_name]} 使用")
+            if port_name in self._ports:
+                raise PortLeaseError(f"{port_name} 已被本程序打开")
+            self._reserved[port_name] = consumer
+
+    def unreserve(self, port_name):
+        with self._lock:
+            self._reserved.pop(port_name, None)
+
+    def ports(self):
+        """返回已打开串口及其使用方列表"""
+        with self._lock:
+            return {
+                name: {
+                    'baud_rate': port.baud_rate,
+                    'device': port.device,
+                    'connected': port.connected,
+                    'consumers': [lease.consumer for lease in port.leases.values()],
+                    'exclusive_writer': port.exclusive_writer.consumer if port.exclusive_writer else None,
+                }
+                for name, port in self._ports.items()
+            }
+
+    def close_all(self):
+        with self._lock:
+            for port in list(self._ports.values()):
+                port.leases.clear()
+                self._close_port(port)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_port_registry():
+    """返回进程级注册表单例"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PortRegistry()
+        return _registry
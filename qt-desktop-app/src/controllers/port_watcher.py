@@ -0,0 +1,312 @@
+"""串口热插拔监视
+
+后台线程缓存串口枚举结果 (USB 序列号、VID:PID、物理位置),
+Linux 下通过 inotify 监听 /dev 中串口设备节点的创建/删除, 只对变化的设备读取 sysfs 信息,
+不再每次刷新都完整扫描。其他平台退化为后台定时扫描。
+同时维护 "工位 -> 设备唯一标识" 的绑定, 适配器重新插拔后设备名变化也能找回。
+"""
+
+import ctypes
+import glob
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+# 与 pyserial 的 list_ports_linux 保持一致的设备节点
+LINUX_PORT_PATTERNS = ('/dev/ttyS*', '/dev/ttyUSB*', '/dev/ttyXRUSB*', '/dev/ttyACM*',
+                       '/dev/ttyAMA*', '/dev/rfcomm*', '/dev/ttyAP*', '/dev/ttyGS*')
+LINUX_PORT_PREFIXES = tuple(os.path.basename(p).rstrip('*') for p in LINUX_PORT_PATTERNS)
+
+# inotify 事件掩码
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+INOTIFY_EVENT_HEADER = struct.Struct('iIII')
+
+# 设备节点出现后等待 udev 完成属性和权限设置
+SETTLE_DELAY = 0.3
+POLL_INTERVAL = 2.0
+
+SLOT_FILE = os.path.join(os.path.expanduser('~'), '.qt_desktop_app', 'fixture_slots.json')
+
+
+class PortInfo:
+    """串口设备信息"""
+
+    __slots__ = ('device', 'description', 'serial_number', 'vid', 'pid', 'location', 'hwid')
+
+    def __init__(self, device, description='', serial_number=None, vid=None, pid=None, location=None, hwid=''):
+        self.device = device
+        self.description = description
+        self.serial_number = serial_number
+        self.vid = vid
+        self.pid = pid
+        self.location = location
+        self.hwid = hwid
+
+    @classmethod
+    def from_list_port_info(cls, info):
+        return cls(info.device, info.description, info.serial_number, info.vid, info.pid,
+                   info.location, info.hwid)
+
+    @property
+    def stable_id(self):
+        """设备唯一标识: 优先 VID:PID:序列号, 没有序列号时使用 USB 物理位置"""
+        if self.vid is not None and self.serial_number:
+            return f"{self.vid:04X}:{self.pid:04X}:{self.serial_number}"
+        if self.vid is not None and self.location:
+            return f"{self.vid:04X}:{self.pid:04X}@{self.location}"
+        return self.device
+
+    def __repr__(self):
+        return f"PortInfo({self.device!r}, {self.stable_id!r})"
+
+
+def _describe_linux(device):
+    """只读取单个设备的 sysfs 信息; 非真实串口 (platform 子系统) 返回 None"""
+    from serial.tools.list_ports_linux import SysFS
+    info = SysFS(device)
+    if info.subsystem == 'platform':
+        return None
+    return PortInfo.from_list_port_info(info)
+
+
+def _full_scan():
+    import serial.tools.list_ports
+    return {info.device: PortInfo.from_list_port_info(info) for info in serial.tools.list_ports.comports()}
+
+
+class _Inotify:
+    """最小化的 inotify 封装 (ctypes)"""
+
+    def __init__(self, path, mask):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, path.encode(), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch {path} failed")
+
+    def wait(self, timeout):
+        """等待事件, 返回变化的文件名列表"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        names = []
+        try:
+            data = os.read(self.fd, 8192)
+        except BlockingIOError:
+            return []
+        offset = 0
+        while offset + INOTIFY_EVENT_HEADER.size <= len(data):
+            _, _, _, length = INOTIFY_EVENT_HEADER.unpack_from(data, offset)
+            offset += INOTIFY_EVENT_HEADER.size
+            names.append(data[offset:offset + length].rstrip(b'\0').decode(errors='replace'))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PortWatcher:
+    """后台串口监视器
+
+    监听回调 listener(ports) 在监视线程中调用, ports 为按设备名排序的 PortInfo 列表。
+    """
+
+    def __init__(self, slot_file=SLOT_FILE):
+        self._lock = threading.Lock()
+        self._ports = {}
+        self._ignored = set()    # 已确认不是真实串口的设备节点 (如 platform ttyS*)
+        self._listeners = []
+        self._thread = None
+        self._running = False
+        self._rescan_requested = threading.Event()
+        self.slot_file = slot_file
+        self.slots = self._load_slots()
+
+    # ===== 生命周期 =====
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="port-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._rescan_requested.set()
+
+    def _run(self):
+        self._apply(self._safe_full_scan())
+        if sys.platform.startswith('linux'):
+            try:
+                inotify = _Inotify('/dev', IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO)
+            except OSError as e:
+                print(f"inotify 不可用, 改为定时扫描: {e}")
+            else:
+                try:
+                    self._run_inotify(inotify)
+                finally:
+                    inotify.close()
+                return
+        self._run_polling()
+
+    def _run_inotify(self, inotify):
+        while self._running:
+            names = inotify.wait(0.5)
+            if self._rescan_requested.is_set():
+                self._rescan_requested.clear()
+                self._apply(self._safe_full_scan())
+                continue
+            if not any(name.startswith(LINUX_PORT_PREFIXES) for name in names):
+                continue
+            time.sleep(SETTLE_DELAY)
+            inotify.wait(0)  # 合并 udev 创建符号链接等后续事件
+            self._apply(self._incremental_scan())
+
+    def _run_polling(self):
+        while self._running:
+            self._rescan_requested.wait(POLL_INTERVAL)
+            self._rescan_requested.clear()
+            if self._running:
+                self._apply(self._safe_full_scan())
+
+    # ===== 扫描 =====
+
+    def _safe_full_scan(self):
+        try:
+            return _full_scan()
+        except Exception as e:
+            print(f"串口扫描失败: {e}")
+            return dict(self._ports)
+
+    def _incremental_scan(self):
+        """只对新出现的设备节点读取 sysfs, 已消失的直接移除"""
+        present = set()
+        for pattern in LINUX_PORT_PATTERNS:
+            present.update(glob.glob(pattern))
+        with self._lock:
+            ports = {device: info for device, info in self._ports.items() if device in present}
+            known = set(self._ports)
+        self._ignored &= present
+        for device in sorted(present - known - self._ignored):
+            try:
+                info = _describe_linux(device)
+            except Exception as e:
+                print(f"读取串口信息失败 {device}: {e}")
+                continue
+            if info is None:
+                self._ignored.add(device)
+            else:
+                ports[device] = info
+        return ports
+
+    def _apply(self, ports):
+        with self._lock:
+            changed = set(ports) != set(self._ports)
+            self._ports = ports
+            listeners = list(self._listeners)
+        if changed:
+            for device in sorted(ports):
+                print(f"Found port: {device} - {ports[device].description}")
+            self._notify(listeners)
+
+    def _notify(self, listeners):
+        ports = self.ports()
+        for listener in listeners:
+            try:
+                listener(ports)
+            except RuntimeError:
+                # 界面控件已销毁
+                self.remove_listener(listener)
+            except Exception as e:
+                print(f"串口变化通知失败: {e}")
+
+    def rescan(self):
+        """请求一次完整扫描 (在监视线程中执行)"""
+        self._rescan_requested.set()
+
+    # ===== 查询与订阅 =====
+
+    def ports(self):
+        with self._lock:
+            return [self._ports[device] for device in sorted(self._ports)]
+
+    def add_listener(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def find_by_stable_id(self, stable_id):
+        with self._lock:
+            for info in self._ports.values():
+                if info.stable_id == stable_id:
+                    return info
+        return None
+
+    def info_for(self, device):
+        with self._lock:
+            return self._ports.get(device)
+
+    # ===== 工位绑定 =====
+
+    def _load_slots(self):
+        try:
+            with open(self.slot_file, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_slots(self):
+        try:
+            os.makedirs(os.path.dirname(self.slot_file), exist_ok=True)
+            with open(self.slot_file, 'w', encoding='utf-8') as file:
+                json.dump(self.slots, file, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"保存工位绑定失败: {e}")
+
+    def bind_slot(self, slot, device):
+        """将工位绑定到设备的唯一标识"""
+        info = self.info_for(device)
+        self.slots[slot] = info.stable_id if info else device
+        self._save_slots()
+        return self.slots[slot]
+
+    def unbind_slot(self, slot):
+        if self.slots.pop(slot, None) is not None:
+            self._save_slots()
+
+    def resolve_slot(self, slot):
+        """返回工位当前对应的设备名, 设备不在线时返回 None"""
+        stable_id = self.slots.get(slot)
+        if stable_id is None:
+            return None
+        info = self.find_by_stable_id(stable_id)
+        return info.device if info else None
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_port_watcher():
+    """返回进程级串口监视器单例 (首次调用时启动)"""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = PortWatcher()
+            _watcher.start()
+        return _watcher
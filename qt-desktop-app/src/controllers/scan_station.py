@@ -0,0 +1,237 @@
+"""扫码工位流程
+
+操作员扫描板子条码后不再需要任何点击:
+    1. 序列号绑定到一个空闲治具 (先扫治具条码可指定治具, 否则取第一个空闲治具)
+    2. 通过串口监视器的工位绑定找到治具当前的设备名 (未绑定时治具名即为串口名)
+    3. 在串口注册表中预留该串口, 在后台线程中执行配置好的测试流程, 结果写入测试结果库
+       (串口已被本进程打开、被其他预留方或 busy_ports 占用时直接判为错误, 不抢占)
+重复条码 (正在其他治具上测试) 直接拒绝; 测试过的序列号标记为复测。
+判断依据是内存索引 (序列号 -> 最近一次结果), 启动时在后台从测试结果库预加载。
+同时统计每小时产出和扫码到测试开始 (第一条命令发出) 的延迟。
+"""
+
+import collections
+import threading
+import time
+
+from controllers.port_registry import PortLeaseError, get_port_registry
+from controllers.port_watcher import get_port_watcher
+from core.plan_runner import PlanRunner, RESULT_ERROR
+from core.results_db import run_from_plan_result
+
+PRELOAD_DAYS = 90           # 内存索引预加载最近多少天的记录
+LATENCY_HISTORY = 200
+
+# 扫码分类
+SCAN_NEW = 'new'
+SCAN_RETEST = 'retest'
+SCAN_DUPLICATE = 'duplicate'
+SCAN_NO_FIXTURE = 'no_fixture'
+
+# 治具状态
+FIXTURE_IDLE = 'idle'
+FIXTURE_TESTING = 'testing'
+
+
+class Fixture:
+    """一个测试治具 (工位)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = FIXTURE_IDLE
+        self.serial = None
+        self.device = None
+        self.scanned_at = None
+        self.result = None
+
+
+class ScanStation:
+    """扫码工位: 条码 -> 治具 -> 自动执行测试流程
+
+    on_event(event) 在扫码线程或测试线程中调用, event 为字典, 'event' 字段取值:
+    scan / rejected / started / step / finished / index_loaded。
+    busy_ports() 返回被其他进程 (如多工位工作进程) 占用的串口集合。
+    """
+
+    def __init__(self, plan, fixtures, database=None, on_event=None, watcher=None, busy_ports=None):
+        self.plan = plan
+        self.fixtures = collections.OrderedDict((name, Fixture(name)) for name in fixtures)
+        self.database = database
+        self.on_event = on_event
+        self.watcher = watcher or get_port_watcher()
+        self.busy_ports = busy_ports
+        self.index = {}              # 序列号 -> (结果, 结束时间)
+        self.index_loaded = False
+        self._selected = None        # 扫描治具条码后指定的下一个治具
+        self._lock = threading.Lock()
+        self._completed = collections.deque()                  # 最近一小时完成时间 (monotonic)
+        self._latencies = collections.deque(maxlen=LATENCY_HISTORY)
+        self.scans = 0
+        self.rejected = 0
+
+        if database is not None:
+            threading.Thread(target=self._preload_index, name="scan-index", daemon=True).start()
+
+    def _emit(self, event):
+        if self.on_event:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"扫码事件通知失败: {e}")
+
+    # ===== 序列号索引 =====
+
+    def _preload_index(self):
+        started = time.monotonic()
+        try:
+            index = self.database.latest_results(since=time.time() - PRELOAD_DAYS * 86400)
+        except Exception as e:
+            print(f"加载测试记录索引失败: {e}")
+            return
+        with self._lock:
+            # 预加载期间完成的测试以内存记录为准
+            index.update(self.index)
+            self.index = index
+            self.index_loaded = True
+        self._emit({'event': 'index_loaded', 'serials': len(index),
+                    'load_ms': round((time.monotonic() - started) * 1000, 1)})
+
+    def _previous_result(self, serial):
+        """最近一次结果; 索引尚未加载完成时直接查测试结果库 (序列号有索引)"""
+        with self._lock:
+            previous = self.index.get(serial)
+            loaded = self.index_loaded
+        if previous is None and not loaded and self.database is not None:
+            runs = self.database.find_by_serial(serial)
+            if runs:
+                previous = (runs[-1]['result'], runs[-1]['finished_at'])
+        return previous
+
+    # ===== 扫码 =====
+
+    def scan(self, code):
+        """处理一次扫码, 返回事件字典"""
+        code = code.strip()
+        if not code:
+            return None
+        scanned_at = time.monotonic()
+        if code in self.fixtures:
+            self._selected = code
+            event = {'event': 'scan', 'fixture': code, 'kind': 'fixture'}
+            self._emit(event)
+            return event
+        self.scans += 1
+
+        with self._lock:
+            busy = next((f for f in self.fixtures.values() if f.serial == code and f.state == FIXTURE_TESTING), None)
+            fixture = None
+            if busy is None:
+                fixture = self._pick_fixture()
+                if fixture is not None:
+                    fixture.state = FIXTURE_TESTING
+                    fixture.serial = code
+                    fixture.scanned_at = scanned_at
+                    fixture.result = None
+        if busy is not None:
+            return self._reject(code, SCAN_DUPLICATE, f"条码重复: 正在治具 {busy.name} 上测试")
+        if fixture is None:
+            return self._reject(code, SCAN_NO_FIXTURE, "没有空闲治具")
+
+        previous = self._previous_result(code)
+        kind = SCAN_RETEST if previous else SCAN_NEW
+        event = {'event': 'scan', 'serial': code, 'fixture': fixture.name, 'kind': kind,
+                 'previous': previous[0] if previous else None}
+        self._emit(event)
+        threading.Thread(target=self._run_fixture, args=(fixture,), name=f"scan-{fixture.name}",
+                         daemon=True).start()
+        return event
+
+    def _pick_fixture(self):
+        selected = self.fixtures.get(self._selected)
+        self._selected = None
+        if selected is not None:
+            return selected if selected.state == FIXTURE_IDLE else None
+        return next((f for f in self.fixtures.values() if f.state == FIXTURE_IDLE), None)
+
+    def _reject(self, code, kind, reason):
+        self.rejected += 1
+        event = {'event': 'rejected', 'serial': code, 'kind': kind, 'reason': reason}
+        self._emit(event)
+        return event
+
+    # ===== 测试执行 =====
+
+    def _run_fixture(self, fixture):
+        fixture.device = self.watcher.resolve_slot(fixture.name) or (
+            None if fixture.name in self.watcher.slots else fixture.name)
+        if fixture.device is None:
+            self._finish(fixture, self._error_result(fixture.name, f"治具 {fixture.name} 的设备不在线"))
+            return
+        if self.busy_ports and fixture.device in self.busy_ports():
+            self._finish(fixture, self._error_result(fixture.device, f"串口 {fixture.device} 正被其他进程使用"))
+            return
+        registry = get_port_registry()
+        try:
+            registry.reserve(fixture.device, f"扫码工位 {fixture.name}")
+        except PortLeaseError as e:
+            self._finish(fixture, self._error_result(fixture.device, str(e)))
+            return
+        try:
+            result = self._run_plan(fixture)
+        finally:
+            registry.unreserve(fixture.device)
+        self._finish(fixture, result)
+
+    def _error_result(self, port, message):
+        return {'plan': self.plan.name, 'port': port, 'steps': [], 'result': RESULT_ERROR,
+                'message': message, 'duration_ms': 0}
+
+    def _run_plan(self, fixture):
+        self._emit({'event': 'started', 'serial': fixture.serial, 'fixture': fixture.name, 'device': fixture.device})
+        first_step = []
+
+        def on_event(event):
+            if event['event'] != 'step':
+                return
+            if not first_step:
+                # 第一步的开始时刻即第一条命令发出的时刻
+                first_step.append(True)
+                latency_ms = (time.monotonic() - fixture.scanned_at) * 1000 - event['duration_ms']
+                self._latencies.append(latency_ms)
+                event = dict(event, scan_latency_ms=round(latency_ms, 1))
+            self._emit(dict(event, serial=fixture.serial, fixture=fixture.name))
+
+        try:
+            return PlanRunner(self.plan, [fixture.device], on_event=on_event).run()[fixture.device]
+        except Exception as e:
+            return self._error_result(fixture.device, str(e))
+
+    def _finish(self, fixture, result):
+        run = run_from_plan_result(result, fixture.serial, fixture.name)
+        if self.database is not None:
+            self.database.record_run(run)
+        with self._lock:
+            self.index[fixture.serial] = (run['result'], run['finished_at'])
+            self._completed.append(time.monotonic())
+            fixture.result = run['result']
+            fixture.state = FIXTURE_IDLE
+        self._emit({'event': 'finished', 'serial': fixture.serial, 'fixture': fixture.name,
+                    'result': run['result'], 'message': result.get('message'),
+                    'duration_ms': result.get('duration_ms')})
+
+    # ===== 统计 =====
+
+    def stats(self):
+        """最近一小时产出 (块/小时) 与扫码到测试开始延迟 (ms)"""
+        now = time.monotonic()
+        with self._lock:
+            while self._completed and now - self._completed[0] > 3600:
+                self._completed.popleft()
+            completed = len(self._completed)
+            latencies = sorted(self._latencies)
+        stats = {'per_hour': completed, 'scans': self.scans, 'rejected': self.rejected,
+                 'testing': sum(1 for f in self.fixtures.values() if f.state == FIXTURE_TESTING)}
+        if latencies:
+            stats['latency_ms'] = round(sum(latencies) / len(latencies), 1)
+            stats['latency_p95_ms'] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1)
+        return stats
@@ -1,14 +1,47 @@
-from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QLineEdit, QTextEdit, QLabel
+from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QTextEdit, QLabel,
+                             QPushButton, QFileDialog, QTableWidget, QTableWidgetItem, QHeaderView)
+from PyQt6.QtCore import QTimer, pyqtSignal
 import sys
 
+from controllers.scan_station import ScanStation, SCAN_RETEST, FIXTURE_TESTING
+from core.plans import TestPlan, PlanError
+from core.results_db import get_results_database
+
+DEFAULT_PLAN = "../plans/motor_board_basic.json"
+
+
 class ScanWindow(QWidget):
+    """扫码工位 - 扫描板子条码后自动绑定治具并执行测试流程"""
+
+    COLUMNS = ["治具", "设备", "序列号", "状态", "结果"]
+
+    # 工位线程 -> 界面线程
+    station_event = pyqtSignal(dict)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("扫码枪数据录入")
-        self.resize(400, 300)
+        self.resize(640, 480)
+        self.station = None
 
         self.layout = QVBoxLayout()
 
+        # 测试流程与治具
+        config_row = QHBoxLayout()
+        self.plan_input = QLineEdit(DEFAULT_PLAN)
+        self.plan_input.setPlaceholderText("测试流程文件")
+        self.btn_browse = QPushButton("选择...")
+        self.btn_browse.clicked.connect(self._browse_plan)
+        self.fixtures_input = QLineEdit()
+        self.fixtures_input.setPlaceholderText("治具 (工位名或串口), 逗号分隔")
+        self.btn_start = QPushButton("开始")
+        self.btn_start.clicked.connect(self.start_station)
+        config_row.addWidget(self.plan_input, 2)
+        config_row.addWidget(self.btn_browse)
+        config_row.addWidget(self.fixtures_input, 2)
+        config_row.addWidget(self.btn_start)
+        self.layout.addLayout(config_row)
+
         self.label = QLabel("请用扫码枪扫描二维码，数据会显示在下方输入框：")
         self.layout.addWidget(self.label)
 
@@ -16,6 +49,16 @@ class ScanWindow(QWidget):
         self.input_line.setPlaceholderText("扫码结果会显示在这里，按回车录入")
         self.layout.addWidget(self.input_line)
 
+        # 治具状态
+        self.fixture_table = QTableWidget(0, len(self.COLUMNS))
+        self.fixture_table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.fixture_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.fixture_table.verticalHeader().setVisible(False)
+        self.layout.addWidget(self.fixture_table)
+
+        self.stats_label = QLabel()
+        self.layout.addWidget(self.stats_label)
+
         self.result_box = QTextEdit()
         self.result_box.setReadOnly(True)
         self.result_box.setPlaceholderText("所有扫码结果记录：")
@@ -25,15 +68,84 @@ class ScanWindow(QWidget):
 
         # 绑定回车事件
         self.input_line.returnPressed.connect(self.record_scan)
+        self.station_event.connect(self.handle_station_event)
+
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.refresh_status)
+
+    def _browse_plan(self):
+        path, _ = QFileDialog.getOpenFileName(self, "选择测试流程", "", "测试流程 (*.json)")
+        if path:
+            self.plan_input.setText(path)
+
+    def start_station(self):
+        fixtures = [name.strip() for name in self.fixtures_input.text().split(',') if name.strip()]
+        if not fixtures:
+            self.result_box.append("请先填写治具")
+            return
+        try:
+            plan = TestPlan.load(self.plan_input.text().strip())
+        except (OSError, PlanError) as e:
+            self.result_box.append(f"加载测试流程失败: {e}")
+            return
+        if self.station is not None and self.stats()['testing']:
+            self.result_box.append("仍有治具在测试, 请稍后再切换")
+            return
+        self.station = ScanStation(plan, fixtures, get_results_database(), on_event=self.station_event.emit)
+        self.fixture_table.setRowCount(len(fixtures))
+        self.result_box.append(f"测试流程 {plan.name}, 治具: {', '.join(fixtures)}")
+        self.refresh_status()
+        self.stats_timer.start(1000)
+        self.input_line.setFocus()
+
+    def stats(self):
+        return self.station.stats() if self.station else {}
 
     def record_scan(self):
         data = self.input_line.text().strip()
         if data:
-            self.result_box.append(data)
             self.input_line.clear()
+            if self.station is None:
+                self.result_box.append(data)
+                return
+            self.station.scan(data)
+
+    def handle_station_event(self, event):
+        kind = event['event']
+        if kind == 'scan' and event['kind'] == 'fixture':
+            self.result_box.append(f"已选择治具 {event['fixture']}")
+        elif kind == 'scan':
+            note = f" (复测, 上次结果: {event['previous']})" if event['kind'] == SCAN_RETEST else ""
+            self.result_box.append(f"{event['serial']} -> 治具 {event['fixture']}{note}")
+        elif kind == 'rejected':
+            self.result_box.append(f"{event['serial']} 已拒绝: {event['reason']}")
+        elif kind == 'step' and 'scan_latency_ms' in event:
+            self.result_box.append(f"{event['serial']} 开始测试, 扫码到首条命令 {event['scan_latency_ms']:.0f} ms")
+        elif kind == 'finished':
+            message = f" - {event['message']}" if event.get('message') else ""
+            self.result_box.append(f"{event['serial']} 测试结束: {event['result']}{message}")
+        elif kind == 'index_loaded':
+            self.result_box.append(f"已加载 {event['serials']} 个序列号的测试记录 ({event['load_ms']:.0f} ms)")
+        if kind != 'step':
+            self.refresh_status()
+
+    def refresh_status(self):
+        if self.station is None:
+            return
+        for row, fixture in enumerate(self.station.fixtures.values()):
+            values = [fixture.name, fixture.device or "-", fixture.serial or "-",
+                      "测试中" if fixture.state == FIXTURE_TESTING else "空闲", fixture.result or "-"]
+            for col, value in enumerate(values):
+                self.fixture_table.setItem(row, col, QTableWidgetItem(value))
+        stats = self.stats()
+        text = f"产出: {stats['per_hour']} 块/小时  扫码: {stats['scans']}  拒绝: {stats['rejected']}"
+        if 'latency_ms' in stats:
+            text += f"  扫码到开始: 平均 {stats['latency_ms']:.0f} ms, P95 {stats['latency_p95_ms']:.0f} ms"
+        self.stats_label.setText(text)
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     win = ScanWindow()
     win.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(app.exec())
@@ -1,146 +1,153 @@
-from datetime import datetime
 import serial
-import threading
-import time
 from PyQt6.QtCore import QObject, pyqtSignal
+from core.alarms import get_alarm_engine
+from core.clock import StampedFrame
+from core.codec import CMD_STOP, build_frame, parse_hex, FrameParser
+from core.polling import StatusPoller
+from core.telemetry import get_telemetry_store
+from core.transactions import TransactionEngine
+from controllers.timing_analyzer import TimingAnalyzer
+from controllers.write_scheduler import PRIORITY_USER
+from controllers.port_registry import get_port_registry, PortLeaseError, EVENT_CONNECTED
 
 
 class SerialController(QObject):
-    data_received = pyqtSignal(bytearray)
+    # 接收到的数据块为 StampedFrame, 其 ts_ns 为读线程 read() 返回时的单调时钟时间戳
+    data_received = pyqtSignal(object)
     command_sent = pyqtSignal(str)
+    # 已写出的帧 (StampedFrame), ts_ns 为 write() 返回后的时间戳
+    frame_sent = pyqtSignal(object)
+    # 设备掉线 (False) / 自动重连成功 (True)
+    connection_changed = pyqtSignal(bool)
+    # 自动轮询得到的 0x21 状态样本 (字段见 core.telemetry)
+    status_sampled = pyqtSignal(dict)
+    # 本串口的报警触发/清除事件 (字段见 core.alarms)
+    alarm_event = pyqtSignal(dict)
 
-    def __init__(self):
+    def __init__(self, consumer_name="serial", exclusive_writer=False):
         super().__init__()
-        self.serial_port = None
         self.running = False
-        self.data_buffer = bytearray()  # 添加数据缓冲区
-        self.frame_start = 0x10  # 帧起始标记
-        self.frame_end = 0x03    # 帧结束标记
-        self.escape_byte = 0x10  # 转义字节
+        self.consumer_name = consumer_name        # 在串口注册表中显示的使用方名称
+        self.exclusive_writer = exclusive_writer  # 是否申请独占写权限
+        self.lease = None  # 串口租约, 打开串口时从注册表获取
+        self.timing_analyzer = TimingAnalyzer()  # 帧时序分析
+        self._timing_parser = FrameParser()
+        self.transactions = TransactionEngine(self.send_command)  # 请求-应答事务 (同一时刻只有一条在途)
+        self.telemetry = get_telemetry_store()  # 解析后的 0x21 状态样本
+        self.status_poller = StatusPoller(self.transactions, on_sample=self.status_sampled.emit)  # 自适应状态轮询
+        self._resume_polling = False  # 关闭串口时轮询在运行, 重新打开后自动恢复
+        self.alarms = get_alarm_engine()  # 串口打开期间监听本串口的报警事件
+
+    @property
+    def serial_port(self):
+        """当前串口对象, 掉线重连后会替换为新对象, 所以每次都从租约获取"""
+        return self.lease.serial_port if self.lease else None
+
+    @property
+    def port_name(self):
+        """当前串口名 (遥测数据源名称), 未打开时返回 None"""
+        return self.lease.port.port_name if self.lease else None
+
+    @property
+    def connected(self):
+        """串口已打开且设备在线"""
+        return bool(self.lease and self.lease.is_connected)
 
     def open_port(self, port_name, baud_rate):
+        """从串口注册表获取租约; 串口已被其他面板打开时直接共享
+
+        port_name 可以是本地串口名, 也可以是 tcp://host:port 或 rfc2217://host:port
+        """
         try:
-            self.serial_port = serial.Serial(
-                port=port_name,
-                baudrate=baud_rate,
-                timeout=1,
-                bytesize=serial.EIGHTBITS,
-                parity=serial.PARITY_NONE,
-                stopbits=serial.STOPBITS_ONE
-            )
+            self._timing_parser.reset()
+            self.lease = get_port_registry().acquire(
+                port_name, baud_rate, self.consumer_name,
+                on_data=self._on_data_received,
+                on_sent=self._on_frame_written,
+                on_event=self._on_port_event,
+                exclusive_writer=self.exclusive_writer)
             self.running = True
-            threading.Thread(target=self.read_data, daemon=True).start()
-            print(f"Serial port {port_name} opened at {baud_rate} baud.")
-        except serial.SerialException as e:
+            self.alarms.register_stop(self.port_name, self.stop_motor)
+            self.alarms.add_listener(self._on_alarm)
+            if self._resume_polling:
+                self.status_poller.start()
+        except (serial.SerialException, OSError, ValueError, PortLeaseError) as e:
             print(f"Failed to open serial port: {e}")
-            self.serial_port = None
+            self.lease = None
 
     def close_port(self):
+        """释放租约, 没有其他使用方时串口才真正关闭"""
         self.running = False
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.close()
-            print("Serial port closed.")
+        self._resume_polling = self.status_poller.is_running
+        self.status_poller.stop()
+        self.transactions.cancel_all("串口已关闭")
+        if self.lease:
+            self.alarms.unregister_stop(self.port_name, self.stop_motor)
+            self.alarms.remove_listener(self._on_alarm)
+            self.lease.release()
+            self.lease = None
+
+    def send_command(self, command, priority=PRIORITY_USER, deadline=None, coalesce_key=None):
+        """将命令放入发送队列
 
-    def send_command(self, command):
-        """发送命令到串口"""
+        priority: 优先级, 见 write_scheduler 中的 PRIORITY_*
+        deadline: 相对截止时间(秒), 过期未发出则丢弃
+        coalesce_key: 周期帧合并标识, 新帧会替换队列中未发出的旧帧
+        """
         try:
-            
-            # 将命令字符串转换为字节
-            
             if isinstance(command, str):
                 # 处理十六进制字符串 (例如 "10 02 21 00...")
-                # cmd_bytes = bytearray.fromhex(command)
-                # 清理字符串，只保留有效的十六进制字符
-                clean_hex = ''.join(c for c in command if c.isalnum() or c.isspace())
-                cmd_bytes = bytearray.fromhex(clean_hex)
+                cmd_bytes = parse_hex(command)
             else:
                 # 处理已经是字节的情况
-                cmd_bytes = command
-                
-            # 发送到串口
-            self.serial_port.write(cmd_bytes)
-            
-            # 通知命令已发送（发送字节数据）- 将bytes转换为hex字符串
-            hex_str = ' '.join(f'{b:02x}' for b in cmd_bytes)
-            self.command_sent.emit(hex_str)
-            
-            return True
+                cmd_bytes = bytes(command)
+
+            if not self.lease:
+                print("发送命令失败: 串口未打开")
+                return False
+            return self.lease.send(cmd_bytes, priority, deadline, coalesce_key)
         except Exception as e:
             print(f"发送命令失败: {str(e)}")
             return False
-        
-    def read_data(self):
-        while self.running and self.serial_port and self.serial_port.is_open:
-            try:
-                if self.serial_port.in_waiting:
-                    data = self.serial_port.read(self.serial_port.in_waiting)
-                    if data:
-                        self.data_received.emit(bytearray(data))  # Convert bytes to bytearray
-            except Exception as e:
-                print(f"Error reading from serial port: {e}")
-            time.sleep(0.01)  # Changed from threading.sleep to time.sleep
-
-    def read_serial(self):
-        """读取串口数据的线程方法"""
-        while self.running:
-            try:
-                if self.serial_port.in_waiting > 0:
-                    # 读取所有可用数据
-                    raw_data = self.serial_port.read(self.serial_port.in_waiting)
-                    
-                    # 将新数据添加到缓冲区
-                    self.data_buffer.extend(raw_data)
-                    
-                    # 处理缓冲区中的完整帧
-                    self.process_buffer()
-                    
-            except Exception as e:
-                print(f"读取串口数据时发生错误: {str(e)}")
-                break
-                
-            # 小暂停，避免占用过多CPU
-            time.sleep(0.01)
-
-    def process_buffer(self):
-        """处理缓冲区中的数据，提取完整帧"""
-        # 确保缓冲区有足够数据
-        while len(self.data_buffer) >= 4:  # 最小帧长度
-            # 查找帧起始
-            try:
-                start_idx = self.data_buffer.index(self.frame_start)
-                
-                # 移除起始位置之前的数据
-                if start_idx > 0:
-                    self.data_buffer = self.data_buffer[start_idx:]
-                    
-                # 如果缓冲区第二个字节不是0x02，可能不是有效帧
-                if len(self.data_buffer) > 1 and self.data_buffer[1] != 0x02:
-                    self.data_buffer = self.data_buffer[1:]
-                    continue
-                    
-                # 查找帧结束
-                try:
-                    # 从第二个字节开始查找帧结束标记
-                    end_idx = self.data_buffer.index(self.frame_end, 1)
-                    
-                    # 提取完整帧
-                    frame = self.data_buffer[:end_idx+1]
-                    
-                    # 从缓冲区移除已处理的数据
-                    self.data_buffer = self.data_buffer[end_idx+1:]
-                    
-                    # 发送完整帧
-                    if len(frame) >= 4:  # 确保帧长度有效
-                        self.data_received.emit(frame)
-                        
-                except ValueError:
-                    # 未找到结束标记，等待更多数据
-                    break
-                    
-            except ValueError:
-                # 未找到起始标记，清空缓冲区
-                self.data_buffer.clear()
-                break
+
+    def _on_data_received(self, chunk):
+        """读线程回调: 记录时序、匹配事务、写入遥测, 再转发给界面"""
+        for frame in self._timing_parser.feed(chunk):
+            frame = StampedFrame(frame, chunk.ts_ns)
+            self.timing_analyzer.record_frame('rx', frame, chunk.ts_ns)
+            self.transactions.feed(frame)
+            self.telemetry.record_frame(self.port_name, frame)
+        self.data_received.emit(chunk)
+
+    def stop_motor(self):
+        """报警 stop 动作: 经事务引擎发送 0x80 (在读线程中调用)"""
+        self.transactions.submit(build_frame(CMD_STOP))
+
+    def _on_alarm(self, event):
+        """报警引擎回调 (读线程), 只转发本串口的事件"""
+        if self.lease and event['source'] == self.port_name:
+            self.alarm_event.emit(event)
+
+    def _on_port_event(self, event):
+        """读线程回调: 掉线时丢弃半帧, 重连后从新数据重新同步"""
+        self._timing_parser.reset()
+        if event != EVENT_CONNECTED:
+            self.transactions.cancel_all("串口连接断开")
+        self.connection_changed.emit(event == EVENT_CONNECTED)
+
+    def _on_frame_written(self, frame):
+        """发送线程写出一帧后调用"""
+        self.timing_analyzer.record_frame('tx', frame, frame.ts_ns)
+        self.frame_sent.emit(frame)
+        # 通知命令已发送（发送字节数据）- 将bytes转换为hex字符串
+        hex_str = ' '.join(f'{b:02x}' for b in frame)
+        self.command_sent.emit(hex_str)
+
+    def write_stats(self):
+        """返回发送队列统计 (队列深度、截止超时等)"""
+        if not self.lease:
+            return None
+        return self.lease.write_stats()
 
     @staticmethod
     def list_ports():
@@ -1,5 +1,8 @@
 from PyQt6.QtCore import QObject, pyqtSignal
-from datetime import datetime
+from controllers.write_scheduler import PRIORITY_REPLY
+from core.clock import format_timestamp, timestamp_of
+from core.codec import CMD_GEAR, CMD_STATUS, CMD_VERSION, checksum, decode_status, decode_version
+from core.simulators import simulator_reply
 
 class SerialDataController(QObject):
 
@@ -53,16 +56,10 @@ class SerialDataController(QObject):
                 return
             
             # 处理数据
-            response = ""
             CMD = data[2]
-            if CMD == 0x83:
+            if CMD == CMD_GEAR:
                 # 读取档位命令：
                 # 发送：CMD = 0x83  DATA0 = 速度档位信息 DATA1 = 时间档位信息
-                # 读系统参数：
-                # 发送：CMD = 0x83  DATA0 = 0 	DATA1 = 0
-                # 应答：格式同发送 
-                # 发送：CMD = 0x83  DATA0 = 速度档位信息 DATA1 = 时间档位信息;
-                response = "10 02 83 00 01 96 10 03"
                 # 调整档位信息
                 speed_gear = data[3]
                 time_gear = data[4]
@@ -72,50 +69,11 @@ class SerialDataController(QObject):
                 self.control_widget.update_knob_label(self.control_widget.speed_knob, self.control_widget.speed_knob_label)
                 self.control_widget.update_knob_label(self.control_widget.time_knob, self.control_widget.time_knob_label)
                 print(f"Speed Gear: {speed_gear}, Time Gear: {time_gear}")
-                                
-            elif CMD == 0x82:
-                # 设定转速
-                # 发送：CMD = 0x82  DATA0 ~DATA1：设定转速值
-                # 发送：CMD = 0x82  DATA0 ~DATA1：设定转速值
-                # 应答：格式同发送  DATA0 = 0  DATA1 = ACK
-                response = "10 02 82 00 01 95 10 03"
-                
-            elif CMD == 0x81:   
-                # 电机运行
-                # 发送：CMD = 0x81  DATA0 = 0 	DATA1 = 0
-                # 应答：格式同发送  DATA0 = 0  DATA1 = ACK
-                response = "10 02 81 00 01 94 10 03"
-
-            elif CMD == 0x80:
-                # 电机停止
-                # 发送：CMD = 0x80  DATA0 = 0 	DATA1 = 0
-                # 应答：格式同发送  DATA0 = 0  DATA1 = ACK
-                response = "10 02 80 00 01 93 10 03"
 
-            elif CMD == 0x21:
-                # 处理命令5# 读系统参数：
-                # 发送：CMD = 0x21  DATA0 = 0 	DATA1 = 0
-                # 应答：格式同发送
-                # DATA0：系统状态
-                # DATA1~DATA2：电机转速值
-                # DATA3~DATA4：电压值
-                # DATA5：IPM温度值
-                # DATA6~DATA7：输出功率值 
-                response = "10 02 21 23 00 00 00 37 1C 00 00 A9 10 03"
-
-                # self.control_widget.toggle_light(light_color)
-                
-            elif CMD == 0x20:
-                # 读取软件版本：
-                # 发送：CMD = 0x20  DATA0 = 0 	DATA1 = 0
-                # 应答：格式同发送
-                # DATA0 ~DATAn：版本信息(ASCII码)
-                response = "10 02 20 56 44 32 2E 30 2E 30 BA 10 03"
-                
-                # self.control_widget.software_version_label.setText(software_version_str)
-
-            # 测试控制板时，需要将应答数据发送到串口
-            self.serial_controller.send_command(response) 
+            # 测试控制板时，需要将应答数据发送到串口 (各命令的应答见 core.simulators)
+            response = simulator_reply(data)
+            if response:
+                self.serial_controller.send_command(response, priority=PRIORITY_REPLY)
 
         except Exception as e:
             print(f"Error processing received data: {e}")
@@ -186,71 +144,24 @@ class SerialDataController(QObject):
                 # 应答：格式同发送  DATA0 = 0  DATA1 = ACK
                 print("Received motor CMD 0x80")
 
-            elif CMD == 0x21:
-                # 处理命令5# 读系统参数：
-                # 发送：CMD = 0x21  DATA0 = 0 	DATA1 = 0
-                # 应答：格式同发送
-                # DATA0：系统状态
-                # DATA1~DATA2：电机转速值
-                # DATA3~DATA4：电压值
-                # DATA5：IPM温度值
-                # DATA6~DATA7：输出功率值 
-                # 此处应该解析并在界面上展示电机板的应答数据
-                status = data[3]
-
-                light_color = ""
-                system_status = ""
-                if status == 0x00:
-                    light_color = "red"
-                    system_status = "停止"
-                elif status == 0x20 or status == 0x21 or status == 0x22 or status == 0x23 or status == 0x24 or status == 0x25 or status == 0x26 or status == 0x27 or status == 0x28 or status == 0x29 or status == 0x2A or status == 0x2B or status == 0x50:
-                    light_color = "blue"
-                    system_status = "故障"
-                elif status == 0x0B:
-                    light_color = "green"
-                    system_status = "运行"
-                else:
-                    print(f"Unknown status: {status}")
-
-                print(f"System Status: {system_status}, Light Color: {light_color}")
-
-                if data_length < 10:
-                    # 电机停止
-                    system_status = "停止"
-                    light_color = "red"
-                    self.motor_widget.system_status_label.setText(system_status)
+            elif CMD == CMD_STATUS:
+                # 读系统参数应答, 解析并在界面上展示 (字段见 core.codec.decode_status)
+                sample = decode_status(data)
+                if sample is None:
+                    # 数据不完整时按电机停止显示
+                    self.motor_widget.system_status_label.setText("停止")
                     self.motor_widget.set_light_status("red")
-                    self.motor_widget.set_light_status(light_color)
                     self.motor_widget.motor_speed_label.setText("0 RPM")
                     self.motor_widget.voltage_label.setText("0 V")
                     self.motor_widget.temperature_label.setText("0 °C")
                     self.motor_widget.power_label.setText("0 W")
                 else:
-                    motor_speed = (data[4] << 8) | data[5]
-                    voltage = (data[6] << 8) | data[7]
-                    temperature = data[8]
-                    power = (data[9] << 8) | data[10]
-                    motor_speed = (data[4] << 8) | data[5]  
-                    motor_speed_actual = motor_speed / 1
-                    voltage_actual = voltage / 1.0  
-                    temperature_actual = temperature / 1.0  
-                    power_actual = power / 1
-                    self.motor_widget.system_status_label.setText(system_status)
-                    self.motor_widget.motor_speed_label.setText(f"{motor_speed_actual} RPM")
-                    self.motor_widget.voltage_label.setText(f"{voltage_actual}")
-                    self.motor_widget.temperature_label.setText(f"{temperature_actual} °C")
-                    self.motor_widget.power_label.setText(f"{power_actual} W")
-                
+                    print(f"System Status: {sample['status']:02X}")
+                    self.motor_widget.show_status(dict(sample, ts_ns=timestamp_of(data)))
 
-            elif CMD == 0x20:
-                # 读取软件版本：
-                # 发送：CMD = 0x20  DATA0 = 0 	DATA1 = 0
-                # 应答：格式同发送
-                # DATA0 ~DATAn：版本信息(ASCII码)
-                # response = "10 02 20 56 44 32 2E 30 2E 30 BA 10 03"
-                software_version_bytes = data[3:-3]  # Excluding header, cmd, checksum and footer
-                software_version_str = ''.join([chr(b) for b in software_version_bytes])
-                self.motor_widget.version_label.setText(software_version_str)
+            elif CMD == CMD_VERSION:
+                # 读取软件版本应答, DATA0 ~ DATAn: 版本信息(ASCII码)
+                self.motor_widget.version_label.setText(decode_version(data))
 
         except Exception as e:
             print(f"Error processing received data: {e}")
@@ -260,8 +171,8 @@ class SerialDataController(QObject):
     def record_received_data(self, data):
         """记录接收到的数据"""
         try:
-            # 获取当前时间戳
-            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+            # 使用读线程在 read() 时记录的时间戳
+            timestamp = format_timestamp(timestamp_of(data))
             
             # 转换数据为十六进制
             hex_data = ' '.join([f"{byte:02X}" for byte in data])
@@ -275,9 +186,6 @@ class SerialDataController(QObject):
 
 
     def calculate_checksum(self, data):
-        """计算数据的校验和"""
-        checksum = 0
-        for byte in data[0:-3]:
-            checksum += byte
-        return checksum & 0xFF  # 取低8位
+        """计算数据的校验和 (帧尾之前、校验字节之前的所有字节)"""
+        return checksum(data[0:-3])
     
\ No newline at end of file
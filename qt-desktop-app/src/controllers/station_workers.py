@@ -0,0 +1,352 @@
+"""多工位分片运行
+
+每个工作进程负责一组串口, 在进程内完成分帧、请求-应答事务 (core.transactions) 和遥测存储
+(core.telemetry, 每个进程一份), 并按固定频率从遥测存储生成精简的工位状态快照发布给 GUI 进程。
+GUI 进程只负责显示, 不再受单核 GIL 限制。
+
+每个工位有一个读线程 (阻塞读, 掉线后自动重连); 主循环阻塞在控制队列上, 最长等到下一次轮询或快照。
+
+工作进程在第一次分配到工位时才启动。工作进程经快照队列上报两种消息:
+    ('snapshot', worker_id, ts, {串口名: 快照元组})
+    ('removed', worker_id, 串口名)      工位已移除且串口已关闭
+平衡负载时先等原进程确认移除 (串口已关闭), 再把工位加到新进程, 避免两个进程同时打开一个串口。
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+
+from core.clock import StampedFrame
+from core.codec import FrameParser, build_frame, CMD_STATUS
+from core.telemetry import TelemetryStore
+from core.transactions import TransactionEngine
+
+# 快照字段顺序: (已连接, 状态, 转速, 电压, 温度, 功率, 接收帧数, 错误数, 最后应答时间)
+SNAPSHOT_FIELDS = ('connected', 'status', 'speed', 'voltage', 'temperature',
+                   'power', 'rx_frames', 'errors', 'last_reply')
+
+READ_TIMEOUT = 0.1       # 读线程阻塞读超时 (秒), 也是移除工位时等待读线程退出的上限
+REOPEN_DELAY = 1.0       # 打开失败或掉线后的重连间隔 (秒)
+SAMPLE_CAPACITY = 100    # 工作进程内每个工位保留的样本数, 快照只用最新一条
+
+
+class _Station:
+    """工作进程内的单个工位: 读线程负责收帧和重连, 轮询和下发命令经事务引擎串行化"""
+
+    def __init__(self, port_name, baud_rate, telemetry):
+        self.port_name = port_name
+        self.baud_rate = baud_rate
+        self.telemetry = telemetry
+        self.serial_port = None
+        self.parser = FrameParser()
+        self.transactions = TransactionEngine(self._write)
+        self.rx_frames = 0
+        self.errors = 0
+        self.running = True
+        self._stop = threading.Event()
+        self._reader = threading.Thread(target=self._read_loop, name=f"station-{port_name}", daemon=True)
+        self._reader.start()
+
+    def _open(self):
+        try:
+            import serial
+            self.parser.reset()
+            self.serial_port = serial.Serial(self.port_name, self.baud_rate, timeout=READ_TIMEOUT,
+                                             write_timeout=READ_TIMEOUT, exclusive=True)
+            return True
+        except Exception as e:
+            self.errors += 1
+            self.serial_port = None
+            print(f"[worker] 打开串口失败 {self.port_name}: {e}")
+            return False
+
+    def _close_port(self):
+        serial_port, self.serial_port = self.serial_port, None
+        if serial_port:
+            try:
+                serial_port.close()
+            except Exception:
+                pass
+
+    def _read_loop(self):
+        """读线程: 阻塞等待首字节, 分帧后交给事务引擎和遥测存储"""
+        while self.running:
+            if self.serial_port is None and not self._open():
+                self._stop.wait(REOPEN_DELAY)
+                continue
+            try:
+                data = self.serial_port.read(1)
+                if not data:
+                    continue
+                ts_ns = time.monotonic_ns()
+                waiting = self.serial_port.in_waiting
+                if waiting:
+                    data += self.serial_port.read(waiting)
+            except Exception as e:
+                if not self.running:
+                    break
+                self.errors += 1
+                print(f"[worker] 串口异常 {self.port_name}: {e}")
+                self._close_port()
+                self.transactions.cancel_all("串口连接断开")
+                self._stop.wait(REOPEN_DELAY)
+                continue
+            for frame in self.parser.feed(data):
+                frame = StampedFrame(frame, ts_ns)
+                self.rx_frames += 1
+                self.transactions.feed(frame)
+                self.telemetry.record_frame(self.port_name, frame)
+
+    def _write(self, frame):
+        """事务引擎的发送函数, 返回 False 表示发送失败"""
+        serial_port = self.serial_port
+        if serial_port is None:
+            return False
+        try:
+            serial_port.write(frame)
+            return True
+        except Exception:
+            self.errors += 1
+            return False
+
+    def poll(self, poll_frame):
+        """上一条请求已结束时提交一次状态轮询"""
+        if self.serial_port is not None and not self.transactions.stats()['pending']:
+            self.transactions.submit(poll_frame)
+
+    def send(self, frame):
+        """下发 GUI 进程的命令 (例如报警停机), 与轮询共用事务引擎, 避免应答错配"""
+        if self.serial_port is not None:
+            self.transactions.submit(frame)
+
+    def close(self):
+        """停止读线程并关闭串口, 返回后串口已释放"""
+        self.running = False
+        self._stop.set()
+        self.transactions.cancel_all("工位已移除")
+        self._close_port()
+        self._reader.join(READ_TIMEOUT * 2)
+        self._close_port()  # 读线程可能在 close 之后刚重新打开
+        self.telemetry.clear(self.port_name)
+
+    def snapshot(self):
+        sample = self.telemetry.latest(self.port_name) or {}
+        stats = self.transactions.stats()
+        return (self.serial_port is not None,
+                sample.get('status'), sample.get('speed'), sample.get('voltage'),
+                sample.get('temperature'), sample.get('power'),
+                self.rx_frames, self.errors + stats['timeouts'],
+                sample['ts_ns'] / 1e9 if sample else 0.0)
+
+
+def station_worker_main(worker_id, port_names, baud_rate, command_queue, snapshot_queue,
+                        snapshot_interval, poll_interval):
+    """工作进程入口 (spawn 方式启动, 不导入 Qt)"""
+    telemetry = TelemetryStore(capacity=SAMPLE_CAPACITY)
+    stations = {name: _Station(name, baud_rate, telemetry) for name in port_names}
+    poll_frame = build_frame(CMD_STATUS)
+    next_poll = next_snapshot = time.monotonic()
+
+    running = True
+    while running:
+        now = time.monotonic()
+        if now >= next_poll:
+            for station in stations.values():
+                station.poll(poll_frame)
+            next_poll = now + poll_interval
+        if now >= next_snapshot:
+            snapshot = {name: station.snapshot() for name, station in stations.items()}
+            try:
+                snapshot_queue.put_nowait(('snapshot', worker_id, now, snapshot))
+            except queue.Full:
+                pass  # GUI 来不及消费时丢弃旧快照
+            next_snapshot = now + snapshot_interval
+
+        # 等待来自 GUI 进程的控制消息, 最长等到下一次轮询或快照
+        try:
+            message = command_queue.get(timeout=max(0.0, min(next_poll, next_snapshot) - time.monotonic()))
+        except queue.Empty:
+            continue
+        kind = message[0]
+        if kind == 'stop':
+            running = False
+        elif kind == 'add' and message[1] not in stations:
+            stations[message[1]] = _Station(message[1], baud_rate, telemetry)
+        elif kind == 'remove':
+            if message[1] in stations:
+                stations.pop(message[1]).close()
+            snapshot_queue.put(('removed', worker_id, message[1]))
+        elif kind == 'send' and message[1] in stations:
+            stations[message[1]].send(message[2])
+
+    for station in stations.values():
+        station.close()
+
+
+class StationSupervisor:
+    """工作进程管理器
+
+    负责把串口分配到各工作进程、端口增删时重新平衡,
+    以及在工作进程崩溃后单独重启它, 不影响其他工位。
+    工作进程在第一次分配到工位时才启动, add_port 时自动 start()。
+    """
+
+    def __init__(self, worker_count=None, baud_rate=9600, snapshot_interval=0.2, poll_interval=0.05):
+        self.worker_count = max(1, worker_count or multiprocessing.cpu_count())
+        self.baud_rate = baud_rate
+        self.snapshot_interval = snapshot_interval
+        self.poll_interval = poll_interval
+        # Qt 进程中不能 fork, 统一使用 spawn
+        self._context = multiprocessing.get_context('spawn')
+        self._snapshot_queue = self._context.Queue(maxsize=self.worker_count * 8)
+        self._workers = {}       # worker_id -> (process, command_queue)
+        self._assignment = {}    # worker_id -> set(port_name)
+        self._migrating = {}     # port_name -> (原 worker_id, 新 worker_id), 等待原进程确认移除
+        self.snapshots = {}      # port_name -> dict
+        self.restart_count = 0
+        self.running = False
+
+    def start(self):
+        self.running = True
+        for worker_id in range(self.worker_count):
+            self._assignment.setdefault(worker_id, set())
+
+    def stop(self):
+        self.running = False
+        for process, command_queue in self._workers.values():
+            command_queue.put(('stop',))
+        for process, _ in self._workers.values():
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        self._workers.clear()
+        self._migrating.clear()
+
+    def _spawn(self, worker_id):
+        command_queue = self._context.Queue()
+        process = self._context.Process(
+            target=station_worker_main,
+            args=(worker_id, sorted(self._assignment[worker_id] - self._arriving(worker_id)), self.baud_rate,
+                  command_queue, self._snapshot_queue, self.snapshot_interval, self.poll_interval),
+            name=f"station-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self._workers[worker_id] = (process, command_queue)
+
+    def _arriving(self, worker_id):
+        """正迁移到该进程、尚未确认移出原进程的工位"""
+        return {port_name for port_name, (_, target) in self._migrating.items() if target == worker_id}
+
+    def _worker_of(self, port_name):
+        for worker_id, ports in self._assignment.items():
+            if port_name in ports:
+                return worker_id
+        return None
+
+    def port_names(self):
+        """所有已分配到工作进程的串口"""
+        return set().union(*self._assignment.values())
+
+    def _send(self, worker_id, message):
+        if worker_id in self._workers:
+            self._workers[worker_id][1].put(message)
+
+    def _add_to_worker(self, worker_id, port_name):
+        """把已分配的工位交给工作进程, 进程未启动时带着工位启动"""
+        if worker_id in self._workers:
+            self._send(worker_id, ('add', port_name))
+        else:
+            self._spawn(worker_id)
+
+    def add_port(self, port_name):
+        """添加工位, 分配给负载最小的工作进程"""
+        if self._worker_of(port_name) is not None:
+            return
+        if not self.running:
+            self.start()
+        worker_id = min(self._assignment, key=lambda w: len(self._assignment[w]))
+        self._assignment[worker_id].add(port_name)
+        self._add_to_worker(worker_id, port_name)
+
+    def remove_port(self, port_name):
+        """移除工位, 并在负载不均时迁移一个工位"""
+        worker_id = self._worker_of(port_name)
+        if worker_id is None:
+            return
+        self._assignment[worker_id].discard(port_name)
+        self._migrating.pop(port_name, None)
+        self._send(worker_id, ('remove', port_name))
+        self.snapshots.pop(port_name, None)
+        self.rebalance()
+
+    def rebalance(self):
+        """每次只迁移一个工位, 直到各进程负载相差不超过1
+
+        工位先从原进程移除, 收到移除确认后才加到新进程 (见 poll_snapshots)。
+        """
+        while True:
+            busiest = max(self._assignment, key=lambda w: len(self._assignment[w]))
+            idlest = min(self._assignment, key=lambda w: len(self._assignment[w]))
+            if len(self._assignment[busiest]) - len(self._assignment[idlest]) <= 1:
+                break
+            port_name = sorted(self._assignment[busiest])[-1]
+            self._assignment[busiest].discard(port_name)
+            self._assignment[idlest].add(port_name)
+            if busiest in self._workers:
+                self._migrating[port_name] = (busiest, idlest)
+                self._send(busiest, ('remove', port_name))
+            else:
+                self._add_to_worker(idlest, port_name)
+
+    def _finish_migration(self, port_name):
+        """原进程已不再持有工位, 把它加到新进程"""
+        _, target = self._migrating.pop(port_name)
+        if port_name in self._assignment[target]:
+            self._add_to_worker(target, port_name)
+
+    def send(self, port_name, frame):
+        """向指定工位发送原始帧"""
+        worker_id = self._worker_of(port_name)
+        if worker_id is not None:
+            self._send(worker_id, ('send', port_name, bytes(frame)))
+
+    def check_workers(self):
+        """重启意外退出的工作进程"""
+        if not self.running:
+            return
+        for worker_id, (process, _) in list(self._workers.items()):
+            if not process.is_alive():
+                print(f"工作进程 {worker_id} 已退出 (exitcode={process.exitcode}), 正在重启")
+                self.restart_count += 1
+                for port_name in self._assignment[worker_id]:
+                    if port_name in self.snapshots:
+                        self.snapshots[port_name]['connected'] = False
+                # 崩溃的进程已释放正在迁出的串口, 不必再等移除确认
+                for port_name, (source, _) in list(self._migrating.items()):
+                    if source == worker_id:
+                        self._finish_migration(port_name)
+                self._spawn(worker_id)
+
+    def poll_snapshots(self):
+        """取出所有待处理快照, 返回 {port_name: 状态字典}; 由 GUI 定时器调用"""
+        self.check_workers()
+        while True:
+            try:
+                message = self._snapshot_queue.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == 'removed':
+                _, worker_id, port_name = message
+                if self._migrating.get(port_name, (None,))[0] == worker_id:
+                    self._finish_migration(port_name)
+                continue
+            _, worker_id, ts, snapshot = message
+            for port_name, values in snapshot.items():
+                # 忽略已迁移到其他进程的工位的过期快照
+                if port_name in self._assignment.get(worker_id, ()):
+                    state = dict(zip(SNAPSHOT_FIELDS, values))
+                    state['worker'] = worker_id
+                    self.snapshots[port_name] = state
+        return self.snapshots
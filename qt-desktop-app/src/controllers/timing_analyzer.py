@@ -0,0 +1,201 @@
+"""帧时序分析
+
+按 CMD 和方向统计帧间隔, 以及请求到应答的延迟。
+直方图采用 HDR 风格的对数分桶 (每个2的幂区间再均分32个子桶, 相对误差约3%),
+内存占用固定, 可以长时间在线运行。超出门限的样本记录为异常点。
+"""
+
+import collections
+import csv
+import json
+import threading
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_BIT_LENGTH = 45          # 2^45 ns ≈ 9.7 小时
+BUCKET_COUNT = (MAX_BIT_LENGTH - SUB_BUCKET_BITS) * SUB_BUCKETS + SUB_BUCKETS
+
+KIND_INTERVAL = 'interval'   # 同 CMD 同方向相邻两帧的间隔
+KIND_LATENCY = 'latency'     # 发出请求到收到同 CMD 应答的延迟
+
+
+def _bucket_index(value):
+    if value < SUB_BUCKETS:
+        return value
+    bits = value.bit_length()
+    if bits > MAX_BIT_LENGTH:
+        return BUCKET_COUNT - 1
+    return (bits - SUB_BUCKET_BITS) * SUB_BUCKETS + (value >> (bits - SUB_BUCKET_BITS - 1)) - SUB_BUCKETS
+
+
+def _bucket_lower_bound(index):
+    if index < SUB_BUCKETS * 2:
+        return index
+    bits = index // SUB_BUCKETS + SUB_BUCKET_BITS
+    return ((index % SUB_BUCKETS) + SUB_BUCKETS) << (bits - SUB_BUCKET_BITS - 1)
+
+
+def _bucket_midpoint(index):
+    if index < SUB_BUCKETS * 2:
+        return index
+    bits = index // SUB_BUCKETS + SUB_BUCKET_BITS
+    return _bucket_lower_bound(index) + (1 << (bits - SUB_BUCKET_BITS - 2))
+
+
+class LogHistogram:
+    """固定内存的对数直方图 (单位: ns)"""
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        value = max(0, int(value))
+        self.counts[_bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """返回百分位数的近似值 (所在桶的中点)"""
+        if not self.count:
+            return 0
+        target = max(1, int(round(self.count * p / 100.0)))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(max(_bucket_midpoint(index), self.min), self.max)
+        return self.max
+
+    def buckets(self):
+        """返回非空桶 [(下界ns, 计数)]"""
+        return [(_bucket_lower_bound(i), n) for i, n in enumerate(self.counts) if n]
+
+
+class TimingAnalyzer:
+    """在线帧时序分析器
+
+    record(direction, cmd, ts_ns) 由收发路径调用, direction 为 'rx' 或 'tx'。
+    """
+
+    def __init__(self, max_outliers=1000):
+        self._lock = threading.Lock()
+        self._histograms = {}    # (cmd, direction, kind) -> LogHistogram
+        self._last_seen = {}     # (cmd, direction) -> ts_ns
+        self._pending = {}       # cmd -> 请求发出时间 ts_ns
+        self._limits = {}        # (cmd, direction, kind) -> (min_ns, max_ns)
+        self.outliers = collections.deque(maxlen=max_outliers)
+
+    def set_limit(self, cmd, kind, min_ms=None, max_ms=None, direction='rx'):
+        """设置门限 (毫秒), 超出范围的样本记为异常"""
+        min_ns = int(min_ms * 1e6) if min_ms is not None else None
+        max_ns = int(max_ms * 1e6) if max_ms is not None else None
+        with self._lock:
+            if min_ns is None and max_ns is None:
+                self._limits.pop((cmd, direction, kind), None)
+            else:
+                self._limits[(cmd, direction, kind)] = (min_ns, max_ns)
+
+    def limits(self):
+        with self._lock:
+            return dict(self._limits)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._last_seen.clear()
+            self._pending.clear()
+            self.outliers.clear()
+
+    def record_frame(self, direction, frame, ts_ns):
+        """记录一帧 (CMD 取帧的第3个字节)"""
+        if len(frame) >= 3:
+            self.record(direction, frame[2], ts_ns)
+
+    def record(self, direction, cmd, ts_ns):
+        with self._lock:
+            key = (cmd, direction)
+            last = self._last_seen.get(key)
+            self._last_seen[key] = ts_ns
+            if last is not None:
+                self._add(cmd, direction, KIND_INTERVAL, ts_ns - last, ts_ns)
+
+            if direction == 'tx':
+                self._pending[cmd] = ts_ns
+            else:
+                sent = self._pending.pop(cmd, None)
+                if sent is not None:
+                    self._add(cmd, 'rx', KIND_LATENCY, ts_ns - sent, ts_ns)
+
+    def _add(self, cmd, direction, kind, value, ts_ns):
+        key = (cmd, direction, kind)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = LogHistogram()
+        histogram.record(value)
+
+        limit = self._limits.get(key)
+        if limit is not None:
+            min_ns, max_ns = limit
+            if (min_ns is not None and value < min_ns) or (max_ns is not None and value > max_ns):
+                self.outliers.append({
+                    'ts_ns': ts_ns, 'cmd': cmd, 'direction': direction, 'kind': kind,
+                    'value_ms': value / 1e6,
+                    'min_ms': min_ns / 1e6 if min_ns is not None else None,
+                    'max_ms': max_ns / 1e6 if max_ns is not None else None,
+                })
+
+    def snapshot(self):
+        """返回统计汇总列表, 数值单位为毫秒"""
+        with self._lock:
+            outlier_counts = collections.Counter(
+                (o['cmd'], o['direction'], o['kind']) for o in self.outliers)
+            rows = []
+            for (cmd, direction, kind), h in sorted(self._histograms.items()):
+                rows.append({
+                    'cmd': cmd,
+                    'direction': direction,
+                    'kind': kind,
+                    'count': h.count,
+                    'min_ms': (h.min or 0) / 1e6,
+                    'mean_ms': h.mean / 1e6,
+                    'p50_ms': h.percentile(50) / 1e6,
+                    'p99_ms': h.percentile(99) / 1e6,
+                    'max_ms': (h.max or 0) / 1e6,
+                    'outliers': outlier_counts.get((cmd, direction, kind), 0),
+                })
+            return rows
+
+    def export_json(self, file_path):
+        """导出汇总、直方图与异常点"""
+        with self._lock:
+            histograms = [
+                {'cmd': cmd, 'direction': direction, 'kind': kind, 'buckets_ns': h.buckets()}
+                for (cmd, direction, kind), h in sorted(self._histograms.items())
+            ]
+            outliers = list(self.outliers)
+        data = {'summary': self.snapshot(), 'histograms': histograms, 'outliers': outliers}
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
+
+    def export_csv(self, file_path):
+        """导出汇总表"""
+        rows = self.snapshot()
+        fields = ['cmd', 'direction', 'kind', 'count', 'min_ms', 'mean_ms', 'p50_ms', 'p99_ms', 'max_ms', 'outliers']
+        with open(file_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=fields)
+            writer.writeheader()
+            for row in rows:
+                row = dict(row, cmd=f"0x{row['cmd']:02X}")
+                writer.writerow(row)
@@ -0,0 +1,183 @@
+"""串口发送调度
+
+每个串口一个发送线程, 所有发送请求先进入有界优先队列,
+按 优先级 -> 提交顺序 依次写出, 调用方 (包括 GUI 线程) 不会被阻塞的 write() 卡住。
+周期帧可以按 coalesce_key 合并, 队列中未发出的旧帧会被新帧替换。
+写函数抛出 WriteDeferred 表示暂时无法写出 (例如设备掉线), 该帧交给 on_deferred 而不计入写错误;
+drain() 取出全部未发送的帧。
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+# 优先级 (数值越小越优先)
+PRIORITY_HEARTBEAT = 0   # 周期心跳帧
+PRIORITY_REPLY = 1       # 模拟器应答帧
+PRIORITY_USER = 2        # 用户操作命令
+
+
+class WriteDeferred(Exception):
+    """写函数暂时无法写出, 帧应由调用方暂存后重发"""
+
+
+class WriteScheduler:
+    """单个串口的发送调度器"""
+
+    def __init__(self, write_func, on_sent=None, max_depth=64, name="serial-writer", on_deferred=None):
+        """on_sent(data, ts_ns, coalesce_key) 在每帧写出后于发送线程中调用
+
+        on_deferred(data, priority, deadline, coalesce_key) 在写函数抛出 WriteDeferred 时调用,
+        deadline 为剩余的相对截止时间 (秒) 或 None。
+        """
+        self.write_func = write_func
+        self.on_sent = on_sent
+        self.on_deferred = on_deferred
+        self.max_depth = max_depth
+        self.name = name
+
+        self._heap = []              # [priority, seq, deadline, data, key, valid]
+        self._by_key = {}            # coalesce_key -> entry
+        self._seq = itertools.count()
+        self._depth = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        # 统计信息
+        self.sent = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.deadline_misses = 0
+        self.write_errors = 0
+        self.max_depth_seen = 0
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._running = False
+            self._heap.clear()
+            self._by_key.clear()
+            self._depth = 0
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, data, priority=PRIORITY_USER, deadline=None, coalesce_key=None):
+        """提交一帧待发送数据
+
+        deadline: 相对截止时间(秒), 超过截止时间仍未发出的帧会被丢弃并计入超时
+        coalesce_key: 相同 key 的未发送帧会被替换, 用于周期帧
+        返回 False 表示队列已满被拒绝
+        """
+        deadline_at = time.monotonic() + deadline if deadline is not None else None
+        with self._cond:
+            if not self._running:
+                return False
+            if coalesce_key is not None and coalesce_key in self._by_key:
+                old = self._by_key.pop(coalesce_key)
+                old[5] = False
+                self._depth -= 1
+                self.coalesced += 1
+            if self._depth >= self.max_depth and not self._evict_for(priority):
+                self.rejected += 1
+                return False
+            entry = [priority, next(self._seq), deadline_at, bytes(data), coalesce_key, True]
+            heapq.heappush(self._heap, entry)
+            if coalesce_key is not None:
+                self._by_key[coalesce_key] = entry
+            self._depth += 1
+            self.max_depth_seen = max(self.max_depth_seen, self._depth)
+            self._cond.notify()
+        return True
+
+    def drain(self):
+        """取出全部未发送的帧, 按发送顺序返回 [(data, priority, 相对截止时间, coalesce_key)]"""
+        now = time.monotonic()
+        with self._cond:
+            entries = sorted(entry for entry in self._heap if entry[5])
+            self._heap.clear()
+            self._by_key.clear()
+            self._depth = 0
+        return [(entry[3], entry[0], entry[2] - now if entry[2] is not None else None, entry[4])
+                for entry in entries]
+
+    def _evict_for(self, priority):
+        """队列满时, 淘汰一个优先级更低的最新帧为新帧腾出位置"""
+        victim = None
+        for entry in self._heap:
+            if entry[5] and entry[0] > priority and (victim is None or entry[:2] > victim[:2]):
+                victim = entry
+        if victim is None:
+            return False
+        victim[5] = False
+        if victim[4] is not None:
+            self._by_key.pop(victim[4], None)
+        self._depth -= 1
+        self.rejected += 1
+        return True
+
+    def _next_entry(self):
+        """取出下一条有效帧, 必须持有锁"""
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if not entry[5]:
+                continue
+            if entry[4] is not None:
+                self._by_key.pop(entry[4], None)
+            self._depth -= 1
+            return entry
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                entry = self._next_entry()
+                while entry is None and self._running:
+                    self._cond.wait()
+                    entry = self._next_entry()
+                if not self._running:
+                    return
+
+            if entry[2] is not None and time.monotonic() > entry[2]:
+                self.deadline_misses += 1
+                continue
+            try:
+                self.write_func(entry[3])
+                ts_ns = time.monotonic_ns()   # write() 返回后立即打时间戳
+                self.sent += 1
+            except WriteDeferred:
+                if self.on_deferred:
+                    deadline = entry[2] - time.monotonic() if entry[2] is not None else None
+                    self.on_deferred(entry[3], entry[0], deadline, entry[4])
+                continue
+            except Exception as e:
+                self.write_errors += 1
+                print(f"发送命令失败: {str(e)}")
+                continue
+            if self.on_sent:
+                self.on_sent(entry[3], ts_ns, entry[4])
+
+    @property
+    def depth(self):
+        return self._depth
+
+    def stats(self):
+        """返回队列深度与发送统计"""
+        return {
+            'depth': self._depth,
+            'max_depth': self.max_depth_seen,
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'rejected': self.rejected,
+            'deadline_misses': self.deadline_misses,
+            'write_errors': self.write_errors,
+        }
@@ -0,0 +1,11 @@
+"""与界面无关的核心库 (只依赖标准库, 不导入 Qt)
+
+    codec         帧编解码、校验和、流式分帧
+    clock         总线时间戳
+    transport     本地串口 / TCP / RFC 2217 / 工位代理传输
+    transactions  请求-应答事务引擎
+    telemetry     遥测样本存储
+    simulators    板卡模拟器
+
+命令行工具、基准测试和工作进程只导入本包即可, 无需显示环境。
+"""
@@ -0,0 +1,139 @@
+"""工位代理客户端
+
+测试脚本和界面通过本模块连接工位代理 (agent.py)。
+一个连接上可以同时有多个未完成的请求, 应答按 id 匹配; 数据流消息回调在接收线程中执行。
+
+    client = AgentClient()
+    client.call('open', port='/dev/ttyUSB0', baud=9600)
+    reply = client.call('request', port='/dev/ttyUSB0', data='10 02 21 00 00 33 10 03')
+    client.subscribe('/dev/ttyUSB0', ['status'], print)
+"""
+
+import itertools
+import socket
+import threading
+
+from core.agent_protocol import pack, MessageDecoder, socket_path
+
+DEFAULT_CALL_TIMEOUT = 3.0
+
+
+class AgentClientError(Exception):
+    """代理返回错误应答, 或连接已断开"""
+
+
+class _PendingCall:
+    __slots__ = ('done', 'response')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+
+class AgentClient:
+    """工位代理连接"""
+
+    def __init__(self, path=None):
+        self.path = path or socket_path()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+        self.connected = True
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._listeners = []          # (port, streams, callback)
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_loop, name="agent-client", daemon=True)
+        self._reader.start()
+
+    def call(self, op, timeout=DEFAULT_CALL_TIMEOUT, **params):
+        """发送请求并等待应答, 返回 result; 失败时抛出 AgentClientError"""
+        request_id = next(self._ids)
+        pending = _PendingCall()
+        with self._lock:
+            self._pending[request_id] = pending
+        try:
+            self._send(dict(params, id=request_id, op=op))
+            if not pending.done.wait(timeout):
+                raise AgentClientError(f"{op} 请求超时")
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+        response = pending.response
+        if not response.get('ok'):
+            raise AgentClientError(response.get('error', '未知错误'))
+        return response.get('result')
+
+    def subscribe(self, port, streams, callback):
+        """订阅数据流, callback(message) 在接收线程中调用"""
+        with self._lock:
+            self._listeners.append((port, set(streams), callback))
+        return self.call('subscribe', port=port, streams=list(streams))
+
+    def unsubscribe(self, port, streams, callback=None):
+        with self._lock:
+            self._listeners = [entry for entry in self._listeners
+                               if not (entry[0] == port and (callback is None or entry[2] is callback))]
+        return self.call('unsubscribe', port=port, streams=list(streams))
+
+    def close(self):
+        """断开连接; 代理持有的串口保持打开"""
+        if self.connected:
+            self.connected = False
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+
+    def _send(self, message):
+        if not self.connected:
+            raise AgentClientError("未连接到工位代理")
+        try:
+            with self._send_lock:
+                self.sock.sendall(pack(message))
+        except OSError as e:
+            raise AgentClientError(f"发送到工位代理失败: {e}")
+
+    def _read_loop(self):
+        decoder = MessageDecoder()
+        while self.connected:
+            try:
+                data = self.sock.recv(65536)
+            except OSError:
+                break
+            if not data:
+                break
+            try:
+                messages = decoder.feed(data)
+            except ValueError as e:
+                print(f"工位代理消息错误: {e}")
+                break
+            for message in messages:
+                self._handle(message)
+        self.connected = False
+        self._fail_pending()
+
+    def _handle(self, message):
+        if 'stream' in message:
+            with self._lock:
+                listeners = list(self._listeners)
+            for port, streams, callback in listeners:
+                if message['stream'] in streams and port in ('*', message.get('port')):
+                    try:
+                        callback(message)
+                    except Exception as e:
+                        print(f"工位代理数据流回调失败: {e}")
+            return
+        with self._lock:
+            pending = self._pending.get(message.get('id'))
+        if pending is not None:
+            pending.response = message
+            pending.done.set()
+
+    def _fail_pending(self):
+        with self._lock:
+            pending = list(self._pending.values())
+        for call in pending:
+            call.response = {'ok': False, 'error': "与工位代理的连接已断开"}
+            call.done.set()
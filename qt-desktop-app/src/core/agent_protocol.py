@@ -0,0 +1,59 @@
+"""工位代理 (agent) 本地套接字协议
+
+每条消息为 4 字节大端长度前缀 + UTF-8 JSON。客户端请求带自增 id, 应答带相同 id;
+订阅的数据流消息带 stream 字段, 没有 id。帧数据统一用十六进制字符串表示。
+
+    请求: {"id": 1, "op": "send", "port": "/dev/ttyUSB0", "data": "10 02 21 00 00 33 10 03"}
+    应答: {"id": 1, "ok": true, "result": ...} 或 {"id": 1, "ok": false, "error": "..."}
+    数据流: {"stream": "rx", "port": "/dev/ttyUSB0", "ts_ns": 123, "data": "10 02 21 ..."}
+"""
+
+import json
+import os
+import struct
+
+LENGTH_PREFIX = struct.Struct('>I')
+MAX_MESSAGE_SIZE = 4 * 1024 * 1024
+
+DEFAULT_SOCKET_PATH = os.path.join(os.path.expanduser('~'), '.qt_desktop_app', 'agent.sock')
+
+# 可订阅的数据流
+STREAM_RX = 'rx'          # 原始接收数据块
+STREAM_TX = 'tx'          # 已写出的帧
+STREAM_STATUS = 'status'  # 解析后的 0x21 状态
+STREAM_LINK = 'link'      # 掉线/重连事件
+STREAM_ALARM = 'alarm'    # 报警触发/清除事件
+STREAMS = (STREAM_RX, STREAM_TX, STREAM_STATUS, STREAM_LINK, STREAM_ALARM)
+
+
+def socket_path():
+    """代理套接字路径, 可通过环境变量 QT_APP_AGENT_SOCKET 覆盖"""
+    return os.environ.get('QT_APP_AGENT_SOCKET', DEFAULT_SOCKET_PATH)
+
+
+def pack(message):
+    """编码一条消息"""
+    body = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return LENGTH_PREFIX.pack(len(body)) + body
+
+
+class MessageDecoder:
+    """从字节流中切分消息"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """追加数据并返回解析出的消息列表; 长度非法时抛出 ValueError"""
+        self.buffer += data
+        messages = []
+        while len(self.buffer) >= LENGTH_PREFIX.size:
+            (length,) = LENGTH_PREFIX.unpack_from(self.buffer)
+            if length > MAX_MESSAGE_SIZE:
+                raise ValueError(f"消息过长: {length} 字节")
+            end = LENGTH_PREFIX.size + length
+            if len(self.buffer) < end:
+                break
+            messages.append(json.loads(bytes(self.buffer[LENGTH_PREFIX.size:end]).decode('utf-8')))
+            del self.buffer[:end]
+        return messages
@@ -0,0 +1,384 @@
+"""报警规则引擎
+
+对每个解析后的 0x21 状态样本评估报警规则, 规则为字典 (可从 JSON 文件加载):
+
+    [
+        {"name": "过温", "type": "threshold", "field": "temperature", "max": 85,
+         "actions": ["log", "ui", "stop"]},
+        {"name": "转速突变", "type": "rate", "field": "speed", "max_rate": 3000},
+        {"name": "持续过载", "type": "duration", "field": "power", "max": 60, "seconds": 5},
+        {"name": "过流", "type": "fault", "codes": [37, 42]}
+    ]
+
+规则类型:
+    threshold   字段超出 min/max
+    rate        字段变化率 (单位/秒) 的绝对值超过 max_rate
+    duration    字段持续超出 min/max 达到 seconds 秒
+    fault       状态字为故障码 (codes 省略时为任意故障码)
+
+动作: log (打印并记入历史) / ui (通知界面) / stop (对该工位发送 0x80) / mqtt (发布到 MQTT)。
+报警为边沿触发: 条件成立时触发一次, 条件消失后清除, 动作只在触发时执行。
+
+单样本评估为纯 Python 闭包, 每条规则约 1 微秒; 多工位视图中 evaluate_batch 对所有工位的快照
+按字段组成数组一次性计算 (安装了 NumPy 时), 只对状态发生变化的工位执行动作。
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+
+from core.codec import FAULT_CODES
+
+RULE_TYPES = ('threshold', 'rate', 'duration', 'fault')
+ACTIONS = ('log', 'ui', 'stop', 'mqtt')
+FIELDS = ('status', 'speed', 'voltage', 'temperature', 'power')
+
+EVENT_RAISED = 'raised'
+EVENT_CLEARED = 'cleared'
+
+RULES_FILE = os.path.join(os.path.expanduser('~'), '.qt_desktop_app', 'alarms.json')
+
+# 未配置规则文件时使用: 任意故障码报警
+DEFAULT_RULES = [
+    {"name": "电机故障", "type": "fault", "actions": ["log", "ui"]},
+]
+
+
+_numpy_module = False  # False 表示尚未尝试导入
+
+
+def _numpy():
+    """延迟导入 NumPy, 只有批量评估时才加载 (启动时不导入); 未安装时返回 None"""
+    global _numpy_module
+    if _numpy_module is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy_module = numpy
+    return _numpy_module
+
+
+class AlarmRuleError(Exception):
+    """报警规则格式错误"""
+
+
+class AlarmRule:
+    """一条报警规则"""
+
+    def __init__(self, spec):
+        self.type = spec.get('type')
+        if self.type not in RULE_TYPES:
+            raise AlarmRuleError(f"未知规则类型: {self.type}")
+        self.field = spec.get('field', 'status')
+        if self.type != 'fault' and self.field not in FIELDS:
+            raise AlarmRuleError(f"未知字段: {self.field}")
+        self.name = spec.get('name') or f"{self.field}_{self.type}"
+        self.severity = spec.get('severity', 'warning')
+        self.min = spec.get('min')
+        self.max = spec.get('max')
+        self.max_rate = spec.get('max_rate')
+        self.seconds = float(spec.get('seconds', 0))
+        codes = spec.get('codes')
+        self.codes = frozenset(codes) if codes is not None else frozenset(FAULT_CODES)
+        self.actions = tuple(spec.get('actions', ('log', 'ui')))
+        unknown = set(self.actions) - set(ACTIONS)
+        if unknown:
+            raise AlarmRuleError(f"{self.name}: 未知动作 {', '.join(sorted(unknown))}")
+        if self.type in ('threshold', 'duration') and self.min is None and self.max is None:
+            raise AlarmRuleError(f"{self.name}: 需要 min 或 max")
+        if self.type == 'rate' and self.max_rate is None:
+            raise AlarmRuleError(f"{self.name}: 需要 max_rate")
+        if self.type == 'duration' and self.seconds <= 0:
+            raise AlarmRuleError(f"{self.name}: 需要 seconds")
+        self.check = self._compile()
+
+    def _out_of_range(self):
+        low, high = self.min, self.max
+        if low is not None and high is not None:
+            return lambda value: value < low or value > high
+        if low is not None:
+            return lambda value: value < low
+        return lambda value: value > high
+
+    def _compile(self):
+        """编译为 check(state, value, ts_ns) -> bool, state 为该工位该规则的私有字典"""
+        if self.type == 'fault':
+            codes = self.codes
+            return lambda state, value, ts_ns: value in codes
+        if self.type == 'threshold':
+            out = self._out_of_range()
+            return lambda state, value, ts_ns: out(value)
+        if self.type == 'rate':
+            max_rate = self.max_rate
+
+            def check_rate(state, value, ts_ns):
+                last = state.get('last')
+                state['last'] = (value, ts_ns)
+                if last is None or ts_ns <= last[1]:
+                    return False
+                return abs(value - last[0]) * 1e9 / (ts_ns - last[1]) > max_rate
+            return check_rate
+
+        out = self._out_of_range()
+        hold_ns = int(self.seconds * 1e9)
+
+        def check_duration(state, value, ts_ns):
+            if not out(value):
+                state['since'] = None
+                return False
+            since = state.get('since')
+            if since is None:
+                since = state['since'] = ts_ns
+            return ts_ns - since >= hold_ns
+        return check_duration
+
+    def describe(self, value):
+        if self.type == 'fault':
+            return f"{self.name}: 故障码 0x{value:02X} ({FAULT_CODES.get(value, '未知')})"
+        if self.type == 'rate':
+            return f"{self.name}: {self.field} 变化率超过 {self.max_rate}/s (当前 {value})"
+        limits = ' '.join(f"{key} {getattr(self, key)}" for key in ('min', 'max') if getattr(self, key) is not None)
+        suffix = f" 持续 {self.seconds:g} s" if self.type == 'duration' else ""
+        return f"{self.name}: {self.field}={value} 超出 {limits}{suffix}"
+
+
+def load_rules(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            specs = json.load(file)
+    except ValueError as e:
+        raise AlarmRuleError(f"报警规则文件格式错误 {path}: {e}")
+    return [AlarmRule(spec) for spec in specs]
+
+
+class MqttPublisher:
+    """MQTT 发布动作 (需要 paho-mqtt, 未安装时只打印一次提示)"""
+
+    def __init__(self, host="localhost", port=1883, topic="motor/alarms"):
+        self.topic = topic
+        self.client = None
+        try:
+            import paho.mqtt.client as mqtt
+        except ImportError:
+            print("未安装 paho-mqtt, MQTT 报警动作不可用")
+            return
+        try:
+            self.client = mqtt.Client()
+            self.client.connect_async(host, port)
+            self.client.loop_start()
+        except Exception as e:
+            print(f"MQTT 连接失败 {host}:{port}: {e}")
+            self.client = None
+
+    def __call__(self, event):
+        if self.client is not None:
+            self.client.publish(f"{self.topic}/{event['source']}", json.dumps(event, ensure_ascii=False))
+
+    def close(self):
+        if self.client is not None:
+            self.client.loop_stop()
+            self.client.disconnect()
+
+
+class AlarmEngine:
+    """报警引擎
+
+    evaluate(source, sample) 对单个样本评估全部规则 (可直接作为 TelemetryStore 的监听器);
+    listener(event) 在评估所在线程中对每个触发/清除事件调用, 界面需要自行转到 GUI 线程。
+    register_stop(source, func) 注册 stop 动作使用的停机函数; 多个使用方共用一个串口时各自注册,
+    停机时调用最近注册的一个 (失败时依次尝试更早的)。
+    """
+
+    def __init__(self, rules=None, history=1000):
+        self.rules = list(rules) if rules is not None else [AlarmRule(spec) for spec in DEFAULT_RULES]
+        self.mqtt = None
+        self.history = collections.deque(maxlen=history)
+        self._states = {}          # source -> [每条规则的状态字典]
+        self._active = {}          # source -> {规则名: 事件}
+        self._stop_funcs = {}      # source -> [停机函数], 按注册顺序
+        self._listeners = []
+        self._batch = None
+        self._lock = threading.Lock()
+
+    def set_rules(self, rules):
+        with self._lock:
+            self.rules = list(rules)
+            self._states.clear()
+            self._active.clear()
+            self._batch = None
+
+    def register_stop(self, source, func):
+        with self._lock:
+            funcs = self._stop_funcs.setdefault(source, [])
+            if func not in funcs:
+                funcs.append(func)
+
+    def unregister_stop(self, source, func=None):
+        """注销停机函数; func 省略时注销该数据源的全部停机函数"""
+        with self._lock:
+            funcs = self._stop_funcs.get(source, [])
+            if func is not None and func in funcs:
+                funcs.remove(func)
+            if func is None or not funcs:
+                self._stop_funcs.pop(source, None)
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def active(self, source=None):
+        """当前未清除的报警事件列表"""
+        with self._lock:
+            if source is not None:
+                return list(self._active.get(source, {}).values())
+            return [event for events in self._active.values() for event in events.values()]
+
+    # ===== 单样本评估 =====
+
+    def evaluate(self, source, sample):
+        if 'status' not in sample:
+            return
+        ts_ns = sample.get('ts_ns') or time.monotonic_ns()
+        events = []
+        with self._lock:
+            states = self._states.get(source)
+            if states is None:
+                states = self._states[source] = [{} for _ in self.rules]
+            active = self._active.setdefault(source, {})
+            for rule, state in zip(self.rules, states):
+                value = sample.get(rule.field)
+                if value is None:
+                    continue
+                self._transition(source, rule, rule.check(state, value, ts_ns), value, ts_ns, active, events)
+        for event, rule in events:
+            self._dispatch(event, rule)
+
+    def _transition(self, source, rule, firing, value, ts_ns, active, events):
+        if firing == (rule.name in active):
+            return
+        event = {'source': source, 'rule': rule.name, 'type': rule.type, 'severity': rule.severity,
+                 'field': rule.field, 'value': value, 'ts_ns': ts_ns,
+                 'state': EVENT_RAISED if firing else EVENT_CLEARED,
+                 'message': rule.describe(value) if firing else f"{rule.name}: 已恢复 ({rule.field}={value})"}
+        if firing:
+            active[rule.name] = event
+        else:
+            del active[rule.name]
+        events.append((event, rule))
+
+    def _dispatch(self, event, rule):
+        self.history.append(event)
+        raised = event['state'] == EVENT_RAISED
+        if 'log' in rule.actions:
+            print(f"[报警] {event['source']} {'触发' if raised else '清除'} {event['message']}")
+        if raised and 'stop' in rule.actions:
+            with self._lock:
+                funcs = list(self._stop_funcs.get(event['source'], ()))
+            if not funcs:
+                print(f"[报警] {event['source']} 未注册停机函数, 无法停机")
+            for stop in reversed(funcs):
+                try:
+                    stop()
+                    break
+                except Exception as e:
+                    print(f"[报警] {event['source']} 停机失败: {e}")
+        if 'mqtt' in rule.actions:
+            if self.mqtt is None:
+                self.mqtt = MqttPublisher()
+            self.mqtt(event)
+        if 'ui' in rule.actions:
+            for listener in list(self._listeners):
+                try:
+                    listener(event)
+                except Exception as e:
+                    print(f"报警通知失败: {e}")
+
+    # ===== 多工位批量评估 =====
+
+    def evaluate_batch(self, samples, ts_ns=None):
+        """对多个工位的最新样本 {source: sample} 批量评估
+
+        安装了 NumPy 时每条规则对所有工位做一次数组运算, 只对状态变化的工位生成事件;
+        否则逐个调用 evaluate。
+        """
+        numpy = _numpy()
+        if numpy is None:
+            for source, sample in samples.items():
+                self.evaluate(source, dict(sample, ts_ns=sample.get('ts_ns') or ts_ns))
+            return
+        ts_ns = ts_ns or time.monotonic_ns()
+        sources = [source for source, sample in samples.items() if sample.get('status') is not None]
+        if not sources:
+            return
+        events = []
+        with self._lock:
+            batch = self._batch
+            if batch is None or batch['sources'] != sources:
+                batch = self._batch = self._new_batch(numpy, sources)
+            values = {field: numpy.array([float(samples[source].get(field) or 0) for source in sources])
+                      for field in FIELDS}
+            for index, rule in enumerate(self.rules):
+                firing = self._batch_check(numpy, rule, batch['states'][index], values[rule.field], ts_ns)
+                changed = numpy.nonzero(firing != batch['active'][index])[0]
+                batch['active'][index] = firing
+                for position in changed:
+                    source = sources[position]
+                    value = samples[source].get(rule.field)
+                    active = self._active.setdefault(source, {})
+                    self._transition(source, rule, bool(firing[position]), value, ts_ns, active, events)
+        for event, rule in events:
+            self._dispatch(event, rule)
+
+    def _new_batch(self, numpy, sources):
+        count = len(sources)
+        states = [{'last': None, 'last_ts': None, 'since': numpy.full(count, -1, dtype=numpy.int64)}
+                  for _ in self.rules]
+        active = [numpy.array([rule.name in self._active.get(source, {}) for source in sources])
+                  for rule in self.rules]
+        return {'sources': sources, 'states': states, 'active': active}
+
+    def _batch_check(self, numpy, rule, state, values, ts_ns):
+        if rule.type == 'fault':
+            return numpy.isin(values, list(rule.codes))
+        if rule.type == 'rate':
+            last, last_ts = state['last'], state['last_ts']
+            state['last'], state['last_ts'] = values, ts_ns
+            if last is None or ts_ns <= last_ts:
+                return numpy.zeros(len(values), dtype=bool)
+            return numpy.abs(values - last) * 1e9 / (ts_ns - last_ts) > rule.max_rate
+        out = numpy.zeros(len(values), dtype=bool)
+        if rule.min is not None:
+            out |= values < rule.min
+        if rule.max is not None:
+            out |= values > rule.max
+        if rule.type == 'threshold':
+            return out
+        since = state['since']
+        since[~out] = -1
+        since[out & (since < 0)] = ts_ns
+        return out & (ts_ns - since >= int(rule.seconds * 1e9))
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_alarm_engine():
+    """返回进程级报警引擎单例, 规则来自 ~/.qt_desktop_app/alarms.json (不存在时使用默认规则)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            rules = None
+            if os.path.exists(RULES_FILE):
+                try:
+                    rules = load_rules(RULES_FILE)
+                except (OSError, AlarmRuleError) as e:
+                    print(f"加载报警规则失败, 使用默认规则: {e}")
+            _engine = AlarmEngine(rules)
+        return _engine
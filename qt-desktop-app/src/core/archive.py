@@ -0,0 +1,332 @@
+"""分级遥测归档
+
+长时间老化测试 (例如 72 小时, 20 Hz) 不可能在内存中保留全部样本。归档为每个数据源保留:
+    - 原始样本: 有界环形缓冲区 (默认约 1 小时)
+    - 1 s / 1 min / 1 h 汇总: 每个时间桶的 count 以及各字段的 min/max/mean/last,
+      桶结束后追加到磁盘上的列式文件
+查询时自动选择满足所需分辨率的最粗一级, 3 天的曲线只需读取几千行。
+
+磁盘格式 (每个数据源一个目录, 每级一个子目录, 每列一个文件, 本机字节序):
+    ts.q              桶起始时间 (Unix 秒, int64)
+    count.I           样本数 (uint32)
+    <字段>_<统计>.f    float32, 例如 speed_mean.f
+进程异常退出后各列长度可能不一致: 读取时按最短列截齐, 每个进程第一次追加前先把各列文件截断到相同行数。
+写入由单独的线程每 FLUSH_INTERVAL 秒进行一次, 遥测回调只更新内存中的桶。
+"""
+
+import array
+import bisect
+import collections
+import contextlib
+import math
+import os
+import re
+import threading
+import time
+
+from core.clock import wall_time_ns
+
+FIELDS = ('speed', 'voltage', 'temperature', 'power')
+STATS = ('min', 'max', 'mean', 'last')
+TIERS = (('1s', 1), ('1min', 60), ('1h', 3600))
+RAW_TIER = 'raw'
+
+DEFAULT_RAW_CAPACITY = 72000   # 20 Hz 约 1 小时
+FLUSH_INTERVAL = 10.0          # 已结束的桶最多在内存中停留的时间 (秒)
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.expanduser('~'), '.qt_desktop_app', 'archive')
+
+COLUMNS = [('ts', 'q'), ('count', 'I')] + [(f"{field}_{stat}", 'f') for field in FIELDS for stat in STATS]
+
+
+class _Bucket:
+    """一个时间桶的增量汇总"""
+
+    __slots__ = ('start', 'count', 'min', 'max', 'sum', 'last')
+
+    def __init__(self, start):
+        self.start = start
+        self.count = 0
+        self.min = {}
+        self.max = {}
+        self.sum = {}
+        self.last = {}
+
+    def add(self, values):
+        self.count += 1
+        for field, value in values.items():
+            if field in self.last:
+                self.min[field] = min(self.min[field], value)
+                self.max[field] = max(self.max[field], value)
+                self.sum[field] += value
+            else:
+                self.min[field] = self.max[field] = self.sum[field] = value
+            self.last[field] = value
+
+    def row(self):
+        row = {'ts': self.start, 'count': self.count}
+        for field in FIELDS:
+            present = field in self.last
+            row[f"{field}_min"] = self.min[field] if present else math.nan
+            row[f"{field}_max"] = self.max[field] if present else math.nan
+            row[f"{field}_mean"] = self.sum[field] / self.count if present else math.nan
+            row[f"{field}_last"] = self.last[field] if present else math.nan
+        return row
+
+
+class _Tier:
+    """一级汇总: 当前桶 + 待写入的已结束桶 + 列式文件"""
+
+    def __init__(self, name, period, directory):
+        self.name = name
+        self.period = period
+        self.directory = directory
+        self.current = None
+        self.pending = {name: array.array(code) for name, code in COLUMNS}
+        self.rows = None        # 磁盘上已对齐的行数, None 表示尚未截齐
+
+    def add(self, ts_s, values):
+        start = int(ts_s // self.period) * self.period
+        if self.current is not None and self.current.start != start:
+            self._close_bucket()
+        if self.current is None:
+            self.current = _Bucket(start)
+        self.current.add(values)
+
+    def _close_bucket(self):
+        for name, value in self.current.row().items():
+            self.pending[name].append(value)
+        self.current = None
+
+    def take(self, close_current=False):
+        """取出待写入的行 (在归档锁内调用), 无数据时返回 None"""
+        if close_current and self.current is not None:
+            self._close_bucket()
+        if not len(self.pending['ts']):
+            return None
+        batch = self.pending
+        self.pending = {name: array.array(code) for name, code in COLUMNS}
+        return batch
+
+    def restore(self, batch):
+        """写入失败时把行放回待写入队列 (在归档锁内调用)"""
+        for name, column in batch.items():
+            column.extend(self.pending[name])
+        self.pending = batch
+
+    def _align(self):
+        """把各列文件截断到最短列的行数, 避免异常退出留下的多余行使后续追加错位"""
+        sizes = {}
+        for name, code in COLUMNS:
+            path = os.path.join(self.directory, f"{name}.{code}")
+            sizes[path] = (os.path.getsize(path) if os.path.exists(path) else 0, array.array(code).itemsize)
+        rows = min(size // itemsize for size, itemsize in sizes.values())
+        for path, (size, itemsize) in sizes.items():
+            if size != rows * itemsize:
+                with open(path, 'ab') as file:
+                    file.truncate(rows * itemsize)
+        self.rows = rows
+
+    def write(self, batch):
+        """追加到列式文件 (在写入锁内、归档锁外调用)"""
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            if self.rows is None:
+                self._align()
+            for name, code in COLUMNS:
+                with open(os.path.join(self.directory, f"{name}.{code}"), 'ab') as file:
+                    batch[name].tofile(file)
+        except OSError:
+            # 可能只写入了部分列, 下次写入前重新截齐
+            self.rows = None
+            raise
+        self.rows += len(batch['ts'])
+
+    def load(self, lock=None):
+        """读取磁盘上的全部行并接上内存中尚未写入的行, 返回 {列名: array}
+
+        调用方需持有写入锁; lock 为保护内存中的桶的归档锁。
+        """
+        columns = {}
+        for name, code in COLUMNS:
+            column = array.array(code)
+            path = os.path.join(self.directory, f"{name}.{code}")
+            if os.path.exists(path):
+                with open(path, 'rb') as file:
+                    column.fromfile(file, os.path.getsize(path) // column.itemsize)
+            columns[name] = column
+        rows = min(len(column) for column in columns.values())
+        with lock or contextlib.nullcontext():
+            for name, column in columns.items():
+                del column[rows:]
+                column.extend(self.pending[name])
+            if self.current is not None:
+                for name, value in self.current.row().items():
+                    columns[name].append(value)
+        return columns
+
+
+def _safe_name(source):
+    """数据源名称转为目录名, 例如 /dev/ttyUSB0 -> dev_ttyUSB0"""
+    return re.sub(r'[^A-Za-z0-9.-]+', '_', source).strip('_') or 'default'
+
+
+class SourceArchive:
+    """单个数据源的分级归档"""
+
+    def __init__(self, root, source, raw_capacity=DEFAULT_RAW_CAPACITY):
+        self.source = source
+        self.directory = os.path.join(root, _safe_name(source))
+        self.raw = collections.deque(maxlen=raw_capacity)   # (Unix 秒, {字段: 值})
+        self.tiers = [_Tier(name, period, os.path.join(self.directory, name)) for name, period in TIERS]
+
+    def add(self, sample):
+        ts_s = wall_time_ns(sample['ts_ns']) / 1e9 if 'ts_ns' in sample else time.time()
+        values = {field: sample[field] for field in FIELDS if sample.get(field) is not None}
+        self.raw.append((ts_s, values))
+        for tier in self.tiers:
+            tier.add(ts_s, values)
+
+    def pick_tier(self, start, resolution):
+        """选择分辨率不超过 resolution 秒的最粗一级; 原始缓冲区覆盖起始时间且分辨率小于 1 s 时用原始样本"""
+        if resolution < TIERS[0][1] and self.raw and self.raw[0][0] <= start:
+            return RAW_TIER
+        chosen = self.tiers[0]
+        for tier in self.tiers:
+            if tier.period <= resolution:
+                chosen = tier
+        return chosen.name
+
+    def query(self, start=None, end=None, resolution=1.0, lock=None):
+        """查询 [start, end] (Unix 秒) 内的数据, 返回 {'tier': 级别, 列名: 列表}
+
+        汇总级别的列见 COLUMNS; 原始样本也以同样的列返回 (count 为 1, min/max/mean/last 相同)。
+        lock 为保护内存中样本的锁, 只在复制内存数据时持有。
+        """
+        start = start if start is not None else 0
+        end = end if end is not None else math.inf
+        with lock or contextlib.nullcontext():
+            tier_name = self.pick_tier(start, resolution)
+            if tier_name == RAW_TIER:
+                return self._query_raw(start, end)
+
+        tier = next(tier for tier in self.tiers if tier.name == tier_name)
+        columns = tier.load(lock)
+        ts = columns['ts']
+        lo = bisect.bisect_left(ts, start - tier.period + 1)
+        hi = bisect.bisect_right(ts, end)
+        result = {'tier': tier_name}
+        for name, column in columns.items():
+            result[name] = column[lo:hi].tolist()
+        return result
+
+    def _query_raw(self, start, end):
+        result = {'tier': RAW_TIER}
+        for name, _ in COLUMNS:
+            result[name] = []
+        for ts_s, values in list(self.raw):
+            if ts_s < start or ts_s > end:
+                continue
+            result['ts'].append(ts_s)
+            result['count'].append(1)
+            for field in FIELDS:
+                value = values.get(field, math.nan)
+                for stat in STATS:
+                    result[f"{field}_{stat}"].append(value)
+        return result
+
+
+class TelemetryArchive:
+    """所有数据源的归档
+
+    attach(store) 后自动归档遥测存储中的全部 0x21 样本 (扫描结果等非状态数据源除外),
+    并启动写入线程; close() 停止写入线程并写入全部数据。
+    _lock 保护内存中的桶, _io_lock 保护磁盘文件, 遥测回调只持有前者。
+    """
+
+    def __init__(self, root=DEFAULT_ARCHIVE_DIR, raw_capacity=DEFAULT_RAW_CAPACITY):
+        self.root = root
+        self.raw_capacity = raw_capacity
+        self._sources = {}
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+
+    def _archive(self, source):
+        archive = self._sources.get(source)
+        if archive is None:
+            archive = self._sources[source] = SourceArchive(self.root, source, self.raw_capacity)
+        return archive
+
+    def record(self, source, sample):
+        if 'status' not in sample or '#' in source:
+            return
+        with self._lock:
+            self._archive(source).add(sample)
+
+    def attach(self, store):
+        store.add_listener(self.record)
+        if self._flusher is None:
+            self._stop.clear()
+            self._flusher = threading.Thread(target=self._flush_loop, name="archive-flush", daemon=True)
+            self._flusher.start()
+
+    def detach(self, store):
+        store.remove_listener(self.record)
+
+    def _flush_loop(self):
+        while not self._stop.wait(FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self, close_current=False):
+        """在归档锁内取出已结束的桶, 在锁外写入磁盘"""
+        with self._io_lock:
+            with self._lock:
+                batches = [(archive, tier, tier.take(close_current))
+                           for archive in self._sources.values() for tier in archive.tiers]
+            for archive, tier, batch in batches:
+                if batch is None:
+                    continue
+                try:
+                    tier.write(batch)
+                except OSError as e:
+                    print(f"遥测归档写入失败 {archive.source}: {e}")
+                    with self._lock:
+                        tier.restore(batch)
+
+    def close(self):
+        """停止写入线程并写入全部数据 (包括未结束的桶)"""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush(close_current=True)
+
+    def sources(self):
+        """归档中的数据源 (本次运行的和磁盘上已有的目录名)"""
+        with self._lock:
+            names = {_safe_name(source) for source in self._sources}
+        if os.path.isdir(self.root):
+            names.update(os.listdir(self.root))
+        return sorted(names)
+
+    def query(self, source, start=None, end=None, resolution=1.0):
+        with self._io_lock:
+            with self._lock:
+                archive = self._sources.get(source)
+            if archive is None:
+                archive = SourceArchive(self.root, source, 0)
+            return archive.query(start, end, resolution, self._lock)
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_telemetry_archive():
+    """返回进程级归档单例"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = TelemetryArchive()
+        return _archive
@@ -0,0 +1,42 @@
+"""总线时间戳
+
+收发路径上统一使用 time.monotonic_ns() 打时间戳 (读线程 read() 返回时 / 写线程 write() 返回后),
+显示和日志时再换算为墙上时间, 这样时间戳反映的是总线时序而不是 GUI 线程的处理时刻。
+"""
+
+import time
+from datetime import datetime
+
+# 单调时钟到墙上时间的偏移, 启动时计算一次
+_WALL_OFFSET_NS = time.time_ns() - time.monotonic_ns()
+
+
+class StampedFrame(bytearray):
+    """携带时间戳 (monotonic ns) 的字节数据, 可直接当作 bytearray 使用
+
+    tag 为发送方给已写出帧做的标记 (写队列的合并标识), 接收帧为 None。
+    """
+
+    def __init__(self, data=b"", ts_ns=None, tag=None):
+        super().__init__(data)
+        self.ts_ns = ts_ns if ts_ns is not None else time.monotonic_ns()
+        self.tag = tag
+
+
+def timestamp_of(data):
+    """取数据携带的时间戳, 没有时返回当前时刻"""
+    ts_ns = getattr(data, 'ts_ns', None)
+    return ts_ns if ts_ns is not None else time.monotonic_ns()
+
+
+def wall_time_ns(ts_ns):
+    """单调时钟时间戳换算为 Unix 时间 (ns)"""
+    return ts_ns + _WALL_OFFSET_NS
+
+
+def format_timestamp(ts_ns=None, precision=3):
+    """格式化为 HH:MM:SS.fff (precision 为小数位数, 最多6位)"""
+    if ts_ns is None:
+        ts_ns = time.monotonic_ns()
+    text = datetime.fromtimestamp(wall_time_ns(ts_ns) / 1e9).strftime("%H:%M:%S.%f")
+    return text[:len(text) - 6 + precision] if precision < 6 else text
@@ -0,0 +1,174 @@
+"""串口协议编解码
+
+帧格式: 10 02 | CMD | DATA0 ~ DATAn | CHECKSUM | 10 03
+校验和为帧尾之前所有字节(包含帧头)累加后取低8位。
+本模块只依赖标准库, 可在工作进程和命令行工具中直接使用。
+"""
+
+FRAME_HEAD = b"\x10\x02"
+FRAME_TAIL = b"\x10\x03"
+MIN_FRAME_LENGTH = 8
+
+# 命令字
+CMD_VERSION = 0x20     # 读取软件版本
+CMD_STATUS = 0x21      # 读系统参数
+CMD_STOP = 0x80        # 电机停止
+CMD_START = 0x81       # 电机运行
+CMD_SET_SPEED = 0x82   # 设定转速
+CMD_GEAR = 0x83        # 读取档位
+
+# 系统状态
+STATUS_STOPPED = 0x00
+STATUS_RUNNING = 0x0B
+
+# 故障代码映射
+FAULT_CODES = {
+    0x20: "系统故障",
+    0x21: "15V电压低",
+    0x22: "DC过压",
+    0x23: "DC欠压",
+    0x24: "缺相",
+    0x25: "硬件过流",
+    0x26: "PCB过温",
+    0x27: "IPM过温",
+    0x28: "通讯失联",
+    0x29: "温度传感器故障",
+    0x2A: "软件过流",
+    0x2B: "堵转",
+    0x50: "未知故障",
+}
+
+SPEED_MIN = 600
+SPEED_MAX = 3450
+
+
+def checksum(data):
+    """计算校验和 (累加取低8位)"""
+    return sum(data) & 0xFF
+
+
+def build_frame(cmd, data=b"\x00\x00"):
+    """根据命令字和数据区构造完整帧"""
+    body = FRAME_HEAD + bytes([cmd]) + bytes(data)
+    return body + bytes([checksum(body)]) + FRAME_TAIL
+
+
+def build_speed_frame(speed):
+    """构造设定转速命令帧"""
+    if speed < SPEED_MIN or speed > SPEED_MAX:
+        raise ValueError(f"速度值超出范围 ({SPEED_MIN}-{SPEED_MAX} RPM)")
+    return build_frame(CMD_SET_SPEED, bytes([(speed >> 8) & 0xFF, speed & 0xFF]))
+
+
+def parse_hex(command):
+    """将十六进制字符串 (例如 "10 02 21 00...") 转为字节"""
+    clean_hex = ''.join(c for c in command if c.isalnum() or c.isspace())
+    return bytes.fromhex(clean_hex)
+
+
+def to_hex(data):
+    """将字节转为大写十六进制字符串"""
+    return ' '.join(f"{b:02X}" for b in data)
+
+
+def validate_frame(frame):
+    """校验帧长度、帧头、帧尾与校验和"""
+    if len(frame) < MIN_FRAME_LENGTH:
+        return False
+    if frame[0:2] != FRAME_HEAD or frame[-2:] != FRAME_TAIL:
+        return False
+    return checksum(frame[:-3]) == frame[-3]
+
+
+def status_light(status):
+    """根据系统状态返回 (状态文本, 灯光颜色)"""
+    if status == STATUS_STOPPED:
+        return "停止", "red"
+    if status == STATUS_RUNNING:
+        return "运行", "green"
+    if status in FAULT_CODES:
+        return f"故障: {FAULT_CODES[status]}", "blue"
+    return "未知", "gray"
+
+
+def decode_status(frame):
+    """解析 0x21 应答帧
+
+    DATA0：系统状态
+    DATA1~DATA2：电机转速值
+    DATA3~DATA4：电压值
+    DATA5：IPM温度值
+    DATA6~DATA7：输出功率值
+    返回字典, 帧长度不足时返回 None
+    """
+    if len(frame) < 14 or frame[2] != CMD_STATUS:
+        return None
+    return {
+        'status': frame[3],
+        'speed': (frame[4] << 8) | frame[5],
+        'voltage': (frame[6] << 8) | frame[7],
+        'temperature': frame[8],
+        'power': (frame[9] << 8) | frame[10],
+    }
+
+
+def decode_version(frame):
+    """解析 0x20 应答帧中的版本字符串 (ASCII)"""
+    return ''.join(chr(b) for b in frame[3:-3])
+
+
+class FrameParser:
+    """流式分帧器
+
+    从任意切分的字节流中提取完整帧。数据区中可能出现 10 03,
+    因此只有校验和正确时才认为找到帧尾, 否则继续向后查找。
+    """
+
+    def __init__(self, max_frame_length=64):
+        self.buffer = bytearray()
+        self.max_frame_length = max_frame_length
+        self.dropped_bytes = 0
+
+    def reset(self):
+        """丢弃缓冲区中的残留数据 (重连后重新同步)"""
+        self.dropped_bytes += len(self.buffer)
+        self.buffer.clear()
+
+    def feed(self, data):
+        """追加数据并返回本次提取出的完整帧列表"""
+        self.buffer.extend(data)
+        frames = []
+        buf = self.buffer
+        while True:
+            start = buf.find(FRAME_HEAD)
+            if start < 0:
+                # 保留可能是帧头前半部分的最后一个字节
+                keep = 1 if buf[-1:] == FRAME_HEAD[:1] else 0
+                self.dropped_bytes += len(buf) - keep
+                del buf[:len(buf) - keep]
+                break
+            if start > 0:
+                self.dropped_bytes += start
+                del buf[:start]
+
+            end = buf.find(FRAME_TAIL, 2)
+            frame = None
+            while end >= 0:
+                candidate = buf[:end + 2]
+                if len(candidate) >= MIN_FRAME_LENGTH and checksum(candidate[:-3]) == candidate[-3]:
+                    frame = candidate
+                    break
+                end = buf.find(FRAME_TAIL, end + 1)
+
+            if frame is not None:
+                frames.append(bytes(frame))
+                del buf[:len(frame)]
+                continue
+
+            if len(buf) > self.max_frame_length:
+                # 超长仍未找到有效帧尾, 跳过当前帧头重新同步
+                self.dropped_bytes += 2
+                del buf[:2]
+                continue
+            break
+        return frames
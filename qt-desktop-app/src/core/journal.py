@@ -0,0 +1,391 @@
+"""工位会话日志 (预写式, 掉电安全)
+
+长时间老化测试中程序崩溃或掉电时, 串口显示框和界面状态会全部丢失。每个工位的会话写入一个
+只追加的日志文件, 记录命令、收发帧、显示文本、界面状态、每秒遥测汇总和测试步骤结果。
+
+记录格式 (小端):
+    length u32 | crc32 u32 | kind u8 | ts_ns i64 | body[length]
+crc32 覆盖 kind、ts_ns 和 body; ts_ns 为 Unix 纳秒。文件以 MAGIC 开头。
+
+append() 只把编码好的记录放入内存缓冲区; 提交线程每隔 sync_interval 秒把缓冲区一次写入并
+fsync (组提交), 掉电最多丢失约一个间隔的数据。干净关闭时写入 CLOSE 记录, 文件由 .wal 改名为 .log;
+写入期间持有 .wal 文件的排他锁 (flock / Windows 下 msvcrt.locking), 其他进程 (另一个界面实例、
+仍在运行的 run_plan.py) 据此区分正在写入的会话; 未加锁仍为 .wal 的文件即异常退出的会话,
+recover_journal() 在持锁状态下顺序校验到最后一条完整记录并截断其后内容。
+"""
+
+import json
+import os
+import re
+import struct
+import threading
+import time
+import weakref
+import zlib
+
+from core.clock import wall_time_ns
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+MAGIC = b'QTJ1'
+RECORD_HEADER = struct.Struct('<IIBq')
+CRC_PREFIX = struct.Struct('<Bq')
+MAX_RECORD = 16 * 1024 * 1024
+
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.expanduser('~'), '.qt_desktop_app', 'journal')
+DEFAULT_SYNC_INTERVAL = float(os.environ.get('QT_APP_JOURNAL_SYNC', '0.5'))   # 组提交间隔 (秒)
+KEEP_SESSIONS = 20            # 每个工位保留的已关闭会话数
+
+ACTIVE_SUFFIX = '.wal'
+CLOSED_SUFFIX = '.log'
+
+# 记录类型
+KIND_OPEN = 1       # JSON: 工位名、进程号
+KIND_STATE = 2      # JSON: 界面状态 (串口、波特率、工位绑定等)
+KIND_TX = 3         # 原始发送帧
+KIND_RX = 4         # 原始接收数据
+KIND_TEXT = 5       # 显示框文本行 (UTF-8)
+KIND_ROLLUP = 6     # JSON: 每秒遥测汇总
+KIND_STEP = 7       # JSON: 测试流程事件 (步骤结果等)
+KIND_CLOSE = 8      # JSON: 会话结束
+
+ROLLUP_FIELDS = ('speed', 'voltage', 'temperature', 'power')
+
+_open_journals = weakref.WeakSet()
+
+
+def encode_record(kind, body, ts_ns):
+    prefix = CRC_PREFIX.pack(kind, ts_ns)
+    crc = zlib.crc32(body, zlib.crc32(prefix))
+    return RECORD_HEADER.pack(len(body), crc, kind, ts_ns) + body
+
+
+def _try_lock(fd):
+    """尝试对文件加排他锁 (不阻塞), 已被其他进程持有时返回 False"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def read_journal(path):
+    """顺序读取日志, 返回 (记录列表, 有效字节数)
+
+    记录为 (kind, ts_ns, body); 遇到不完整或校验失败的记录即停止, 其后内容视为未提交。
+    """
+    with open(path, 'rb') as file:
+        return _parse(file.read())
+
+
+def _parse(data):
+    if not data.startswith(MAGIC):
+        return [], 0
+    records = []
+    offset = len(MAGIC)
+    header_size = RECORD_HEADER.size
+    while offset + header_size <= len(data):
+        length, crc, kind, ts_ns = RECORD_HEADER.unpack_from(data, offset)
+        end = offset + header_size + length
+        if length > MAX_RECORD or end > len(data):
+            break
+        body = data[offset + header_size:end]
+        if zlib.crc32(body, zlib.crc32(CRC_PREFIX.pack(kind, ts_ns))) != crc:
+            break
+        records.append((kind, ts_ns, body))
+        offset = end
+    return records, offset
+
+
+def recover_journal(path):
+    """恢复异常退出的会话: 截断未提交的尾部, 补写 CLOSE 记录并改名为 .log, 返回记录列表
+
+    会话仍被其他进程写入 (文件锁被持有) 时不做任何修改, 返回 None。
+    """
+    with open(path, 'r+b') as file:
+        if not _try_lock(file.fileno()):
+            return None
+        file.seek(0)
+        records, valid = _parse(file.read())
+        if valid < len(MAGIC):
+            file.seek(0)
+            file.write(MAGIC)
+            valid = len(MAGIC)
+        file.truncate(valid)
+        file.seek(valid)
+        file.write(encode_record(KIND_CLOSE, json.dumps({'recovered': True}).encode(), time.time_ns()))
+        file.flush()
+        os.fsync(file.fileno())
+        if fcntl is not None:
+            _mark_closed(path)
+    if fcntl is None:
+        _mark_closed(path)
+    return records
+
+
+def _mark_closed(path):
+    """改名为 .log; POSIX 下在释放文件锁之前调用, 其他进程不会看到已写完但未改名的 .wal"""
+    os.replace(path, path[:-len(ACTIVE_SUFFIX)] + CLOSED_SUFFIX)
+
+
+def decode_session(records):
+    """把记录列表整理为会话字典: station / state / text (最后一次清屏之后) / rollups / steps / frames"""
+    session = {'station': None, 'state': {}, 'text': [], 'rollups': [], 'steps': [], 'frames': 0,
+               'started_ns': records[0][1] if records else None, 'ended_ns': records[-1][1] if records else None}
+    for kind, ts_ns, body in records:
+        if kind == KIND_TEXT:
+            session['text'].append(body.decode('utf-8', errors='replace'))
+        elif kind in (KIND_TX, KIND_RX):
+            session['frames'] += 1
+        elif kind == KIND_OPEN:
+            session['station'] = json.loads(body)['station']
+        elif kind == KIND_STATE:
+            state = json.loads(body)
+            if state.pop('display_cleared', False):
+                session['text'] = []
+            session['state'].update(state)
+        elif kind == KIND_ROLLUP:
+            session['rollups'].append(json.loads(body))
+        elif kind == KIND_STEP:
+            session['steps'].append(json.loads(body))
+    return session
+
+
+def _safe_name(name):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'station'
+
+
+def _is_live(path):
+    """会话文件是否仍被某个进程持锁写入"""
+    try:
+        fd = os.open(path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+    except OSError:
+        return True
+    try:
+        return not _try_lock(fd)
+    finally:
+        os.close(fd)   # 关闭即释放刚取得的锁
+
+
+def find_crashed_sessions(directory=DEFAULT_JOURNAL_DIR):
+    """返回异常退出 (仍为 .wal 且无进程持锁) 的会话文件路径"""
+    active = {journal.path for journal in list(_open_journals)}
+    paths = []
+    if not os.path.isdir(directory):
+        return paths
+    for station in sorted(os.listdir(directory)):
+        station_dir = os.path.join(directory, station)
+        if not os.path.isdir(station_dir):
+            continue
+        for name in sorted(os.listdir(station_dir)):
+            path = os.path.join(station_dir, name)
+            if name.endswith(ACTIVE_SUFFIX) and path not in active and not _is_live(path):
+                paths.append(path)
+    return paths
+
+
+def recover_sessions(match, directory=DEFAULT_JOURNAL_DIR):
+    """恢复 match(session) 为真的异常退出会话, 返回 [(路径, 会话字典)] (见 decode_session)"""
+    recovered = []
+    for path in find_crashed_sessions(directory):
+        try:
+            records, _ = read_journal(path)
+            session = decode_session(records)
+            if not match(session):
+                continue
+            records = recover_journal(path)
+        except (OSError, ValueError) as e:
+            print(f"恢复会话日志失败 {path}: {e}")
+            continue
+        if records is not None:
+            recovered.append((path, decode_session(records)))
+    return recovered
+
+
+def open_session(station, state=None, directory=DEFAULT_JOURNAL_DIR, sync_interval=DEFAULT_SYNC_INTERVAL):
+    """为工位新建会话日志, 并清理该工位较早的已关闭会话"""
+    station_dir = os.path.join(directory, _safe_name(station))
+    os.makedirs(station_dir, exist_ok=True)
+    closed = sorted(name for name in os.listdir(station_dir) if name.endswith(CLOSED_SUFFIX))
+    for name in closed[:max(0, len(closed) - KEEP_SESSIONS + 1)]:
+        try:
+            os.remove(os.path.join(station_dir, name))
+        except OSError as e:
+            print(f"清理会话日志失败: {e}")
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{time.monotonic_ns() % 1000000:06d}{ACTIVE_SUFFIX}"
+    journal = SessionJournal(os.path.join(station_dir, name), sync_interval)
+    journal.append_json(KIND_OPEN, {'station': station, 'pid': os.getpid()})
+    if state:
+        journal.append_json(KIND_STATE, state)
+    return journal
+
+
+def close_open_journals():
+    """关闭本进程所有未关闭的会话日志 (程序退出时调用)"""
+    for journal in list(_open_journals):
+        journal.close()
+
+
+class SessionJournal:
+    """一个会话的预写式日志
+
+    append 系列方法线程安全且不做系统调用, 可在串口读线程和界面线程中直接调用。
+    """
+
+    def __init__(self, path, sync_interval=DEFAULT_SYNC_INTERVAL):
+        self.path = path
+        self.sync_interval = sync_interval
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0), 0o644)
+        if not _try_lock(self._fd):
+            os.close(self._fd)
+            raise OSError(f"会话日志已被其他进程占用: {path}")
+        if os.fstat(self._fd).st_size == 0:
+            os.write(self._fd, MAGIC)
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._rollup_second = None
+        self._rollup_samples = []
+        self._sources = {}
+        self.records = 0
+        self.commits = 0
+        self.bytes_written = 0
+        self.closed = False
+        _open_journals.add(self)
+        self._thread = threading.Thread(target=self._commit_loop, name="journal-commit", daemon=True)
+        self._thread.start()
+
+    # ===== 追加 =====
+
+    def append(self, kind, body=b'', ts_ns=None):
+        """追加一条记录, ts_ns 为单调时钟时间戳 (省略时取当前时间)"""
+        if self.closed:
+            return
+        record = encode_record(kind, bytes(body), wall_time_ns(ts_ns) if ts_ns is not None else time.time_ns())
+        with self._lock:
+            self._buffer.append(record)
+            self.records += 1
+
+    def append_json(self, kind, value, ts_ns=None):
+        self.append(kind, json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'), ts_ns)
+
+    def record_text(self, line):
+        self.append(KIND_TEXT, line.encode('utf-8'))
+
+    def record_frame(self, kind, frame, ts_ns=None):
+        if isinstance(frame, str):
+            frame = bytes.fromhex(frame.replace(' ', ''))
+        self.append(kind, frame, ts_ns)
+
+    def record_state(self, **state):
+        self.append_json(KIND_STATE, state)
+
+    def record_event(self, event):
+        """测试流程事件 (PlanRunner 的 on_event 可直接使用)"""
+        self.append_json(KIND_STEP, event)
+
+    # ===== 遥测汇总 =====
+
+    def record_sample(self, sample):
+        """累积 0x21 样本, 每跨过一秒追加一条汇总 (count / min / max / mean / last)"""
+        second = sample['ts_ns'] // 1000000000
+        with self._lock:
+            if self._rollup_second is not None and second != self._rollup_second:
+                samples, self._rollup_samples = self._rollup_samples, []
+            else:
+                samples = None
+            self._rollup_second = second
+            self._rollup_samples.append(sample)
+        if samples:
+            self._append_rollup(samples)
+
+    def _append_rollup(self, samples):
+        rollup = {'count': len(samples), 'status': samples[-1].get('status')}
+        for field in ROLLUP_FIELDS:
+            values = [sample[field] for sample in samples if field in sample]
+            if values:
+                rollup[field] = {'min': min(values), 'max': max(values),
+                                 'mean': round(sum(values) / len(values), 2), 'last': values[-1]}
+        self.append_json(KIND_ROLLUP, rollup, samples[0]['ts_ns'])
+
+    def attach(self, store, source):
+        """订阅遥测存储中 source 的样本"""
+        def listener(sample_source, sample):
+            if sample_source == source:
+                self.record_sample(sample)
+        self._sources[source] = (store, listener)
+        store.add_listener(listener)
+
+    def detach(self):
+        for store, listener in self._sources.values():
+            store.remove_listener(listener)
+        self._sources.clear()
+
+    # ===== 组提交 =====
+
+    def _commit_loop(self):
+        while not self.closed:
+            self._wake.wait(self.sync_interval)
+            if self.closed:
+                return
+            try:
+                self.commit()
+            except OSError as e:
+                print(f"会话日志写入失败: {e}")
+
+    def commit(self):
+        """把缓冲区写入文件并 fsync, 返回写入的字节数"""
+        with self._write_lock:
+            with self._lock:
+                if not self._buffer:
+                    return 0
+                data = b''.join(self._buffer)
+                self._buffer.clear()
+            view = memoryview(data)
+            while view:
+                written = os.write(self._fd, view)
+                view = view[written:]
+            os.fsync(self._fd)
+            self.commits += 1
+            self.bytes_written += len(data)
+            return len(data)
+
+    def close(self):
+        """写入 CLOSE 记录, 提交并改名为 .log"""
+        if self.closed:
+            return
+        self.detach()
+        with self._lock:
+            samples, self._rollup_samples = self._rollup_samples, []
+        if samples:
+            self._append_rollup(samples)
+        self.append_json(KIND_CLOSE, {'records': self.records + 1})
+        self.closed = True
+        self._wake.set()
+        self._thread.join(self.sync_interval + 1.0)
+        try:
+            self.commit()
+            if fcntl is not None:
+                _mark_closed(self.path)
+        finally:
+            os.close(self._fd)
+            _open_journals.discard(self)
+        if fcntl is None:
+            # Windows 下不能改名仍打开的文件
+            _mark_closed(self.path)
+
+    def stats(self):
+        return {'records': self.records, 'commits': self.commits, 'bytes': self.bytes_written,
+                'pending': len(self._buffer)}
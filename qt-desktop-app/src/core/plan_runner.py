@@ -0,0 +1,292 @@
+"""测试流程执行器
+
+在 asyncio 事件循环上对任意数量的串口并行执行同一测试流程 (每个串口一个协程)。
+串口读取在各自的读线程中完成, 应答经事务引擎匹配后交回事件循环。
+每个步骤的耗时、判定结果和测量值以 JSON Lines 实时输出, 结束后可生成 JUnit 风格的汇总 XML。
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+from core.clock import StampedFrame, wall_time_ns
+from core.codec import (CMD_START, CMD_STATUS, CMD_STOP, CMD_VERSION, FrameParser,
+                        build_frame, build_speed_frame, decode_status, decode_version, parse_hex, to_hex)
+from core.plans import measured_values
+from core.telemetry import get_telemetry_store
+from core.transactions import TransactionEngine, TransactionError
+from core.transport import open_transport
+
+READ_TIMEOUT = 0.2
+
+RESULT_PASS = 'pass'
+RESULT_FAIL = 'fail'
+RESULT_ERROR = 'error'
+RESULT_SKIPPED = 'skipped'
+
+
+class PortSession:
+    """测试流程使用的串口会话: 传输 + 读线程 + 事务引擎"""
+
+    def __init__(self, port_name, baud_rate, reply_timeout, telemetry=None):
+        self.port_name = port_name
+        self.baud_rate = baud_rate
+        self.reply_timeout = reply_timeout
+        self.telemetry = telemetry or get_telemetry_store()
+        self.transport = None
+        self.firmware = None     # 0x20 应答的固件版本
+        self.faults = set()      # 测试过程中出现的故障码
+        self.engine = TransactionEngine(self._write, default_timeout=reply_timeout)
+        self._parser = FrameParser()
+        self._running = False
+        self._reader = None
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        self.transport = await loop.run_in_executor(
+            None, open_transport, self.port_name, self.baud_rate, READ_TIMEOUT)
+        self._running = True
+        self._reader = threading.Thread(target=self._read_loop, name=f"plan-reader-{self.port_name}", daemon=True)
+        self._reader.start()
+
+    def close(self):
+        self._running = False
+        self.engine.cancel_all("串口已关闭")
+        if self.transport is not None:
+            self.transport.close()
+        if self._reader:
+            self._reader.join(READ_TIMEOUT * 2)
+
+    def _write(self, frame):
+        try:
+            self.transport.write(frame)
+            return True
+        except Exception as e:
+            print(f"{self.port_name} 发送失败: {e}")
+            return False
+
+    def _read_loop(self):
+        while self._running:
+            try:
+                data = self.transport.read(1)
+                if not data:
+                    continue
+                ts_ns = time.monotonic_ns()
+                waiting = self.transport.in_waiting
+                if waiting:
+                    data += self.transport.read(waiting)
+            except Exception as e:
+                if self._running:
+                    print(f"{self.port_name} 读取失败: {e}")
+                    self.engine.cancel_all(f"读取失败: {e}")
+                return
+            for frame in self._parser.feed(data):
+                frame = StampedFrame(frame, ts_ns)
+                self.engine.feed(frame)
+                self.telemetry.record_frame(self.port_name, frame)
+
+    async def request(self, frame, timeout=None):
+        """发送请求并等待应答, 返回 Transaction; 失败时抛出 TransactionError"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def done(txn):
+            loop.call_soon_threadsafe(_resolve, future, txn)
+
+        self.engine.submit(frame, timeout=timeout, callback=done)
+        txn = await future
+        if txn.error:
+            raise TransactionError(txn.error)
+        return txn
+
+
+def _resolve(future, txn):
+    if not future.done():
+        future.set_result(txn)
+
+
+class PlanRunner:
+    """并行执行测试流程
+
+    on_event(event) 对每个事件 (流程开始/步骤结果/流程结束) 调用, 事件为可 JSON 序列化的字典。
+    """
+
+    def __init__(self, plan, ports, on_event=None):
+        self.plan = plan
+        self.ports = list(ports)
+        self.on_event = on_event
+
+    def run(self):
+        """同步入口, 返回 {port: 流程结果}"""
+        return asyncio.run(self.run_async())
+
+    async def run_async(self):
+        results = await asyncio.gather(*(self._run_port(port) for port in self.ports))
+        return dict(zip(self.ports, results))
+
+    def _emit(self, event):
+        event['ts'] = wall_time_ns(time.monotonic_ns()) / 1e9
+        if self.on_event:
+            self.on_event(event)
+
+    async def _run_port(self, port):
+        started = time.monotonic()
+        self._emit({'event': 'plan_start', 'plan': self.plan.name, 'port': port})
+        result = {'plan': self.plan.name, 'port': port, 'steps': [], 'result': RESULT_PASS,
+                  'started_at': time.time()}
+        session = PortSession(port, self.plan.baud_rate, self.plan.reply_timeout)
+        try:
+            await session.open()
+        except Exception as e:
+            result['result'] = RESULT_ERROR
+            result['message'] = f"打开串口失败: {e}"
+        else:
+            try:
+                await self._run_steps(session, result)
+            finally:
+                session.close()
+            result['firmware'] = session.firmware
+            result['faults'] = sorted(session.faults)
+        result['duration_ms'] = round((time.monotonic() - started) * 1000, 1)
+        self._emit({'event': 'plan_end', 'plan': self.plan.name, 'port': port,
+                    'result': result['result'], 'duration_ms': result['duration_ms'],
+                    'message': result.get('message')})
+        return result
+
+    async def _run_steps(self, session, result):
+        aborted = False
+        for step in self.plan.steps:
+            if aborted and not step.always:
+                step_result = {'step': step.name, 'action': step.action, 'result': RESULT_SKIPPED,
+                               'duration_ms': 0, 'measurements': []}
+            else:
+                step_result = await self._run_step(session, step)
+                if step_result['result'] != RESULT_PASS:
+                    if result['result'] == RESULT_PASS:
+                        result['result'] = step_result['result']
+                    aborted = aborted or self.plan.stop_on_fail
+            result['steps'].append(step_result)
+            self._emit(dict(step_result, event='step', plan=self.plan.name, port=session.port_name))
+
+    async def _run_step(self, session, step):
+        started = time.monotonic()
+        step_result = {'step': step.name, 'action': step.action, 'measurements': []}
+        try:
+            passed, measurements = await self._execute(session, step)
+            step_result['result'] = RESULT_PASS if passed else RESULT_FAIL
+            step_result['measurements'] = measurements
+        except TransactionError as e:
+            step_result['result'] = RESULT_ERROR
+            step_result['message'] = str(e)
+        except Exception as e:
+            # 意外错误只影响本步骤, 其余串口和 always 步骤照常执行
+            print(f"{session.port_name} 步骤 {step.name} 执行失败: {e!r}")
+            step_result['result'] = RESULT_ERROR
+            step_result['message'] = f"内部错误: {e!r}"
+        step_result['duration_ms'] = round((time.monotonic() - started) * 1000, 2)
+        return step_result
+
+    async def _execute(self, session, step):
+        """执行一个步骤, 返回 (是否通过, 测量结果列表)"""
+        if step.action == 'wait':
+            await asyncio.sleep(step.seconds)
+            return True, []
+        if step.action == 'status':
+            return step.evaluate(await self._read_status(session))
+        if step.action == 'wait_for':
+            deadline = time.monotonic() + step.timeout
+            while True:
+                try:
+                    passed, measurements = step.evaluate(await self._read_status(session))
+                except TransactionError:
+                    # 升速等过程中偶尔漏掉的应答在 timeout 内重试
+                    if time.monotonic() >= deadline:
+                        raise
+                else:
+                    if passed or time.monotonic() >= deadline:
+                        return passed, measurements
+                await asyncio.sleep(step.interval)
+        if step.action == 'version':
+            txn = await session.request(build_frame(CMD_VERSION), step.timeout)
+            session.firmware = decode_version(txn.reply)
+            return step.evaluate({'version': session.firmware})
+
+        if step.action == 'set_speed':
+            frame = build_speed_frame(step.speed)
+        elif step.action == 'start':
+            frame = build_frame(CMD_START)
+        elif step.action == 'stop':
+            frame = build_frame(CMD_STOP)
+        else:
+            frame = parse_hex(step.data)
+        txn = await session.request(frame, step.timeout)
+        reply = txn.reply
+        values = {
+            'reply': to_hex(reply),
+            'ack': len(reply) >= 8 and reply[4] == 0x01,
+            'latency_ms': txn.latency_ms,
+        }
+        return step.evaluate(values)
+
+    async def _read_status(self, session):
+        txn = await session.request(build_frame(CMD_STATUS))
+        sample = decode_status(txn.reply)
+        if sample is None:
+            raise TransactionError(f"状态应答格式错误: {to_hex(txn.reply)}")
+        values = measured_values(sample)
+        if values['fault']:
+            session.faults.add(sample['status'])
+        values['latency_ms'] = txn.latency_ms
+        return values
+
+
+class JsonLinesWriter:
+    """逐行输出事件 (JSON Lines), 每行立即刷新"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+
+def write_junit(results, path):
+    """生成 JUnit 风格汇总: 每个串口一个 testsuite, 每个步骤一个 testcase"""
+    root = ET.Element('testsuites')
+    for port, result in results.items():
+        steps = result['steps']
+        suite = ET.SubElement(root, 'testsuite', {
+            'name': f"{result['plan']}@{port}",
+            'tests': str(len(steps)),
+            'failures': str(sum(1 for step in steps if step['result'] == RESULT_FAIL)),
+            'errors': str(sum(1 for step in steps if step['result'] == RESULT_ERROR)
+                          + (1 if result['result'] == RESULT_ERROR and not steps else 0)),
+            'skipped': str(sum(1 for step in steps if step['result'] == RESULT_SKIPPED)),
+            'time': f"{result['duration_ms'] / 1000:.3f}",
+        })
+        if result.get('message'):
+            ET.SubElement(suite, 'system-err').text = result['message']
+        for step in steps:
+            case = ET.SubElement(suite, 'testcase', {
+                'classname': f"{result['plan']}.{port}",
+                'name': step['step'],
+                'time': f"{step['duration_ms'] / 1000:.3f}",
+            })
+            details = '\n'.join(json.dumps(item, ensure_ascii=False) for item in step['measurements'])
+            if step['result'] == RESULT_FAIL:
+                failed = [item['field'] for item in step['measurements'] if not item['pass']]
+                ET.SubElement(case, 'failure', {'message': f"超限: {', '.join(failed)}"}).text = details
+            elif step['result'] == RESULT_ERROR:
+                ET.SubElement(case, 'error', {'message': step.get('message', '')})
+            elif step['result'] == RESULT_SKIPPED:
+                ET.SubElement(case, 'skipped')
+            if details:
+                ET.SubElement(case, 'system-out').text = details
+    ET.ElementTree(root).write(path, encoding='utf-8', xml_declaration=True)
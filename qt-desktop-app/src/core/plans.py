@@ -0,0 +1,206 @@
+"""声明式测试流程
+
+测试流程为 JSON 文件, 由一系列步骤组成, 每个步骤执行一个动作并可对结果设置期望 (上下限):
+
+    {
+        "name": "电机板出厂测试",
+        "baud": 9600,
+        "reply_timeout": 0.5,
+        "stop_on_fail": true,
+        "steps": [
+            {"name": "读取版本", "action": "version", "expect": {"version": {"equals": "VD2.0.0"}}},
+            {"name": "设定转速", "action": "set_speed", "speed": 1500},
+            {"name": "启动电机", "action": "start"},
+            {"name": "等待升速", "action": "wait_for", "timeout": 10, "interval": 0.2,
+             "expect": {"status": {"equals": "running"}, "speed": {"min": 1400, "max": 1600}}},
+            {"name": "保持运行", "action": "wait", "seconds": 2},
+            {"name": "运行参数", "action": "status",
+             "expect": {"fault": {"equals": false}, "power": {"max": 60}}},
+            {"name": "停止电机", "action": "stop", "always": true}
+        ]
+    }
+
+动作:
+    status      查询 0x21, 期望字段: status/speed/voltage/temperature/power/fault
+    version     查询 0x20, 期望字段: version
+    set_speed   发送 0x82 (speed)
+    start/stop  发送 0x81 / 0x80
+    send        发送任意帧 (data 为十六进制字符串), 等待同 CMD 应答
+    wait        等待 seconds 秒
+    wait_for    按 interval 轮询 0x21 直到期望全部满足, 超过 timeout 判为失败
+
+期望: {"min": x, "max": y} / {"equals": v} / {"in": [..]}, min/max 只能用于数值字段。
+status/wait_for 的期望字段见 STATUS_FIELDS (另有 fault_name、latency_ms), version 为 version,
+set_speed/start/stop/send 为 reply (十六进制应答)、ack (应答数据为 01) 和 latency_ms。
+加载时检查字段和参数类型, 格式错误抛出 PlanError。
+status 字段可以写 "running" / "stopped" 或数值; fault 字段为是否处于故障, 附带故障名称。
+always 为 true 的步骤在前面步骤失败后仍会执行 (例如停机)。
+"""
+
+import json
+
+from core.codec import FAULT_CODES, STATUS_RUNNING, STATUS_STOPPED, SPEED_MAX, SPEED_MIN, parse_hex
+
+ACTIONS = ('status', 'version', 'set_speed', 'start', 'stop', 'send', 'wait', 'wait_for')
+STATUS_FIELDS = ('status', 'speed', 'voltage', 'temperature', 'power', 'fault')
+STATUS_NAMES = {'running': STATUS_RUNNING, 'stopped': STATUS_STOPPED}
+
+# 各动作可判定的字段, 未列出的动作 (set_speed/start/stop/send) 使用 COMMAND_EXPECT
+STATUS_EXPECT = STATUS_FIELDS + ('fault_name', 'latency_ms')
+COMMAND_EXPECT = ('reply', 'ack', 'latency_ms')
+EXPECT_FIELDS = {'status': STATUS_EXPECT, 'wait_for': STATUS_EXPECT, 'version': ('version',), 'wait': ()}
+# 可设置 min/max 的数值字段
+NUMERIC_FIELDS = ('status', 'speed', 'voltage', 'temperature', 'power', 'latency_ms')
+
+
+class PlanError(Exception):
+    """测试流程格式错误"""
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _number(spec, key, default, where):
+    """读取非负数值参数, 缺省为 default"""
+    value = spec.get(key, default)
+    if value is None:
+        return None
+    if not _is_number(value) or value < 0:
+        raise PlanError(f"{where}: {key} 必须为非负数值")
+    return float(value)
+
+
+class Limit:
+    """单个字段的期望"""
+
+    def __init__(self, field, spec):
+        if not isinstance(spec, dict):
+            spec = {'equals': spec}
+        unknown = set(spec) - {'min', 'max', 'equals', 'in'}
+        if unknown:
+            raise PlanError(f"字段 {field} 的期望包含未知键: {', '.join(sorted(unknown))}")
+        for key in ('min', 'max'):
+            if spec.get(key) is None:
+                continue
+            if field not in NUMERIC_FIELDS:
+                raise PlanError(f"字段 {field} 不是数值, 不能设置 {key}")
+            if not _is_number(spec[key]):
+                raise PlanError(f"字段 {field} 的 {key} 必须为数值")
+        if 'in' in spec and not isinstance(spec['in'], list):
+            raise PlanError(f"字段 {field} 的 in 必须为列表")
+        self.field = field
+        self.min = spec.get('min')
+        self.max = spec.get('max')
+        self.equals = self._normalize(spec['equals']) if 'equals' in spec else None
+        self.has_equals = 'equals' in spec
+        self.choices = [self._normalize(value) for value in spec['in']] if 'in' in spec else None
+
+    def _normalize(self, value):
+        if self.field == 'status' and isinstance(value, str):
+            if value not in STATUS_NAMES:
+                raise PlanError(f"未知状态: {value}")
+            return STATUS_NAMES[value]
+        return value
+
+    def check(self, value):
+        """返回测量结果字典"""
+        passed = value is not None
+        if passed and self.min is not None:
+            passed = value >= self.min
+        if passed and self.max is not None:
+            passed = value <= self.max
+        if passed and self.has_equals:
+            passed = value == self.equals
+        if passed and self.choices is not None:
+            passed = value in self.choices
+        result = {'field': self.field, 'value': value, 'pass': passed}
+        for key in ('min', 'max', 'equals'):
+            if getattr(self, key) is not None:
+                result[key] = getattr(self, key)
+        if self.choices is not None:
+            result['in'] = self.choices
+        return result
+
+
+def measured_values(sample):
+    """由 0x21 样本得到可判定的字段 (附加 fault 与故障名称)"""
+    values = {field: sample.get(field) for field in STATUS_FIELDS if field in sample}
+    values['fault'] = sample.get('status') in FAULT_CODES
+    if values['fault']:
+        values['fault_name'] = FAULT_CODES[sample['status']]
+    return values
+
+
+class Step:
+    """测试步骤"""
+
+    def __init__(self, spec, index):
+        if not isinstance(spec, dict):
+            raise PlanError(f"第 {index + 1} 步必须为 JSON 对象")
+        if 'action' not in spec:
+            raise PlanError(f"第 {index + 1} 步缺少 action")
+        self.action = spec['action']
+        if self.action not in ACTIONS:
+            raise PlanError(f"第 {index + 1} 步动作未知: {self.action}")
+        self.name = str(spec.get('name') or f"{index + 1:02d}_{self.action}")
+        self.always = bool(spec.get('always', False))
+        self.timeout = _number(spec, 'timeout', None, self.name)
+        self.interval = _number(spec, 'interval', 0.2, self.name)
+        self.seconds = _number(spec, 'seconds', 0, self.name)
+        self.speed = spec.get('speed')
+        self.data = spec.get('data')
+        expect = spec.get('expect') or {}
+        if not isinstance(expect, dict):
+            raise PlanError(f"{self.name}: expect 必须为 JSON 对象")
+        fields = EXPECT_FIELDS.get(self.action, COMMAND_EXPECT)
+        unknown = set(expect) - set(fields)
+        if unknown:
+            raise PlanError(f"{self.name}: {self.action} 动作不能判定字段 {', '.join(sorted(unknown))}")
+        self.limits = [Limit(field, limit) for field, limit in expect.items()]
+
+        if self.action == 'set_speed':
+            if not isinstance(self.speed, int) or not SPEED_MIN <= self.speed <= SPEED_MAX:
+                raise PlanError(f"{self.name}: speed 必须在 {SPEED_MIN}-{SPEED_MAX} RPM 之间")
+        if self.action == 'send':
+            if not self.data or not isinstance(self.data, str):
+                raise PlanError(f"{self.name}: send 动作缺少 data")
+            try:
+                frame = parse_hex(self.data)
+            except ValueError:
+                frame = b''
+            if len(frame) < 3:
+                raise PlanError(f"{self.name}: data 不是有效的帧: {self.data}")
+        if self.action == 'wait_for' and (not self.limits or self.timeout is None):
+            raise PlanError(f"{self.name}: wait_for 需要 expect 和 timeout")
+
+    def evaluate(self, values):
+        """按期望判定, 返回 (是否通过, 测量结果列表)"""
+        measurements = [limit.check(values.get(limit.field)) for limit in self.limits]
+        return all(item['pass'] for item in measurements), measurements
+
+
+class TestPlan:
+    """测试流程"""
+
+    def __init__(self, spec):
+        if not isinstance(spec, dict):
+            raise PlanError("测试流程必须为 JSON 对象")
+        if not isinstance(spec.get('steps'), list) or not spec['steps']:
+            raise PlanError("测试流程缺少 steps")
+        self.name = str(spec.get('name', 'plan'))
+        baud = spec.get('baud', 9600)
+        if not isinstance(baud, int) or isinstance(baud, bool) or baud <= 0:
+            raise PlanError("baud 必须为正整数")
+        self.baud_rate = baud
+        self.reply_timeout = _number(spec, 'reply_timeout', 0.5, self.name)
+        self.stop_on_fail = bool(spec.get('stop_on_fail', True))
+        self.steps = [Step(step, index) for index, step in enumerate(spec['steps'])]
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                return cls(json.load(file))
+        except ValueError as e:
+            raise PlanError(f"测试流程文件格式错误 {path}: {e}")
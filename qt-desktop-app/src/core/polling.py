@@ -0,0 +1,172 @@
+"""自适应状态轮询
+
+每个串口一个轮询线程, 通过事务引擎周期查询 0x21, 与用户命令共用同一在途槽位, 自身最多一条在途。
+数值变化或处于启停过渡时按最快间隔轮询, 稳定后逐步放慢到最慢间隔, 以最低的总线和 CPU 开销
+得到平滑的实时读数。
+
+过期应答的处理:
+    - 轮询重启 (stop/start) 后, 旧一轮的应答直接丢弃
+    - 应答时间戳不晚于上一个已采用样本的丢弃 (乱序)
+    - 交付时已超过 max_age 的样本丢弃 (例如长时间排在用户命令之后)
+    - 超时后静默一段时间再发下一条, 让迟到的旧应答在没有请求在途时到达, 由事务引擎忽略,
+      不会被错配给新请求
+"""
+
+import threading
+import time
+
+from core.codec import CMD_STATUS, build_frame, decode_status
+from core.transactions import TransactionError
+
+DEFAULT_MIN_INTERVAL = 0.05   # 最快轮询间隔 (秒), 0 表示应答到达后立即发下一条
+DEFAULT_MAX_INTERVAL = 1.0    # 稳态时的最慢轮询间隔 (秒)
+SLOWDOWN_FACTOR = 1.25        # 稳态时每次轮询间隔放大倍数
+FAST_POLLS_AFTER_CHANGE = 10  # 数值变化后保持最快速率的轮询次数
+
+# 视为 "变化" 的门限
+CHANGE_THRESHOLDS = {'speed': 5, 'voltage': 2, 'temperature': 1, 'power': 1}
+
+
+class StatusPoller:
+    """自适应 0x21 状态轮询
+
+    transactions 为串口的 TransactionEngine; on_sample(sample) 在轮询线程中对每个采用的样本调用。
+    """
+
+    def __init__(self, transactions, on_sample=None, min_interval=DEFAULT_MIN_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL, reply_timeout=0.5, max_age=None):
+        self.transactions = transactions
+        self.on_sample = on_sample
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.reply_timeout = reply_timeout
+        self.max_age = max_age
+        self.interval = self.min_interval
+        self._query = build_frame(CMD_STATUS)
+        self._generation = 0
+        self._running = False
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._fast_polls = FAST_POLLS_AFTER_CHANGE
+        self._fast_until = 0.0
+        self._last = None
+        self._last_ts_ns = 0
+
+        # 统计信息
+        self.polls = 0
+        self.samples = 0
+        self.timeouts = 0
+        self.stale = 0
+
+    @property
+    def is_running(self):
+        return self._running
+
+    def set_rate(self, min_interval=None, max_interval=None):
+        """运行中修改轮询间隔范围 (秒)"""
+        if min_interval is not None:
+            self.min_interval = min_interval
+        if max_interval is not None:
+            self.max_interval = max_interval
+        self.max_interval = max(self.max_interval, self.min_interval)
+        self.interval = min(max(self.interval, self.min_interval), self.max_interval)
+        self._wakeup.set()
+
+    def boost(self, duration=2.0):
+        """在 duration 秒内按最快速率轮询 (下发启停/设定转速后调用), 并立即发起一次轮询"""
+        self._fast_until = time.monotonic() + duration
+        self.interval = self.min_interval
+        self._wakeup.set()
+
+    def start(self):
+        if self._running:
+            return
+        self._generation += 1
+        self._running = True
+        self._last = None
+        self._last_ts_ns = 0
+        self.interval = self.min_interval
+        self._wakeup.clear()
+        self._thread = threading.Thread(target=self._run, args=(self._generation,),
+                                        name="status-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=False):
+        """停止轮询; 旧线程看到轮次变化后自行退出, 默认不等待 (界面线程中调用)"""
+        self._running = False
+        self._generation += 1
+        self._wakeup.set()
+        if wait and self._thread and self._thread is not threading.current_thread():
+            self._thread.join(self.reply_timeout + 1.5)
+        self._thread = None
+
+    def _run(self, generation):
+        while self._running and generation == self._generation:
+            started = time.monotonic()
+            try:
+                txn = self.transactions.submit(self._query, timeout=self.reply_timeout)
+                self.polls += 1
+                reply = txn.wait(self.reply_timeout + 1.0)
+            except TransactionError:
+                self.timeouts += 1
+                # 静默等待迟到的旧应答, 避免错配给下一条请求
+                self._wakeup.wait(self.reply_timeout / 2)
+                self._wakeup.clear()
+                continue
+            if generation != self._generation:
+                self.stale += 1
+                return
+            self._accept(txn.reply_ns, reply)
+
+            delay = self.interval - (time.monotonic() - started)
+            if delay > 0:
+                self._wakeup.wait(delay)
+            self._wakeup.clear()
+
+    def _accept(self, reply_ns, reply):
+        sample = decode_status(reply)
+        if sample is None:
+            return
+        if reply_ns <= self._last_ts_ns:
+            self.stale += 1
+            return
+        if self.max_age is not None and time.monotonic_ns() - reply_ns > self.max_age * 1e9:
+            self.stale += 1
+            return
+        self._last_ts_ns = reply_ns
+        self._adapt(sample)
+        self._last = sample
+        self.samples += 1
+        if self.on_sample:
+            sample = dict(sample, ts_ns=reply_ns)
+            try:
+                self.on_sample(sample)
+            except Exception as e:
+                print(f"状态样本处理失败: {e}")
+
+    def _changed(self, sample):
+        last = self._last
+        if last is None or sample['status'] != last['status']:
+            return True
+        return any(abs(sample[field] - last[field]) >= threshold
+                   for field, threshold in CHANGE_THRESHOLDS.items())
+
+    def _adapt(self, sample):
+        """变化或过渡期间取最快间隔, 稳定后逐步放慢"""
+        if self._changed(sample):
+            self._fast_polls = FAST_POLLS_AFTER_CHANGE
+        if self._fast_polls > 0 or time.monotonic() < self._fast_until:
+            self._fast_polls = max(0, self._fast_polls - 1)
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, max(self.interval, 0.01) * SLOWDOWN_FACTOR)
+
+    def stats(self):
+        return {
+            'running': self._running,
+            'interval_ms': round(self.interval * 1000, 1),
+            'polls': self.polls,
+            'samples': self.samples,
+            'timeouts': self.timeouts,
+            'stale': self.stale,
+        }
@@ -0,0 +1,263 @@
+"""测试结果数据库
+
+本地 SQLite (WAL 模式) 保存每块板的测试记录: 序列号、工位、测试流程、起止时间、固件版本 (0x20)、
+测量值、判定结果和故障码。
+
+写入由后台线程批量完成: record_run() 只把记录放入队列, 写线程每次取出队列中的全部记录,
+在一个事务内插入, 界面和测试流程不会被磁盘 IO 阻塞。查询在调用线程自己的只读连接上执行,
+WAL 模式下与写入互不阻塞。
+
+表结构:
+    runs          每次测试一行 (serial/station/plan/started_at/finished_at/firmware/result/duration_ms)
+    measurements  每个测量值一行 (run_id/step/field/value/text/pass)
+    run_faults    每个故障码一行 (code/run_id), 按故障码查询走 (code, started_at) 索引
+时间均为 Unix 秒。
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser('~'), '.qt_desktop_app', 'results.db')
+BATCH_INTERVAL = 0.2     # 写线程凑批的最长等待时间 (秒)
+MAX_BATCH = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    serial TEXT NOT NULL,
+    station TEXT,
+    plan TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    firmware TEXT,
+    result TEXT NOT NULL,
+    duration_ms REAL,
+    message TEXT
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    step TEXT,
+    field TEXT NOT NULL,
+    value NUMERIC,
+    text TEXT,
+    pass INTEGER
+);
+CREATE TABLE IF NOT EXISTS run_faults (
+    code INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    run_id INTEGER NOT NULL REFERENCES runs(id)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_serial ON runs(serial, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_measurements_run ON measurements(run_id);
+CREATE INDEX IF NOT EXISTS idx_run_faults_code ON run_faults(code, started_at, run_id);
+"""
+
+RUN_COLUMNS = ('id', 'serial', 'station', 'plan', 'started_at', 'finished_at', 'firmware', 'result',
+               'duration_ms', 'message')
+
+
+def run_from_plan_result(result, serial=None, station=None):
+    """把 PlanRunner 的单个串口结果转为 record_run() 使用的记录
+
+    固件版本和故障码取自执行器记录的 firmware / faults (测试过程中 0x20 / 0x21 的应答)。
+    """
+    finished_at = time.time()
+    measurements = [{'step': step['step'], 'field': item['field'], 'value': item['value'], 'pass': item['pass']}
+                    for step in result['steps'] for item in step['measurements']]
+    return {
+        'serial': serial or result['port'],
+        'station': station or result['port'],
+        'plan': result['plan'],
+        'started_at': result.get('started_at', finished_at - result.get('duration_ms', 0) / 1000),
+        'finished_at': finished_at,
+        'firmware': result.get('firmware'),
+        'result': result['result'],
+        'duration_ms': result.get('duration_ms'),
+        'message': result.get('message'),
+        'measurements': measurements,
+        'faults': result.get('faults', []),
+    }
+
+
+class ResultsDatabase:
+    """测试结果库: 后台批量写入 + 线程本地只读连接"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._pending = 0
+        self._idle = threading.Condition()
+        self.written = 0
+        self.batches = 0
+
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        connection.commit()
+        connection.close()
+
+        self._running = True
+        self._writer = threading.Thread(target=self._write_loop, name="results-db-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    # ===== 写入 =====
+
+    def record_run(self, run):
+        """放入写队列 (不阻塞); run 字段见 run_from_plan_result"""
+        with self._idle:
+            self._pending += 1
+        self._queue.put(run)
+
+    def flush(self, timeout=5.0):
+        """等待队列中的记录全部写入, 超时返回 False"""
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self):
+        self.flush()
+        self._running = False
+        self._queue.put(None)
+        self._writer.join(2.0)
+
+    def _write_loop(self):
+        connection = self._connect()
+        while self._running:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + BATCH_INTERVAL
+            while len(batch) < MAX_BATCH:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._running = False
+                    break
+                batch.append(item)
+            try:
+                with connection:
+                    for run in batch:
+                        self._insert(connection, run)
+                self.written += len(batch)
+                self.batches += 1
+            except sqlite3.Error as e:
+                print(f"测试结果写入失败 ({len(batch)} 条): {e}")
+            with self._idle:
+                self._pending -= len(batch)
+                self._idle.notify_all()
+        connection.close()
+
+    def _insert(self, connection, run):
+        cursor = connection.execute(
+            "INSERT INTO runs (serial, station, plan, started_at, finished_at, firmware, result, duration_ms, message)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run['serial'], run.get('station'), run.get('plan'), run['started_at'], run.get('finished_at'),
+             run.get('firmware'), run['result'], run.get('duration_ms'), run.get('message')))
+        run_id = cursor.lastrowid
+        rows = []
+        for item in run.get('measurements', ()):
+            value = item.get('value')
+            numeric = int(value) if isinstance(value, bool) else value if isinstance(value, (int, float)) else None
+            text = None if numeric is not None or value is None else (
+                value if isinstance(value, str) else json.dumps(value, ensure_ascii=False))
+            rows.append((run_id, item.get('step'), item['field'], numeric, text,
+                         None if item.get('pass') is None else int(item['pass'])))
+        connection.executemany(
+            "INSERT INTO measurements (run_id, step, field, value, text, pass) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        connection.executemany(
+            "INSERT INTO run_faults (code, started_at, run_id) VALUES (?, ?, ?)",
+            [(code, run['started_at'], run_id) for code in run.get('faults', ())])
+
+    # ===== 查询 =====
+
+    def _reader(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+            connection.execute("PRAGMA query_only=ON")
+        return connection
+
+    def _runs(self, sql, params):
+        rows = self._reader().execute(sql, params).fetchall()
+        return [dict(zip(RUN_COLUMNS, row)) for row in rows]
+
+    def find_by_serial(self, serial):
+        """该序列号的全部测试记录 (按时间顺序)"""
+        return self._runs(f"SELECT {', '.join(RUN_COLUMNS)} FROM runs WHERE serial = ? ORDER BY started_at",
+                          (serial,))
+
+    def find_by_date(self, start, end, result=None, limit=10000):
+        """[start, end) 时间段内的测试记录, result 可过滤判定结果"""
+        sql = f"SELECT {', '.join(RUN_COLUMNS)} FROM runs WHERE started_at >= ? AND started_at < ?"
+        params = [start, end]
+        if result is not None:
+            sql += " AND result = ?"
+            params.append(result)
+        sql += " ORDER BY started_at LIMIT ?"
+        params.append(limit)
+        return self._runs(sql, params)
+
+    def find_by_fault(self, code, start=None, end=None, limit=10000):
+        """出现过指定故障码的测试记录 (例如 0x27 IPM 过温)"""
+        sql = (f"SELECT {', '.join('runs.' + column for column in RUN_COLUMNS)} FROM run_faults"
+               " JOIN runs ON runs.id = run_faults.run_id WHERE run_faults.code = ?")
+        params = [code]
+        if start is not None:
+            sql += " AND run_faults.started_at >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND run_faults.started_at < ?"
+            params.append(end)
+        sql += " ORDER BY run_faults.started_at LIMIT ?"
+        params.append(limit)
+        return self._runs(sql, params)
+
+    def measurements(self, run_id):
+        rows = self._reader().execute(
+            "SELECT step, field, value, text, pass FROM measurements WHERE run_id = ?", (run_id,)).fetchall()
+        return [{'step': step, 'field': field, 'value': value if value is not None else text,
+                 'pass': None if passed is None else bool(passed)}
+                for step, field, value, text, passed in rows]
+
+    def latest_results(self, since=None):
+        """每个序列号最近一次的 (判定结果, 结束时间), 用于建立内存索引"""
+        sql = ("SELECT serial, result, MAX(started_at), finished_at FROM runs"
+               + (" WHERE started_at >= ?" if since is not None else "") + " GROUP BY serial")
+        rows = self._reader().execute(sql, (since,) if since is not None else ()).fetchall()
+        return {serial: (result, finished_at) for serial, result, _, finished_at in rows}
+
+    def stats(self):
+        return {'pending': self._pending, 'written': self.written, 'batches': self.batches}
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_results_database():
+    """返回进程级测试结果库单例 (~/.qt_desktop_app/results.db)"""
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = ResultsDatabase()
+        return _database
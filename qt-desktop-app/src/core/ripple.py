@@ -0,0 +1,194 @@
+"""转速纹波频谱分析
+
+相位异常或轴承磨损会在 0x21 转速字段上表现为周期性纹波。本模块对单块板的高速轮询采集:
+    1. 按轮询间隔中位数重采样到等间隔网格 (线性插值, 消除轮询抖动)
+    2. 去除线性趋势后做 Welch 功率谱估计 (Hann 窗, 50% 重叠)
+    3. 找出主要纹波频率, 由峰值附近的功率积分换算为正弦幅值 (RPM)
+并按幅值上限给出通过/失败判定。
+
+RippleMonitor 挂在遥测存储上对实时数据滚动分析; analyze_capture / load_capture 用于批量分析
+导出的采集文件。需要 NumPy (未安装时分析函数抛出 RippleError)。
+"""
+
+import collections
+import json
+import threading
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DEFAULT_SEGMENT_SECONDS = 4.0   # Welch 分段长度, 频率分辨率约 1/4 Hz
+DEFAULT_PEAKS = 5
+MIN_FREQUENCY = 0.5             # 低于此频率的视为转速漂移而不是纹波 (Hz)
+MIN_SAMPLES = 64
+
+
+class RippleError(Exception):
+    """无法分析 (缺少 NumPy、样本过少、采集文件格式错误等)"""
+
+
+def _require_numpy():
+    if numpy is None:
+        raise RippleError("纹波分析需要 NumPy: pip install numpy")
+
+
+def resample(ts_ns, values, rate=None):
+    """重采样到等间隔网格, 返回 (采样率 Hz, 数组); rate 省略时取轮询间隔中位数的倒数"""
+    _require_numpy()
+    if len(ts_ns) != len(values):
+        raise RippleError(f"时间戳与数值个数不一致 ({len(ts_ns)} != {len(values)})")
+    if len(ts_ns) < MIN_SAMPLES:
+        raise RippleError(f"样本过少 ({len(ts_ns)} < {MIN_SAMPLES})")
+    try:
+        t = numpy.asarray(ts_ns, dtype=numpy.int64)
+        y = numpy.asarray(values, dtype=float)
+    except (TypeError, ValueError) as e:
+        raise RippleError(f"样本不是数值: {e}")
+    if t.ndim != 1 or y.ndim != 1:
+        raise RippleError("样本不是数值序列")
+    t = (t - t[0]) / 1e9
+    order = numpy.argsort(t, kind='stable')
+    t, y = t[order], y[order]
+    keep = numpy.concatenate(([True], numpy.diff(t) > 0))
+    t, y = t[keep], y[keep]
+    if len(t) < MIN_SAMPLES:
+        raise RippleError(f"样本过少 ({len(t)} < {MIN_SAMPLES})")
+    if rate is None:
+        rate = 1.0 / float(numpy.median(numpy.diff(t)))
+    grid = numpy.arange(0.0, t[-1], 1.0 / rate)
+    return rate, numpy.interp(grid, t, y)
+
+
+def welch_psd(signal, rate, segment_seconds=DEFAULT_SEGMENT_SECONDS):
+    """Welch 单边功率谱密度, 返回 (频率数组, PSD 数组, 单位 RPM²/Hz)"""
+    _require_numpy()
+    signal = numpy.asarray(signal, dtype=float)
+    length = min(len(signal), max(16, int(segment_seconds * rate)))
+    step = length // 2
+    window = numpy.hanning(length)
+    scale = 1.0 / (rate * (window ** 2).sum())
+    x = numpy.arange(length)
+    segments = []
+    for start in range(0, len(signal) - length + 1, step):
+        segment = signal[start:start + length]
+        segment = segment - numpy.polyval(numpy.polyfit(x, segment, 1), x)   # 去除线性趋势
+        spectrum = numpy.abs(numpy.fft.rfft(segment * window)) ** 2 * scale
+        spectrum[1:-1 if length % 2 == 0 else None] *= 2
+        segments.append(spectrum)
+    return numpy.fft.rfftfreq(length, 1.0 / rate), numpy.mean(segments, axis=0)
+
+
+def find_peaks(freqs, psd, count=DEFAULT_PEAKS, min_frequency=MIN_FREQUENCY):
+    """返回按幅值降序的纹波峰值 [{'frequency_hz', 'amplitude_rpm'}]
+
+    幅值由峰值及两侧各一个频点的功率积分得到 (Hann 窗主瓣), 正弦幅值 A = sqrt(2 * P)。
+    """
+    _require_numpy()
+    df = freqs[1] - freqs[0]
+    local_max = (psd[1:-1] > psd[:-2]) & (psd[1:-1] >= psd[2:]) & (freqs[1:-1] >= min_frequency)
+    peaks = []
+    for index in numpy.nonzero(local_max)[0] + 1:
+        power = psd[index - 1:index + 2].sum() * df
+        peaks.append({'frequency_hz': round(float(freqs[index]), 3),
+                      'amplitude_rpm': round(float(numpy.sqrt(2 * power)), 2)})
+    peaks.sort(key=lambda peak: peak['amplitude_rpm'], reverse=True)
+    return peaks[:count]
+
+
+def analyze(ts_ns, speeds, max_amplitude=None, band=None, segment_seconds=DEFAULT_SEGMENT_SECONDS,
+            peaks=DEFAULT_PEAKS):
+    """分析一段转速采集, 返回结果字典
+
+    max_amplitude: 纹波幅值上限 (RPM), band: (下限 Hz, 上限 Hz) 只判定该频段内的峰值。
+    """
+    rate, signal = resample(ts_ns, speeds)
+    freqs, psd = welch_psd(signal, rate, segment_seconds)
+    found = find_peaks(freqs, psd, peaks)
+    judged = [peak for peak in found
+              if band is None or band[0] <= peak['frequency_hz'] <= band[1]]
+    worst = max((peak['amplitude_rpm'] for peak in judged), default=0.0)
+    x = numpy.arange(len(signal))
+    ripple = signal - numpy.polyval(numpy.polyfit(x, signal, 1), x)
+    result = {
+        'samples': len(ts_ns),
+        'sample_rate_hz': round(rate, 2),
+        'nyquist_hz': round(rate / 2, 2),
+        'duration_s': round(len(signal) / rate, 2),
+        'mean_speed': round(float(signal.mean()), 1),
+        'ripple_rms_rpm': round(float(numpy.sqrt(numpy.mean(ripple ** 2))), 2),
+        'peaks': found,
+        'max_amplitude_rpm': worst,
+    }
+    if max_amplitude is not None:
+        result['limit_rpm'] = max_amplitude
+        result['pass'] = worst <= max_amplitude
+    return result
+
+
+def load_capture(path):
+    """读取采集文件, 返回 (时间戳列表, 转速列表)
+
+    支持转速扫描导出的 JSON ({'samples': [...]}) 和每行一个样本的 JSON Lines
+    (例如工位代理 status 数据流的输出), 样本需要 ts_ns 和 speed 字段。
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        text = file.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        try:
+            data = [json.loads(line) for line in text.splitlines() if line.strip()]
+        except ValueError as e:
+            raise RippleError(f"采集文件格式错误 {path}: {e}")
+    if isinstance(data, dict):
+        if not isinstance(data.get('samples'), list):
+            raise RippleError(f"采集文件缺少 samples 列表: {path}")
+        data = data['samples']
+    if not isinstance(data, list):
+        raise RippleError(f"采集文件格式错误: {path}")
+    samples = [sample for sample in data
+               if isinstance(sample, dict) and sample.get('ts_ns') is not None and sample.get('speed') is not None]
+    return [sample['ts_ns'] for sample in samples], [sample['speed'] for sample in samples]
+
+
+def analyze_capture(path, **kwargs):
+    ts_ns, speeds = load_capture(path)
+    result = analyze(ts_ns, speeds, **kwargs)
+    result['file'] = path
+    return result
+
+
+class RippleMonitor:
+    """实时纹波监测: 保留数据源最近 window 秒的转速样本, analyze() 对窗口做一次分析
+
+    attach(store) 后由遥测存储的监听器增量写入, 每个样本 O(1); 分析按需调用 (例如界面定时器)。
+    """
+
+    def __init__(self, source, window=20.0, **analyze_kwargs):
+        self.source = source
+        self.window_ns = int(window * 1e9)
+        self.analyze_kwargs = analyze_kwargs
+        self._samples = collections.deque()
+        self._lock = threading.Lock()
+
+    def add(self, source, sample):
+        if source != self.source or sample.get('speed') is None or sample.get('ts_ns') is None:
+            return
+        with self._lock:
+            self._samples.append((sample['ts_ns'], sample['speed']))
+            cutoff = sample['ts_ns'] - self.window_ns
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+
+    def attach(self, store):
+        store.add_listener(self.add)
+
+    def detach(self, store):
+        store.remove_listener(self.add)
+
+    def analyze(self):
+        with self._lock:
+            samples = list(self._samples)
+        return analyze([ts for ts, _ in samples], [speed for _, speed in samples], **self.analyze_kwargs)
@@ -0,0 +1,106 @@
+"""板卡模拟器
+
+测试控制板时本机扮演电机板, 对控制板下发的命令给出应答。
+SIMULATOR_REPLIES 为界面和工位代理使用的固定应答; MotorBoardSimulator 为带状态的模拟电机板,
+用于离线调试测试流程和基准测试的模拟服务器。
+"""
+
+from core.codec import (CMD_GEAR, CMD_SET_SPEED, CMD_START, CMD_STATUS, CMD_STOP, CMD_VERSION,
+                        SPEED_MAX, SPEED_MIN, STATUS_RUNNING, STATUS_STOPPED,
+                        build_frame, parse_hex, validate_frame)
+
+# 固定应答, 格式同发送:
+#   0x83 读取档位   DATA0 = 速度档位  DATA1 = 时间档位
+#   0x82 设定转速   DATA0 = 0  DATA1 = ACK
+#   0x81 电机运行   DATA0 = 0  DATA1 = ACK
+#   0x80 电机停止   DATA0 = 0  DATA1 = ACK
+#   0x21 读系统参数 DATA0 状态, DATA1~2 转速, DATA3~4 电压, DATA5 IPM温度, DATA6~7 功率
+#   0x20 软件版本   DATA0 ~ DATAn 版本信息 (ASCII)
+SIMULATOR_REPLIES = {
+    CMD_GEAR: parse_hex("10 02 83 00 01 96 10 03"),
+    CMD_SET_SPEED: parse_hex("10 02 82 00 01 95 10 03"),
+    CMD_START: parse_hex("10 02 81 00 01 94 10 03"),
+    CMD_STOP: parse_hex("10 02 80 00 01 93 10 03"),
+    CMD_STATUS: parse_hex("10 02 21 23 00 00 00 37 1C 00 00 A9 10 03"),
+    CMD_VERSION: parse_hex("10 02 20 56 44 32 2E 30 2E 30 BA 10 03"),
+}
+
+ACK = b"\x00\x01"
+
+
+def simulator_reply(frame):
+    """返回固定应答, 无需应答 (帧无效或命令未知) 时返回 None"""
+    if not validate_frame(frame):
+        return None
+    return SIMULATOR_REPLIES.get(frame[2])
+
+
+class MotorBoardSimulator:
+    """带状态的模拟电机板
+
+    转速按 ramp_rpm_per_poll 逐次逼近设定值 (每次 0x21 查询推进一步), 功率随转速线性变化,
+    设置 fault 后状态字返回故障码。
+    """
+
+    def __init__(self, version="VD2.0.0", voltage=310, temperature=28, ramp_rpm_per_poll=300):
+        self.version = version
+        self.voltage = voltage
+        self.temperature = temperature
+        self.ramp_rpm_per_poll = ramp_rpm_per_poll
+        self.running = False
+        self.target_speed = SPEED_MIN
+        self.speed = 0
+        self.fault = None
+        self.speed_gear = 0
+        self.time_gear = 0
+
+    @property
+    def power(self):
+        return self.speed * 50 // SPEED_MAX
+
+    @property
+    def status(self):
+        if self.fault is not None:
+            return self.fault
+        return STATUS_RUNNING if self.running else STATUS_STOPPED
+
+    def _step(self):
+        target = self.target_speed if self.running and self.fault is None else 0
+        delta = max(-self.ramp_rpm_per_poll, min(self.ramp_rpm_per_poll, target - self.speed))
+        self.speed += delta
+
+    def status_frame(self):
+        return build_frame(CMD_STATUS, bytes([
+            self.status,
+            (self.speed >> 8) & 0xFF, self.speed & 0xFF,
+            (self.voltage >> 8) & 0xFF, self.voltage & 0xFF,
+            self.temperature & 0xFF,
+            (self.power >> 8) & 0xFF, self.power & 0xFF,
+        ]))
+
+    def handle(self, frame):
+        """处理一帧命令, 返回应答帧; 无效帧返回 None"""
+        if not validate_frame(frame):
+            return None
+        cmd = frame[2]
+        if cmd == CMD_STATUS:
+            self._step()
+            return self.status_frame()
+        if cmd == CMD_VERSION:
+            return build_frame(CMD_VERSION, self.version.encode('ascii'))
+        if cmd == CMD_SET_SPEED:
+            speed = (frame[3] << 8) | frame[4]
+            if SPEED_MIN <= speed <= SPEED_MAX:
+                self.target_speed = speed
+            return build_frame(CMD_SET_SPEED, ACK)
+        if cmd == CMD_START:
+            self.running = True
+            return build_frame(CMD_START, ACK)
+        if cmd == CMD_STOP:
+            self.running = False
+            return build_frame(CMD_STOP, ACK)
+        if cmd == CMD_GEAR:
+            if frame[3] or frame[4]:
+                self.speed_gear, self.time_gear = frame[3], frame[4]
+            return build_frame(CMD_GEAR, bytes([self.speed_gear, self.time_gear]))
+        return None
@@ -0,0 +1,218 @@
+"""转速扫描特性测试
+
+按转速曲线 (阶跃/斜坡, 每个设定点停留一段时间) 依次下发 0x82 设定转速,
+停留期间流水线轮询 0x21: 事务引擎中始终预先排队一条查询, 上一条应答到达时由接收路径立即发出,
+采样率只受链路往返时间限制, 与界面定时器无关。
+每个设定点计算调节时间、超调量、稳态误差以及平均功率/电压。
+"""
+
+import collections
+import csv
+import json
+import threading
+import time
+
+from core.codec import (CMD_START, CMD_STATUS, CMD_STOP, FAULT_CODES, SPEED_MAX, SPEED_MIN,
+                        build_frame, build_speed_frame, decode_status)
+from core.transactions import TransactionError
+
+# 稳态判定: 误差在 max(设定值 * 比例, 绝对值) 以内
+DEFAULT_TOLERANCE_RATIO = 0.02
+DEFAULT_TOLERANCE_RPM = 30
+# 稳态误差、平均功率/电压取每个停留段最后这一比例的样本
+STEADY_WINDOW_RATIO = 0.2
+# 流水线深度: 1 条在途 + 1 条排队
+PIPELINE_DEPTH = 2
+# 单个设定点内连续轮询失败达到此次数时中止扫描
+MAX_POLL_ERRORS = 3
+
+
+def step_profile(speeds, dwell):
+    """阶跃曲线: 依次跳到各设定点"""
+    return [(int(speed), float(dwell)) for speed in speeds]
+
+
+def ramp_profile(start, stop, step, dwell, return_trip=False):
+    """斜坡曲线: 从 start 以 step 为步长到 stop, return_trip 为 True 时再原路返回"""
+    if step <= 0:
+        raise ValueError("步长必须大于 0")
+    direction = 1 if stop >= start else -1
+    speeds = list(range(start, stop + direction, step * direction))
+    if speeds[-1] != stop:
+        speeds.append(stop)
+    if return_trip:
+        speeds += speeds[-2::-1]
+    return step_profile(speeds, dwell)
+
+
+def validate_profile(profile):
+    for speed, dwell in profile:
+        if not SPEED_MIN <= speed <= SPEED_MAX:
+            raise ValueError(f"设定点 {speed} 超出范围 ({SPEED_MIN}-{SPEED_MAX} RPM)")
+        if dwell <= 0:
+            raise ValueError("停留时间必须大于 0")
+
+
+def analyze_setpoint(setpoint, previous, samples, t0_ns,
+                     tolerance_ratio=DEFAULT_TOLERANCE_RATIO, tolerance_rpm=DEFAULT_TOLERANCE_RPM):
+    """分析一个停留段
+
+    samples 为 (ts_ns, 状态字典) 列表, t0_ns 为设定命令发出时刻, previous 为上一设定点 (首段为 0)。
+    """
+    result = {'setpoint': setpoint, 'samples': len(samples)}
+    if not samples:
+        return result
+    tolerance = max(setpoint * tolerance_ratio, tolerance_rpm)
+    speeds = [sample['speed'] for _, sample in samples]
+
+    # 调节时间: 最后一次超出容差之后的第一个样本
+    settled_index = None
+    for index in range(len(samples) - 1, -1, -1):
+        if abs(speeds[index] - setpoint) > tolerance:
+            break
+        settled_index = index
+    result['settling_time_ms'] = (
+        round((samples[settled_index][0] - t0_ns) / 1e6, 1) if settled_index is not None else None)
+
+    # 超调量: 沿变化方向越过设定值的最大幅度, 占阶跃幅度的百分比
+    step_size = abs(setpoint - previous)
+    if setpoint >= previous:
+        overshoot = max(speeds) - setpoint
+    else:
+        overshoot = setpoint - min(speeds)
+    result['overshoot_rpm'] = max(0, overshoot)
+    result['overshoot_pct'] = round(max(0, overshoot) * 100.0 / step_size, 2) if step_size else 0.0
+
+    steady = samples[-max(1, int(len(samples) * STEADY_WINDOW_RATIO)):]
+    count = len(steady)
+    result['steady_state_error_rpm'] = round(sum(s['speed'] for _, s in steady) / count - setpoint, 1)
+    result['mean_power'] = round(sum(s['power'] for _, s in steady) / count, 1)
+    result['mean_voltage'] = round(sum(s['voltage'] for _, s in steady) / count, 1)
+    result['faults'] = sorted({s['status'] for _, s in samples if s['status'] in FAULT_CODES})
+    duration_s = (samples[-1][0] - samples[0][0]) / 1e9
+    result['sample_rate_hz'] = round((len(samples) - 1) / duration_s, 1) if duration_s > 0 else None
+    return result
+
+
+class SpeedSweep:
+    """转速扫描
+
+    transactions 为串口的 TransactionEngine (与用户命令共用, 保证同一时刻只有一条请求在途);
+    telemetry/source 指定结果写入的遥测存储与数据源名称 (结果数据源为 source + '#sweep')。
+    on_progress(index, total, result) 与 on_finished(results) 在扫描线程中调用。
+    """
+
+    def __init__(self, transactions, profile, telemetry=None, source=None, start_motor=True,
+                 stop_at_end=True, reply_timeout=0.5, on_progress=None, on_finished=None):
+        validate_profile(profile)
+        self.transactions = transactions
+        self.profile = list(profile)
+        self.telemetry = telemetry
+        self.source = source
+        self.start_motor = start_motor
+        self.stop_at_end = stop_at_end
+        self.reply_timeout = reply_timeout
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.results = []
+        self.samples = []          # (setpoint, ts_ns, 状态字典)
+        self.error = None
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="speed-sweep", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def is_running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def _request(self, frame):
+        return self.transactions.request(frame, timeout=self.reply_timeout)
+
+    def run(self):
+        try:
+            if self.start_motor:
+                self._request(build_speed_frame(self.profile[0][0]))
+                self._request(build_frame(CMD_START))
+            previous = 0
+            for index, (setpoint, dwell) in enumerate(self.profile):
+                if self._cancel.is_set():
+                    break
+                result = self._run_setpoint(setpoint, previous, dwell)
+                self.results.append(result)
+                if self.telemetry is not None:
+                    self.telemetry.record(f"{self.source}#sweep", result)
+                if self.on_progress:
+                    self.on_progress(index + 1, len(self.profile), result)
+                previous = setpoint
+        except TransactionError as e:
+            self.error = str(e)
+            print(f"转速扫描中止: {e}")
+        finally:
+            if self.stop_at_end:
+                try:
+                    self._request(build_frame(CMD_STOP))
+                except TransactionError as e:
+                    print(f"扫描结束停机失败: {e}")
+            if self.on_finished:
+                self.on_finished(self.results)
+
+    def _run_setpoint(self, setpoint, previous, dwell):
+        t0_ns = time.monotonic_ns()
+        self._request(build_speed_frame(setpoint))
+        deadline = time.monotonic() + dwell
+        samples = []
+        status_query = build_frame(CMD_STATUS)
+        errors = 0
+        pending = collections.deque()
+        while pending or time.monotonic() < deadline:
+            # 停留期间保持流水线填满, 到期后只收取剩余应答
+            while (len(pending) < PIPELINE_DEPTH and time.monotonic() < deadline
+                   and not self._cancel.is_set()):
+                pending.append(self.transactions.submit(status_query, timeout=self.reply_timeout))
+            if not pending:
+                break
+            txn = pending.popleft()
+            try:
+                reply = txn.wait(self.reply_timeout + 1.0)
+            except TransactionError:
+                errors += 1
+                if errors >= MAX_POLL_ERRORS:
+                    raise
+                continue
+            sample = decode_status(reply)
+            if sample is not None:
+                samples.append((txn.reply_ns, sample))
+                self.samples.append((setpoint, txn.reply_ns, sample))
+        result = analyze_setpoint(setpoint, previous, samples, t0_ns)
+        result['dwell_s'] = dwell
+        result['poll_errors'] = errors
+        return result
+
+    # ===== 导出 =====
+
+    RESULT_FIELDS = ['setpoint', 'dwell_s', 'samples', 'sample_rate_hz', 'settling_time_ms', 'overshoot_rpm',
+                     'overshoot_pct', 'steady_state_error_rpm', 'mean_power', 'mean_voltage', 'faults',
+                     'poll_errors']
+
+    def export_csv(self, path):
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=self.RESULT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            for result in self.results:
+                writer.writerow(result)
+
+    def export_json(self, path):
+        """导出每个设定点的结果和全部原始样本"""
+        data = {
+            'results': self.results,
+            'samples': [dict(sample, setpoint=setpoint, ts_ns=ts_ns) for setpoint, ts_ns, sample in self.samples],
+            'error': self.error,
+        }
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
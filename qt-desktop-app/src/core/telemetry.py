@@ -0,0 +1,103 @@
+"""遥测数据存储
+
+按数据源 (通常为串口名) 保存解析后的 0x21 状态样本, 每个数据源一个有界环形缓冲区。
+界面、测试流程和工位代理共用同一份数据, 样本为字典:
+    {'ts_ns': ..., 'status': ..., 'speed': ..., 'voltage': ..., 'temperature': ..., 'power': ...}
+"""
+
+import collections
+import threading
+import time
+
+from core.clock import timestamp_of
+from core.codec import decode_status
+
+DEFAULT_CAPACITY = 10000
+
+
+class TelemetryStore:
+    """线程安全的遥测样本存储
+
+    listener(source, sample) 在写入样本的线程中调用。
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._samples = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def record(self, source, sample, ts_ns=None):
+        """写入一个已解析的样本, 返回带时间戳的样本"""
+        sample = dict(sample)
+        sample.setdefault('ts_ns', ts_ns if ts_ns is not None else time.monotonic_ns())
+        with self._lock:
+            buffer = self._samples.get(source)
+            if buffer is None:
+                buffer = self._samples[source] = collections.deque(maxlen=self.capacity)
+            buffer.append(sample)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(source, sample)
+            except Exception as e:
+                print(f"遥测通知失败: {e}")
+        return sample
+
+    def record_frame(self, source, frame):
+        """解析 0x21 应答帧并写入, 不是状态帧时返回 None"""
+        status = decode_status(frame)
+        if status is None:
+            return None
+        return self.record(source, status, timestamp_of(frame))
+
+    def latest(self, source):
+        with self._lock:
+            buffer = self._samples.get(source)
+            return dict(buffer[-1]) if buffer else None
+
+    def samples(self, source, since_ns=None):
+        """返回样本列表 (按时间顺序), since_ns 为起始时间戳 (含)"""
+        with self._lock:
+            buffer = list(self._samples.get(source, ()))
+        if since_ns is not None:
+            buffer = [sample for sample in buffer if sample['ts_ns'] >= since_ns]
+        return buffer
+
+    def series(self, source, field, since_ns=None):
+        """返回 (时间戳列表, 数值列表)"""
+        samples = self.samples(source, since_ns)
+        return [sample['ts_ns'] for sample in samples], [sample.get(field) for sample in samples]
+
+    def sources(self):
+        with self._lock:
+            return list(self._samples)
+
+    def clear(self, source=None):
+        with self._lock:
+            if source is None:
+                self._samples.clear()
+            else:
+                self._samples.pop(source, None)
+
+    def add_listener(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_telemetry_store():
+    """返回进程级遥测存储单例"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TelemetryStore()
+        return _store
@@ -0,0 +1,164 @@
+"""请求-应答事务
+
+协议为半双工问答: 每条命令的应答 CMD 与请求相同。事务引擎保证同一时刻只有一条请求在途,
+收到匹配 CMD 的应答帧或超时后才发出下一条, 避免多方同时下发命令时应答错配。
+"""
+
+import collections
+import threading
+import time
+
+from core.clock import timestamp_of
+
+DEFAULT_TIMEOUT = 0.5
+
+
+class TransactionError(Exception):
+    """事务失败 (超时、发送失败或被取消)"""
+
+
+class Transaction:
+    """一次请求-应答"""
+
+    __slots__ = ('frame', 'reply_cmd', 'timeout', 'callback', 'reply', 'error',
+                 'sent_ns', 'reply_ns', 'done', 'timer')
+
+    def __init__(self, frame, reply_cmd, timeout, callback):
+        self.frame = bytes(frame)
+        self.reply_cmd = reply_cmd if reply_cmd is not None else self.frame[2]
+        self.timeout = timeout
+        self.callback = callback
+        self.reply = None
+        self.error = None
+        self.sent_ns = None
+        self.reply_ns = None
+        self.done = threading.Event()
+        self.timer = None
+
+    @property
+    def latency_ms(self):
+        if self.sent_ns is None or self.reply_ns is None:
+            return None
+        return (self.reply_ns - self.sent_ns) / 1e6
+
+    def wait(self, timeout=None):
+        """阻塞等待结果, 返回应答帧; 失败时抛出 TransactionError"""
+        if not self.done.wait(timeout):
+            raise TransactionError("等待应答超时")
+        if self.error:
+            raise TransactionError(self.error)
+        return self.reply
+
+
+class TransactionEngine:
+    """单个串口的事务引擎
+
+    send_func(frame) 返回 False 表示发送失败; feed(frame) 由接收路径对每个完整帧调用。
+    callback(transaction) 在事务结束时调用 (接收线程或超时定时器线程中)。
+    """
+
+    def __init__(self, send_func, default_timeout=DEFAULT_TIMEOUT):
+        self.send_func = send_func
+        self.default_timeout = default_timeout
+        self._queue = collections.deque()
+        self._current = None
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.completed = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def submit(self, frame, reply_cmd=None, timeout=None, callback=None):
+        """提交一条请求 (不阻塞), 返回 Transaction"""
+        txn = Transaction(frame, reply_cmd, timeout or self.default_timeout, callback)
+        with self._lock:
+            self._queue.append(txn)
+            start = self._current is None
+        if start:
+            self._start_next()
+        return txn
+
+    def request(self, frame, reply_cmd=None, timeout=None):
+        """发送请求并等待应答帧"""
+        txn = self.submit(frame, reply_cmd, timeout)
+        return txn.wait(txn.timeout + 1.0)
+
+    def feed(self, frame):
+        """处理一个接收帧, 与在途请求匹配时返回 True"""
+        if len(frame) < 3:
+            return False
+        with self._lock:
+            txn = self._current
+            if txn is None or txn.sent_ns is None or frame[2] != txn.reply_cmd:
+                return False
+            self._current = None
+        txn.timer.cancel()
+        txn.reply = bytes(frame)
+        txn.reply_ns = timestamp_of(frame)
+        self.completed += 1
+        self._finish(txn)
+        self._start_next()
+        return True
+
+    def cancel_all(self, reason="已取消"):
+        """取消在途和排队中的请求 (例如串口掉线)"""
+        with self._lock:
+            pending = list(self._queue)
+            self._queue.clear()
+            if self._current is not None:
+                pending.insert(0, self._current)
+                self._current = None
+        for txn in pending:
+            if txn.timer:
+                txn.timer.cancel()
+            txn.error = reason
+            self.failures += 1
+            self._finish(txn)
+
+    def _start_next(self):
+        while True:
+            with self._lock:
+                if self._current is not None or not self._queue:
+                    return
+                txn = self._queue.popleft()
+                self._current = txn
+                txn.timer = threading.Timer(txn.timeout, self._on_timeout, args=(txn,))
+                txn.timer.daemon = True
+                txn.sent_ns = time.monotonic_ns()
+            if self.send_func(txn.frame) is False:
+                with self._lock:
+                    if self._current is txn:
+                        self._current = None
+                txn.error = "发送失败"
+                self.failures += 1
+                self._finish(txn)
+                continue
+            txn.timer.start()
+            return
+
+    def _on_timeout(self, txn):
+        with self._lock:
+            if self._current is not txn:
+                return
+            self._current = None
+        txn.error = f"应答超时 ({txn.timeout * 1000:.0f} ms)"
+        self.timeouts += 1
+        self._finish(txn)
+        self._start_next()
+
+    def _finish(self, txn):
+        txn.done.set()
+        if txn.callback:
+            try:
+                txn.callback(txn)
+            except Exception as e:
+                print(f"事务回调失败: {e}")
+
+    def stats(self):
+        return {
+            'pending': len(self._queue) + (1 if self._current else 0),
+            'completed': self.completed,
+            'timeouts': self.timeouts,
+            'failures': self.failures,
+        }
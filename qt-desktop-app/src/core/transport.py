@@ -0,0 +1,298 @@
+"""串口传输层
+
+SharedPort 通过 open_transport() 打开设备, 所有后端都提供与 pyserial 相同的最小接口
+(read / in_waiting / write / close / is_open), 上层的帧解析、发送调度、时间戳和掉线重连逻辑不变。
+
+支持的地址格式:
+    /dev/ttyUSB0, COM3            本地串口
+    tcp://host:port               原始 TCP 串口服务器 (ser2net raw 模式等)
+    rfc2217://host:port           RFC 2217 串口服务器 (可远程设置波特率)
+    agent://<串口名>               经本机工位代理访问 (代理持有串口, 断开时串口不关闭)
+    sim://<名称>                   进程内模拟电机板 (离线调试测试流程)
+"""
+
+import errno
+import select
+import socket
+import threading
+import time
+
+from core.agent_client import AgentClient, AgentClientError
+
+TCP_PREFIX = 'tcp://'
+RFC2217_PREFIX = 'rfc2217://'
+AGENT_PREFIX = 'agent://'
+SIM_PREFIX = 'sim://'
+NETWORK_PREFIXES = (TCP_PREFIX, RFC2217_PREFIX, AGENT_PREFIX, SIM_PREFIX)
+
+TCP_CONNECT_TIMEOUT = 3.0
+TCP_RECV_SIZE = 4096
+
+
+def is_network_url(name):
+    """是否为网络 (或模拟) 串口地址, 这类地址不经过本机串口枚举"""
+    return name.lower().startswith(NETWORK_PREFIXES)
+
+
+def parse_host_port(url):
+    """tcp://host:port -> (host, port)"""
+    address = url.split('://', 1)[1].rstrip('/')
+    host, _, port = address.rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(f"无效的网络串口地址: {url}")
+    return host.strip('[]'), int(port)
+
+
+class TcpTransport:
+    """原始 TCP 串口传输
+
+    套接字为非阻塞模式并关闭 Nagle (TCP_NODELAY), 单帧写出不会被内核延迟。
+    套接字发送缓冲区满时, 后续写入先合并到本地缓冲区, 可写时一次性发出。
+    """
+
+    def __init__(self, url, timeout=None, connect_timeout=TCP_CONNECT_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        host, port = parse_host_port(url)
+        self.sock = socket.create_connection((host, port), timeout=connect_timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setblocking(False)
+        self._rx = bytearray()
+        self._tx = bytearray()
+        self._tx_lock = threading.Lock()   # 读线程也会顺带冲刷发送缓冲区
+        self.is_open = True
+
+    # ===== 接收 =====
+
+    def _recv_available(self):
+        """非阻塞读取内核中已有的数据; 对端关闭时抛出 ConnectionError"""
+        while True:
+            try:
+                chunk = self.sock.recv(TCP_RECV_SIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+            if not chunk:
+                raise ConnectionError(f"{self.url} 连接已被对端关闭")
+            self._rx += chunk
+            if len(chunk) < TCP_RECV_SIZE:
+                return
+
+    def _take(self, size):
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def read(self, size=1):
+        """与 pyserial 一致: 最多等待 timeout 秒, 返回不超过 size 字节"""
+        self._check_open()
+        if not self._rx:
+            self._recv_available()
+        if not self._rx:
+            deadline = None if self.timeout is None else time.monotonic() + self.timeout
+            while not self._rx:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                wlist = [self.sock] if self._tx else []
+                readable, writable, _ = select.select([self.sock], wlist, [], remaining)
+                if writable:
+                    self._flush_pending()
+                if readable:
+                    self._recv_available()
+                elif deadline is not None and time.monotonic() >= deadline:
+                    break
+        return self._take(size)
+
+    @property
+    def in_waiting(self):
+        self._check_open()
+        self._recv_available()
+        return len(self._rx)
+
+    # ===== 发送 =====
+
+    def write(self, data):
+        self._check_open()
+        with self._tx_lock:
+            self._tx += data
+        self._flush_pending()
+        if self._tx:
+            # 发送缓冲区已满: 等待可写, 与 pyserial 的阻塞写语义保持一致
+            deadline = time.monotonic() + (self.timeout or TCP_CONNECT_TIMEOUT)
+            while self._tx:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"{self.url} 写超时")
+                select.select([], [self.sock], [], remaining)
+                self._flush_pending()
+        return len(data)
+
+    def _flush_pending(self):
+        """尽量写出本地缓冲区中合并的数据"""
+        with self._tx_lock:
+            while self._tx:
+                try:
+                    sent = self.sock.send(self._tx)
+                except (BlockingIOError, InterruptedError):
+                    return
+                except OSError as e:
+                    if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                        return
+                    raise
+                del self._tx[:sent]
+
+    def flush(self):
+        self._flush_pending()
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+
+    def _check_open(self):
+        if not self.is_open:
+            raise ConnectionError(f"{self.url} 未连接")
+
+
+class AgentTransport:
+    """经工位代理访问串口
+
+    代理进程持有串口, 本进程只是一个订阅了接收数据流的客户端; 关闭传输只断开连接, 串口保持打开。
+    """
+
+    def __init__(self, url, baud_rate, timeout=None):
+        self.url = url
+        self.port = url[len(AGENT_PREFIX):]
+        self.timeout = timeout
+        self._rx = bytearray()
+        self._cond = threading.Condition()
+        self.client = AgentClient()
+        try:
+            self.client.call('open', port=self.port, baud=baud_rate)
+            self.client.subscribe(self.port, ['rx'], self._on_rx)
+        except AgentClientError as e:
+            self.client.close()
+            raise ConnectionError(f"工位代理打开 {self.port} 失败: {e}")
+        self.is_open = True
+
+    def _on_rx(self, message):
+        data = bytes.fromhex(message['data'])
+        with self._cond:
+            self._rx += data
+            self._cond.notify_all()
+
+    def read(self, size=1):
+        with self._cond:
+            self._cond.wait_for(lambda: self._rx or not self.client.connected, self.timeout)
+            if not self._rx and not self.client.connected:
+                raise ConnectionError("与工位代理的连接已断开")
+            data = bytes(self._rx[:size])
+            del self._rx[:size]
+        return data
+
+    @property
+    def in_waiting(self):
+        return len(self._rx)
+
+    def write(self, data):
+        try:
+            self.client.call('send', port=self.port, data=data.hex(' '))
+        except AgentClientError as e:
+            raise ConnectionError(str(e))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self.client.close()
+            with self._cond:
+                self._cond.notify_all()
+
+
+class SimulatorTransport:
+    """进程内模拟电机板, 写入的命令帧立即产生应答"""
+
+    def __init__(self, url, timeout=None, simulator=None):
+        from core.codec import FrameParser
+        from core.simulators import MotorBoardSimulator
+        self.url = url
+        self.timeout = timeout
+        self.simulator = simulator or MotorBoardSimulator()
+        self._parser = FrameParser()
+        self._rx = bytearray()
+        self._cond = threading.Condition()
+        self.is_open = True
+
+    def read(self, size=1):
+        with self._cond:
+            self._cond.wait_for(lambda: self._rx or not self.is_open, self.timeout)
+            if not self.is_open:
+                raise ConnectionError(f"{self.url} 已关闭")
+            data = bytes(self._rx[:size])
+            del self._rx[:size]
+        return data
+
+    @property
+    def in_waiting(self):
+        return len(self._rx)
+
+    def write(self, data):
+        if not self.is_open:
+            raise ConnectionError(f"{self.url} 已关闭")
+        replies = [self.simulator.handle(frame) for frame in self._parser.feed(data)]
+        with self._cond:
+            for reply in replies:
+                if reply:
+                    self._rx += reply
+            self._cond.notify_all()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        with self._cond:
+            self.is_open = False
+            self._cond.notify_all()
+
+
+def _open_serial(device, baud_rate, timeout):
+    import serial
+    return serial.Serial(
+        port=device,
+        baudrate=baud_rate,
+        timeout=timeout,
+        bytesize=serial.EIGHTBITS,
+        parity=serial.PARITY_NONE,
+        stopbits=serial.STOPBITS_ONE,
+        exclusive=True      # 其他进程 (如独立运行的扫码工位) 已打开时直接失败
+    )
+
+
+def _open_rfc2217(url, baud_rate, timeout):
+    import serial
+    port = serial.serial_for_url(url, baudrate=baud_rate, timeout=timeout, do_not_open=True)
+    port.open()
+    # RFC 2217 客户端底层同样使用 TCP, 关闭 Nagle 以降低单帧延迟
+    sock = getattr(port, '_socket', None)
+    if sock is not None:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return port
+
+
+def open_transport(name, baud_rate, timeout=None):
+    """按地址格式打开传输; 失败时抛出 OSError (serial.SerialException 也是 OSError 的子类)"""
+    lowered = name.lower()
+    if lowered.startswith(TCP_PREFIX):
+        return TcpTransport(name, timeout=timeout)
+    if lowered.startswith(RFC2217_PREFIX):
+        return _open_rfc2217(name, baud_rate, timeout)
+    if lowered.startswith(AGENT_PREFIX):
+        return AgentTransport(name, baud_rate, timeout=timeout)
+    if lowered.startswith(SIM_PREFIX):
+        return SimulatorTransport(name, timeout=timeout)
+    return _open_serial(name, baud_rate, timeout)
@@ -0,0 +1,117 @@
+"""滑动时间窗口统计
+
+对遥测字段按时间窗口 (例如 1 s / 1 min / 1 h) 增量维护 最小/最大/均值/标准差/变化率,
+每个样本的更新为均摊 O(1), 查询为 O(1), 不会对历史数据重新计算:
+    - 最小/最大值: 单调双端队列
+    - 均值/方差: Welford 算法 (加入新样本, 移出过期样本)
+    - 变化率: 窗口内最早与最新样本的差值除以时间差 (单位/秒)
+"""
+
+import collections
+import math
+
+DEFAULT_FIELDS = ('speed', 'voltage', 'temperature', 'power')
+DEFAULT_WINDOWS = {'1s': 1.0, '1min': 60.0, '1h': 3600.0}
+
+
+class SlidingWindow:
+    """单个字段在一个时间窗口内的统计"""
+
+    def __init__(self, duration):
+        self.duration_ns = int(duration * 1_000_000_000)
+        self._values = collections.deque()   # (ts_ns, value)
+        self._min = collections.deque()      # 单调递增, 队首为最小值
+        self._max = collections.deque()      # 单调递减, 队首为最大值
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, ts_ns, value):
+        self._values.append((ts_ns, value))
+        count = len(self._values)
+        delta = value - self._mean
+        self._mean += delta / count
+        self._m2 += delta * (value - self._mean)
+
+        while self._min and self._min[-1][1] > value:
+            self._min.pop()
+        self._min.append((ts_ns, value))
+        while self._max and self._max[-1][1] < value:
+            self._max.pop()
+        self._max.append((ts_ns, value))
+
+        self._expire(ts_ns)
+
+    def _expire(self, now_ns):
+        cutoff = now_ns - self.duration_ns
+        while self._values and self._values[0][0] < cutoff:
+            old_ts, old = self._values.popleft()
+            count = len(self._values)
+            if count == 0:
+                self._mean = self._m2 = 0.0
+            else:
+                delta = old - self._mean
+                self._mean -= delta / count
+                self._m2 = max(0.0, self._m2 - delta * (old - self._mean))
+            if self._min[0][0] == old_ts:
+                self._min.popleft()
+            if self._max[0][0] == old_ts:
+                self._max.popleft()
+
+    @property
+    def count(self):
+        return len(self._values)
+
+    def snapshot(self, now_ns=None):
+        """返回统计字典, 窗口为空时返回 None; now_ns 给定时先移出此刻已过期的样本"""
+        if now_ns is not None:
+            self._expire(now_ns)
+        count = len(self._values)
+        if count == 0:
+            return None
+        first_ts, first = self._values[0]
+        last_ts, last = self._values[-1]
+        span_s = (last_ts - first_ts) / 1e9
+        return {
+            'count': count,
+            'last': last,
+            'min': self._min[0][1],
+            'max': self._max[0][1],
+            'mean': self._mean,
+            'stddev': math.sqrt(self._m2 / (count - 1)) if count > 1 else 0.0,
+            'rate': (last - first) / span_s if span_s > 0 else 0.0,
+        }
+
+
+class TelemetryWindows:
+    """一组字段 x 一组时间窗口的统计
+
+    add(sample, ts_ns) 接收 0x21 样本字典 (字段见 core.telemetry), 时间戳不晚于上一个样本的视为重复并忽略,
+    因此同一应答经多条路径送达也只计一次。
+    """
+
+    def __init__(self, fields=DEFAULT_FIELDS, windows=None):
+        self.fields = tuple(fields)
+        self.windows = dict(windows or DEFAULT_WINDOWS)
+        self._stats = {name: {field: SlidingWindow(duration) for field in self.fields}
+                       for name, duration in self.windows.items()}
+        self._last_ts_ns = None
+
+    def add(self, sample, ts_ns):
+        if self._last_ts_ns is not None and ts_ns <= self._last_ts_ns:
+            return False
+        self._last_ts_ns = ts_ns
+        for per_field in self._stats.values():
+            for field, window in per_field.items():
+                value = sample.get(field)
+                if value is not None:
+                    window.add(ts_ns, value)
+        return True
+
+    def snapshot(self, window, now_ns=None):
+        """返回 {字段: 统计字典或 None}, now_ns 为当前时刻 (停止采样后窗口随时间清空)"""
+        return {field: stats.snapshot(now_ns) for field, stats in self._stats[window].items()}
+
+    def reset(self):
+        self._stats = {name: {field: SlidingWindow(duration) for field in self.fields}
+                       for name, duration in self.windows.items()}
+        self._last_ts_ns = None
@@ -1,12 +1,57 @@
+import os
 import sys
 from PyQt6.QtWidgets import QApplication
-from views.main_window import MainWindow
+from PyQt6.QtCore import QObject, QEvent, QTimer
+from views.main_window import MainWindow, prewarm_panels
+from core.alarms import get_alarm_engine
+from core.archive import get_telemetry_archive
+from core.journal import close_open_journals
+from core.telemetry import get_telemetry_store
+
+
+class FirstPaintWatcher(QObject):
+    """首帧绘制完成后执行回调 (只触发一次)"""
+
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            obj.removeEventFilter(self)
+            # 等本次绘制结束后再执行
+            QTimer.singleShot(0, self.callback)
+        return False
+
 
 def main():
     app = QApplication(sys.argv)
     window = MainWindow()
+
+    # 遥测分级归档 (~/.qt_desktop_app/archive), 退出时写入未结束的时间桶
+    archive = get_telemetry_archive()
+    archive.attach(get_telemetry_store())
+    app.aboutToQuit.connect(archive.close)
+    # 正常退出时关闭会话日志, 下次启动不会被当作异常退出的会话
+    app.aboutToQuit.connect(close_open_journals)
+
+    # 每个状态样本都经过报警规则评估 (规则见 ~/.qt_desktop_app/alarms.json)
+    get_telemetry_store().add_listener(get_alarm_engine().evaluate)
+
+    # 启动基准测试模式: 首帧绘制后输出标记并退出
+    startup_bench = os.environ.get("APP_STARTUP_BENCH") == "1"
+
+    def on_first_paint():
+        if startup_bench:
+            print("FIRST_PAINT", flush=True)
+            app.quit()
+        else:
+            prewarm_panels()
+
+    watcher = FirstPaintWatcher(on_first_paint)
+    window.installEventFilter(watcher)
     window.show()
     sys.exit(app.exec())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
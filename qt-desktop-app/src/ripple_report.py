@@ -0,0 +1,101 @@
+"""转速纹波分析命令行入口 (需要 NumPy)
+
+批量分析采集文件 (转速扫描导出的 JSON 或状态样本 JSON Lines), 或通过工位代理对一块板实时分析。
+每个结果一行 JSON 输出; 设置了 --max-amplitude 时全部通过退出码为 0。
+
+用法:
+    python ripple_report.py capture1.json capture2.jsonl --max-amplitude 10 [--band 5,50]
+    python ripple_report.py --agent /dev/ttyUSB0 --seconds 60 --interval 5 --max-amplitude 10
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+
+from core.codec import CMD_STATUS, build_frame, to_hex
+from core.ripple import RippleError, RippleMonitor, analyze_capture
+
+
+def parse_band(text):
+    low, high = (float(part) for part in text.split(','))
+    return low, high
+
+
+def run_batch(args, options):
+    passed = True
+    for path in args.captures:
+        try:
+            result = analyze_capture(path, **options)
+        except (OSError, ValueError, RippleError) as e:
+            result = {'file': path, 'error': str(e), 'pass': False}
+        passed = passed and result.get('pass', True)
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+    return passed
+
+
+def run_live(args, options):
+    """订阅代理的 status 数据流, 同时背靠背轮询 0x21, 每隔 interval 秒输出一次窗口分析"""
+    from core.agent_client import AgentClient, AgentClientError
+
+    client = AgentClient(args.socket)
+    monitor = RippleMonitor(args.agent, window=args.window, **options)
+    client.subscribe(args.agent, ['status'], lambda message: monitor.add(args.agent, message))
+    stop = threading.Event()
+    query = to_hex(build_frame(CMD_STATUS))
+
+    def poll():
+        while not stop.is_set():
+            try:
+                client.call('request', port=args.agent, data=query)
+            except AgentClientError as e:
+                if stop.is_set():
+                    return
+                print(f"轮询失败: {e}", file=sys.stderr)
+                stop.wait(0.5)
+
+    threading.Thread(target=poll, name="ripple-poll", daemon=True).start()
+    passed = True
+    deadline = time.monotonic() + args.seconds
+    try:
+        while time.monotonic() < deadline:
+            time.sleep(args.interval)
+            try:
+                result = monitor.analyze()
+            except RippleError as e:
+                print(f"等待样本: {e}", file=sys.stderr)
+                continue
+            result['port'] = args.agent
+            passed = passed and result.get('pass', True)
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        client.close()
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="转速纹波频谱分析")
+    parser.add_argument("captures", nargs="*", help="采集文件 (JSON / JSON Lines)")
+    parser.add_argument("--max-amplitude", type=float, help="纹波幅值上限 (RPM)")
+    parser.add_argument("--band", type=parse_band, help="只判定该频段内的峰值, 格式 下限,上限 (Hz)")
+    parser.add_argument("--segment", type=float, default=4.0, help="Welch 分段长度 (秒)")
+    parser.add_argument("--agent", metavar="PORT", help="通过工位代理实时分析该串口")
+    parser.add_argument("--socket", help="工位代理套接字路径")
+    parser.add_argument("--seconds", type=float, default=60, help="实时分析总时长 (秒)")
+    parser.add_argument("--interval", type=float, default=5, help="实时分析输出间隔 (秒)")
+    parser.add_argument("--window", type=float, default=20, help="实时分析窗口 (秒)")
+    args = parser.parse_args()
+    if not args.captures and not args.agent:
+        parser.error("需要采集文件或 --agent")
+
+    options = {'max_amplitude': args.max_amplitude, 'band': args.band, 'segment_seconds': args.segment}
+    passed = run_live(args, options) if args.agent else run_batch(args, options)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
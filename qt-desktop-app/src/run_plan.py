@@ -0,0 +1,106 @@
+"""测试流程命令行入口 (无界面)
+
+对多个串口并行执行同一测试流程, 步骤结果以 JSON Lines 输出, 可同时生成 JUnit 汇总。
+全部通过时退出码为 0。
+
+用法:
+    python run_plan.py ../plans/motor_board_basic.json --port /dev/ttyUSB0 --port /dev/ttyUSB1 \
+        [--jsonl results.jsonl] [--junit results.xml] [--serial /dev/ttyUSB0=SN0001]
+
+每块板的结果同时写入测试结果库 (~/.qt_desktop_app/results.db, 可用 --db 指定, --no-db 关闭);
+--serial 把串口对应到板子序列号, 未指定时以串口名作为序列号。
+--journal 为每个串口写会话日志 (~/.qt_desktop_app/journal), 记录步骤结果和每秒遥测汇总;
+启动时先恢复以前异常中断的 run_plan 会话, 每个输出一行 recovered 事件 (已完成的步骤和最后一个事件)。
+
+离线调试可使用模拟电机板: --port sim://a --port sim://b
+"""
+
+import argparse
+import sys
+
+from core.journal import close_open_journals, open_session, recover_sessions
+from core.plans import TestPlan, PlanError
+from core.plan_runner import PlanRunner, JsonLinesWriter, write_junit, RESULT_PASS
+from core.results_db import DEFAULT_DB_PATH, ResultsDatabase, run_from_plan_result
+from core.telemetry import get_telemetry_store
+
+
+def parse_serial(text):
+    port, _, serial = text.partition('=')
+    if not port or not serial:
+        raise argparse.ArgumentTypeError("格式应为 串口=序列号")
+    return port, serial
+
+
+JOURNAL_SOURCE = 'run_plan'
+
+
+def recover_interrupted_runs(writer):
+    """恢复异常中断的 run_plan 会话日志 (界面的会话日志由各面板自己恢复)"""
+    for path, session in recover_sessions(lambda session: session['state'].get('source') == JOURNAL_SOURCE):
+        steps = [event for event in session['steps'] if event.get('event') == 'step']
+        last = session['steps'][-1] if session['steps'] else None
+        writer({'event': 'recovered', 'journal': path, 'plan': session['state'].get('plan'),
+                'port': session['state'].get('port'), 'steps': [step['step'] for step in steps],
+                'completed': bool(last and last.get('event') == 'plan_end'), 'last_event': last,
+                'rollups': len(session['rollups'])})
+        print(f"已恢复中断的会话日志: {path} ({len(steps)} 个步骤)", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测试流程执行")
+    parser.add_argument("plan", help="测试流程文件 (JSON)")
+    parser.add_argument("--port", action="append", required=True, help="串口 (可重复, 并行执行)")
+    parser.add_argument("--jsonl", default="-", help="步骤结果输出文件, - 表示标准输出 (默认)")
+    parser.add_argument("--junit", help="JUnit 汇总 XML 输出文件")
+    parser.add_argument("--serial", action="append", type=parse_serial, default=[],
+                        help="串口对应的板子序列号, 格式 串口=序列号 (可重复)")
+    parser.add_argument("--station", help="工位名称 (默认使用串口名)")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="测试结果库路径")
+    parser.add_argument("--no-db", action="store_true", help="不写入测试结果库")
+    parser.add_argument("--journal", action="store_true", help="为每个串口写会话日志")
+    args = parser.parse_args()
+
+    try:
+        plan = TestPlan.load(args.plan)
+    except (OSError, PlanError) as e:
+        print(f"加载测试流程失败: {e}", file=sys.stderr)
+        return 2
+
+    output = sys.stdout if args.jsonl == "-" else open(args.jsonl, "a", encoding="utf-8")
+    writer = JsonLinesWriter(output)
+    journals = {}
+    if args.journal:
+        recover_interrupted_runs(writer)
+        for port in args.port:
+            journals[port] = open_session(args.station or port,
+                                          {'source': JOURNAL_SOURCE, 'plan': plan.name, 'port': port})
+            journals[port].attach(get_telemetry_store(), port)
+
+    def on_event(event):
+        writer(event)
+        if event['port'] in journals:
+            journals[event['port']].record_event(event)
+
+    try:
+        results = PlanRunner(plan, args.port, on_event=on_event).run()
+    finally:
+        close_open_journals()
+        if output is not sys.stdout:
+            output.close()
+
+    if args.junit:
+        write_junit(results, args.junit)
+    if not args.no_db:
+        serials = dict(args.serial)
+        database = ResultsDatabase(args.db)
+        for port, result in results.items():
+            database.record_run(run_from_plan_result(result, serials.get(port), args.station))
+        database.close()
+    summary = ", ".join(f"{port}: {result['result']}" for port, result in results.items())
+    print(f"{plan.name} 完成 - {summary}", file=sys.stderr)
+    return 0 if all(result['result'] == RESULT_PASS for result in results.values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,13 +1,22 @@
-from PyQt6.QtWidgets import QMainWindow, QPushButton, QVBoxLayout, QWidget, QHBoxLayout
-from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QMainWindow, QPushButton, QVBoxLayout, QWidget, QHBoxLayout, QApplication
+from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QFont, QIcon
 import os
 
 class BasePanel(QMainWindow):
+    # 嵌入主界面时: 请求返回主界面 / 请求释放本面板资源
+    back_requested = pyqtSignal()
+    release_requested = pyqtSignal()
+
     def __init__(self, title):
         super().__init__()
+        self.title = title
         self.setWindowTitle(title)
         self.setGeometry(100, 100, 800, 600)
+
+        # 嵌入主界面时不继承主界面的背景图
+        self.setPalette(QApplication.palette())
+        self.setAutoFillBackground(True)
         
         # 设置窗口图标
         self.set_window_icon()
@@ -48,9 +57,28 @@ class BasePanel(QMainWindow):
         
         self.back_button.clicked.connect(self.back_to_main)
         
+        # 释放按钮 - 关闭本面板的串口等资源
+        self.release_button = QPushButton("释放资源", self)
+        self.release_button.setFixedSize(100, 36)
+        self.release_button.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.release_button.setToolTip("关闭本面板打开的串口和连接，下次进入时重新创建")
+        self.release_button.setStyleSheet("""
+            QPushButton {
+                color: #e74c3c;
+                border: 1px solid #e74c3c;
+                border-radius: 5px;
+                padding: 8px 10px;
+            }
+            QPushButton:hover {
+                background-color: #fdedec;
+            }
+        """)
+        self.release_button.clicked.connect(self.release_requested.emit)
+
         # 将按钮添加到顶部布局中，并在按钮后添加弹性空间
         top_bar.addWidget(self.back_button)
         top_bar.addStretch()  # 添加弹性空间，确保按钮靠左
+        top_bar.addWidget(self.release_button)
         
         # 将顶部布局添加到主布局中
         self.layout.addLayout(top_bar)
@@ -69,9 +97,12 @@ class BasePanel(QMainWindow):
             self.setWindowIcon(app_icon)
 
     def back_to_main(self):
-        # 先清理资源
+        # 嵌入主界面时只切换页面, 串口和界面状态保持不变
+        if self.parent() is not None:
+            self.back_requested.emit()
+            return
+        # 独立窗口: 先清理资源, 然后返回主界面
         self.cleanup()
-        # 然后返回主界面
         from .main_window import MainWindow
         self.main_window = MainWindow()
         self.main_window.show()
@@ -2,6 +2,9 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                             QDial, QPushButton, QFrame, QComboBox)
 from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QColor, QPalette, QFont
+from controllers.write_scheduler import PRIORITY_HEARTBEAT
+from controllers.heartbeat import PeriodicTransmitter
+from core.codec import build_frame, checksum, parse_hex, CMD_STATUS
 
 
 class ControlWidget(QWidget):
@@ -11,9 +14,11 @@ class ControlWidget(QWidget):
         self.serial_controller = serial_controller
         self.serial_widget = serial_widget
         
-        # 添加定时器用于持续发送命令
-        self.command_timer = QTimer(self)
-        self.command_timer.timeout.connect(self.send_current_command)
+        # 心跳发送器: 在独立线程中按绝对时间周期发送预编码帧
+        self.heartbeat = PeriodicTransmitter(self._send_heartbeat_frame)
+        if self.serial_controller:
+            # 滞后按写线程实际写出的时刻统计
+            self.serial_controller.frame_sent.connect(self._on_frame_sent)
         self.current_command_type = None  # 'start', 'stop', 'fault' 或 None
         self.current_fault_code = None    # 只有在故障模式下才使用
         
@@ -252,6 +257,14 @@ class ControlWidget(QWidget):
         fault_panel.addWidget(self.fault_selector)
         
         control_layout.addLayout(fault_panel)
+
+        # 心跳时序统计
+        self.heartbeat_stats_label = QLabel("心跳抖动: -")
+        self.heartbeat_stats_label.setStyleSheet("QLabel { color: #666; font-size: 9pt; }")
+        control_layout.addWidget(self.heartbeat_stats_label)
+        self.heartbeat_stats_timer = QTimer(self)
+        self.heartbeat_stats_timer.timeout.connect(self.update_heartbeat_stats)
+        self.heartbeat_stats_timer.start(1000)
         
         # 减小添加的弹性空间，使内容总体上移
         control_layout.addStretch(1)  # 使用整数值作为弹性空间权重
@@ -347,17 +360,12 @@ class ControlWidget(QWidget):
     def on_motor_start(self):
         """处理电机运行按钮点击事件 - 持续发送运行命令"""
         if self.serial_controller:
-            # 停止任何正在进行的命令发送
-            self.stop_sending_commands()
-            
             # 设置当前命令类型为启动
             self.current_command_type = 'start'
-            
-            # 立即发送一次命令
-            self.send_current_command()
+            self.current_fault_code = None
 
-            # 启动定时器，每50ms发送一次命令
-            self.command_timer.start(50)
+            # 原子地切换心跳帧，立即发送并每50ms发送一次
+            self.heartbeat.start(self.build_heartbeat_frame(), 0.05)
             
             # 更新UI
             self.set_signal_light("green")  # 设置绿灯表示运行
@@ -366,17 +374,12 @@ class ControlWidget(QWidget):
     def on_motor_stop(self):
         """处理电机停机按钮点击事件 - 持续发送停止命令"""
         if self.serial_controller:
-            # 停止任何正在进行的命令发送
-            self.stop_sending_commands()
-            
             # 设置当前命令类型为停止
             self.current_command_type = 'stop'
-            
-            # 立即发送一次命令
-            self.send_current_command()
-            
-            # 启动定时器，每50ms发送一次命令
-            self.command_timer.start(50)
+            self.current_fault_code = None
+
+            # 原子地切换心跳帧，立即发送并每50ms发送一次
+            self.heartbeat.start(self.build_heartbeat_frame(), 0.05)
             
             # 更新UI
             self.set_signal_light("red")  # 设置红灯表示停止
@@ -385,9 +388,6 @@ class ControlWidget(QWidget):
     def on_motor_fault(self):
         """处理电机故障按钮点击事件 - 持续发送故障命令"""
         if self.serial_controller:
-            # 停止任何正在进行的命令发送
-            self.stop_sending_commands()
-            
             # 获取故障类型
             fault_index = self.fault_selector.currentIndex()
             # 计算故障代码 (0x20-0x2B, 0x50)
@@ -401,51 +401,51 @@ class ControlWidget(QWidget):
             # 设置当前命令类型为故障
             self.current_command_type = 'fault'
             
-            # 立即发送一次命令
-            self.send_current_command()
-            
-            # 启动定时器，每500ms发送一次命令
-            self.command_timer.start(500)
+            # 原子地切换心跳帧，立即发送并每500ms发送一次
+            self.heartbeat.start(self.build_heartbeat_frame(), 0.5)
             
             # 更新UI
             self.set_signal_light("blue")  # 设置蓝灯表示故障
             self.update_button_highlighting()
 
     def get_checksum(self, command):
-        checksum = 0
-        for byte in command.split():
-            checksum += int(byte, 16)
-        checksum = checksum & 0xFF  
-        print("checksum:", hex(checksum))
-        return checksum
+        """计算十六进制命令字符串的校验和"""
+        value = checksum(parse_hex(command))
+        print("checksum:", hex(value))
+        return value
 
-    def send_current_command(self):
-        """根据当前命令类型发送相应的命令"""
-        if not self.serial_controller or self.current_command_type is None:
-            return
-            
+    def build_heartbeat_frame(self):
+        """根据当前命令类型构造预编码的 0x21 心跳帧"""
         if self.current_command_type == 'start':
-            pre_command = "10 02 21 0B 00 00 00 37 1C 00 00" 
-            checksum = self.get_checksum(pre_command) 
-            command = f"10 02 21 0B 00 00 00 37 1C 00 00 {checksum:02X} 10 03"
-            self.serial_controller.send_command(command)
-            
-        elif self.current_command_type == 'stop':
-            pre_command = "10 02 21 00 00 00 00 37 1C 00 00"
-            checksum = self.get_checksum(pre_command)
-            command = f"10 02 21 00 00 00 00 37 1C 00 00 {checksum:02X} 10 03"
-            self.serial_controller.send_command(command)
-            
-        elif self.current_command_type == 'fault' and self.current_fault_code is not None:
-            pre_command = f"10 02 21 {self.current_fault_code:02X} 00 00 00 00 00 00 00"
-            checksum = self.get_checksum(pre_command)
-            command = f"10 02 21 {self.current_fault_code:02X} 00 00 00 00 00 00 00 {checksum:02X} 10 03"
-            self.serial_controller.send_command(command)
+            return build_frame(CMD_STATUS, bytes([0x0B, 0x00, 0x00, 0x00, 0x37, 0x1C, 0x00, 0x00]))
+        if self.current_command_type == 'stop':
+            return build_frame(CMD_STATUS, bytes([0x00, 0x00, 0x00, 0x00, 0x37, 0x1C, 0x00, 0x00]))
+        if self.current_command_type == 'fault' and self.current_fault_code is not None:
+            return build_frame(CMD_STATUS, bytes([self.current_fault_code, 0, 0, 0, 0, 0, 0, 0]))
+        return None
+
+    def _send_heartbeat_frame(self, frame, period, tag):
+        """心跳线程回调: 以心跳优先级发送, 未发出的旧心跳帧会被新帧替换 (以心跳标记作为合并标识)"""
+        self.serial_controller.send_command(frame, priority=PRIORITY_HEARTBEAT,
+                                            deadline=period, coalesce_key=tag)
+
+    def _on_frame_sent(self, frame):
+        self.heartbeat.record_sent(frame.tag, frame.ts_ns)
+
+    def update_heartbeat_stats(self):
+        """显示心跳发送时序统计"""
+        if not self.heartbeat.is_active:
+            self.heartbeat_stats_label.setText("心跳抖动: -")
+            return
+        stats = self.heartbeat.stats()
+        self.heartbeat_stats_label.setText(
+            f"心跳抖动: 平均 {stats['mean_ms']:.2f} ms  p99 {stats['p99_ms']:.2f} ms  "
+            f"最大 {stats['max_ms']:.2f} ms  丢拍 {stats['missed']}")
 
     def stop_sending_commands(self):
         """停止发送命令"""
-        if self.command_timer.isActive():
-            self.command_timer.stop()
+        self.heartbeat.stop()
+        self.heartbeat.reset_stats()
         self.current_command_type = None
         self.current_fault_code = None
         self.update_button_highlighting()
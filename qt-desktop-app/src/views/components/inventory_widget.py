@@ -0,0 +1,92 @@
+import threading
+import time
+
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox,
+                             QTableWidget, QTableWidgetItem, QHeaderView)
+from PyQt6.QtCore import pyqtSignal
+
+from controllers.inventory import InventorySweep
+from core.codec import status_light
+
+
+class InventoryWidget(QWidget):
+    """固件盘点窗口 - 并行读取所有串口上电机板的固件版本"""
+
+    COLUMNS = ["端口", "设备标识", "描述", "固件版本", "状态", "延迟(ms)", "来源"]
+
+    # 盘点线程 -> 界面线程
+    finished = pyqtSignal(list, float)
+
+    def __init__(self, busy_ports=None, parent=None):
+        super().__init__(parent)
+        self.busy_ports = busy_ports     # 返回被其他进程占用串口集合的函数
+        self.setWindowTitle("固件盘点")
+        self.resize(820, 420)
+        self._running = False
+
+        layout = QVBoxLayout(self)
+
+        button_row = QHBoxLayout()
+        self.btn_sweep = QPushButton("盘点")
+        self.btn_sweep.clicked.connect(lambda: self.start_sweep(False))
+        self.btn_refresh = QPushButton("强制刷新")
+        self.btn_refresh.clicked.connect(lambda: self.start_sweep(True))
+        self.status_check = QCheckBox("同时读取状态 (0x21)")
+        button_row.addWidget(self.btn_sweep)
+        button_row.addWidget(self.btn_refresh)
+        button_row.addWidget(self.status_check)
+        button_row.addStretch()
+        layout.addLayout(button_row)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        self.finished.connect(self.show_results)
+
+    def start_sweep(self, force=False):
+        if self._running:
+            return
+        self._running = True
+        self.btn_sweep.setEnabled(False)
+        self.btn_refresh.setEnabled(False)
+        self.summary_label.setText("盘点中...")
+        sweep = InventorySweep(read_status=self.status_check.isChecked(),
+                               busy=self.busy_ports() if self.busy_ports else ())
+
+        def run():
+            started = time.monotonic()
+            try:
+                results = sweep.run(force=force)
+            except Exception as e:
+                print(f"固件盘点失败: {e}")
+                results = []
+            self.finished.emit(results, time.monotonic() - started)
+
+        threading.Thread(target=run, name="inventory-sweep", daemon=True).start()
+
+    def show_results(self, results, elapsed):
+        self._running = False
+        self.btn_sweep.setEnabled(True)
+        self.btn_refresh.setEnabled(True)
+        self.table.setRowCount(len(results))
+        for row, entry in enumerate(results):
+            status = entry['status']
+            values = [
+                entry['device'],
+                entry['stable_id'],
+                entry['description'],
+                entry['version'] or entry['error'] or "-",
+                status_light(status['status'])[0] if status else "-",
+                f"{entry['latency_ms']:.1f}" if entry['latency_ms'] is not None else "-",
+                "缓存" if entry['cached'] else "实时",
+            ]
+            for col, value in enumerate(values):
+                self.table.setItem(row, col, QTableWidgetItem(value))
+        answered = sum(1 for entry in results if entry['version'])
+        self.summary_label.setText(f"串口: {len(results)}  有应答: {answered}  耗时: {elapsed * 1000:.0f} ms")
@@ -1,12 +1,35 @@
+import time
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                            QPushButton, QFrame, QLineEdit, QSpinBox, QGridLayout, QMessageBox, QSizePolicy)  # 添加导入
-from PyQt6.QtCore import Qt, QTimer
+                            QPushButton, QFrame, QLineEdit, QSpinBox, QGridLayout, QMessageBox, QSizePolicy,
+                            QCheckBox, QComboBox)  # 添加导入
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QFont
+from core.codec import (CMD_STATUS, CMD_VERSION, CMD_START, CMD_STOP, CMD_SET_SPEED,
+                        build_frame, build_speed_frame, decode_status, decode_version, parse_hex, status_light, to_hex)
+from core.alarms import EVENT_RAISED
+from core.clock import StampedFrame, timestamp_of
+from core.window_stats import TelemetryWindows
+
+# 预编码的命令帧
+STATUS_QUERY = to_hex(build_frame(CMD_STATUS))
+VERSION_QUERY = to_hex(build_frame(CMD_VERSION))
+START_COMMAND = to_hex(build_frame(CMD_START))
+STOP_COMMAND = to_hex(build_frame(CMD_STOP))
+
+COMMAND_TIMEOUT = 1.0   # 命令序列每一步的应答超时 (秒)
 
 class MotorWidget(QWidget):
+    # 命令序列中一步的事务结束 (事务回调线程 -> 界面线程), 参数为 (序列号, Transaction)
+    command_finished = pyqtSignal(object)
+
     def __init__(self, serial_controller=None, serial_widget=None, serial_data_controller=None, parent=None):
         super().__init__(parent)
         self.serial_controller = serial_controller
+        self.window_stats = TelemetryWindows()  # 转速/电压/温度/功率的滑动窗口统计
+        self.command_steps = []  # 当前命令序列
+        self.current_step = 0
+        self._sequence = 0
+        self.command_finished.connect(self._on_command_finished)
 
         # 创建水平主布局而不是垂直布局
         self.main_layout = QHBoxLayout(self)  # 使用水平布局
@@ -76,8 +99,39 @@ class MotorWidget(QWidget):
         self._add_param_row(params_grid, 3, "voltage", "电压值", "0 V")
         self._add_param_row(params_grid, 4, "temperature", "温度值", "0 °C")
         self._add_param_row(params_grid, 5, "power", "输出功率", "0 W")
+
+        # 滑动窗口统计 (显示在实时值右侧): 最小~最大 / 均值±标准差 / 变化率
+        self.stats_labels = {}
+        for row, field in enumerate(('speed', 'voltage', 'temperature', 'power'), start=2):
+            stats_label = QLabel("-")
+            stats_label.setStyleSheet("QLabel { color: #7f8c8d; }")
+            params_grid.addWidget(stats_label, row, 2)
+            self.stats_labels[field] = stats_label
+        window_label = QLabel("统计窗口:")
+        window_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        params_grid.addWidget(window_label, 6, 0)
+        self.stats_window_selector = QComboBox()
+        self.stats_window_selector.addItem("1 秒", "1s")
+        self.stats_window_selector.addItem("1 分钟", "1min")
+        self.stats_window_selector.addItem("1 小时", "1h")
+        self.stats_window_selector.currentIndexChanged.connect(self._refresh_window_stats)
+        params_grid.addWidget(self.stats_window_selector, 6, 1)
+
+        # 统计值按固定周期刷新显示, 与采样速率无关
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self._refresh_window_stats)
+        self.stats_timer.start(500)
         
         display_layout.addLayout(params_grid)
+
+        # 报警提示 (有未清除的报警时显示)
+        self.active_alarms = {}
+        self.alarm_label = QLabel()
+        self.alarm_label.setWordWrap(True)
+        self.alarm_label.setStyleSheet(
+            "QLabel { color: white; background-color: #c0392b; border-radius: 3px; padding: 5px; }")
+        self.alarm_label.setVisible(False)
+        display_layout.addWidget(self.alarm_label)
         
         # 创建一个水平居中的容器用于放置读取状态按钮
         button_container = QHBoxLayout()
@@ -104,7 +158,22 @@ class MotorWidget(QWidget):
         """)
         
         button_container.addWidget(self.refresh_button)
+
+        # 自动刷新: 自适应轮询 0x21, 数值变化时按最快速率, 稳定后逐步放慢
+        self.auto_refresh_check = QCheckBox("自动刷新")
+        self.auto_refresh_check.toggled.connect(self._on_auto_refresh_toggled)
+        button_container.addWidget(self.auto_refresh_check)
+        self.poll_rate_input = QSpinBox()
+        self.poll_rate_input.setRange(1, 200)
+        self.poll_rate_input.setValue(20)
+        self.poll_rate_input.setSuffix(" Hz")
+        self.poll_rate_input.setToolTip("最快轮询速率, 稳态时自动降到 1 Hz")
+        self.poll_rate_input.valueChanged.connect(self._on_poll_rate_changed)
+        button_container.addWidget(self.poll_rate_input)
         button_container.addStretch()
+        if self.serial_controller:
+            self.serial_controller.status_sampled.connect(self.show_status)
+            self.serial_controller.alarm_event.connect(self.handle_alarm_event)
         
         # 添加按钮布局
         display_layout.addLayout(button_container)
@@ -300,6 +369,13 @@ class MotorWidget(QWidget):
         # 添加到控制布局
         control_layout.addLayout(version_layout)
 
+        # 转速扫描 (按曲线自动设定转速并统计动态特性)
+        self.sweep_button = QPushButton("转速扫描")
+        self.sweep_button.clicked.connect(self.show_sweep_window)
+        self.sweep_button.setFixedWidth(120)
+        control_layout.addWidget(self.sweep_button)
+        self.sweep_window = None
+
         # 添加弹性空间在按钮下方
         control_layout.addStretch()
         
@@ -312,375 +388,187 @@ class MotorWidget(QWidget):
         if not self._check_serial_connection():
             return
 
-         # 清理旧的信号连接
-        try:
-            self.serial_controller.data_received.disconnect()
-        except:
-            pass
-
-        # 记录当前步骤
-        self.current_step = 0
-        self.command_steps = [
+        self._run_steps([
             {
-                'command': "10 02 21 00 00 33 10 03",
+                'command': STATUS_QUERY,
                 'handler': self._handle_status_response,
                 'description': '读取状态'
-            }   
-        ]
-        
-        # 连接通用响应处理函数
-        print(f"正在发送: {self.command_steps[0]['description']}")
-        self.serial_controller.data_received.connect(self._universal_response_handler)
-        
-        # 发送第一个命令
-        self.serial_controller.send_command(self.command_steps[0]['command'])
-        
-        # 设置超时处理
-        self.response_timer = QTimer(self)
-        self.response_timer.setSingleShot(True)
-        self.response_timer.timeout.connect(self._on_response_timeout)
-        self.response_timer.start(100)  # 100毫秒超时
-
-
+            }
+        ])
 
     def _on_get_version(self):
         """获取软件版本"""
         if not self._check_serial_connection():
             return
 
-         # 清理旧的信号连接
-        try:
-            self.serial_controller.data_received.disconnect()
-        except:
-            pass
-
-        # 记录当前步骤
-        self.current_step = 0
-        self.command_steps = [
+        self._run_steps([
             {
-                'command': "10 02 20 00 00 32 10 03",
+                'command': VERSION_QUERY,
                 'handler': self._handle_version_response,
                 'description': '获取软件版本'
-            }   
-        ]
-        
-        # 连接通用响应处理函数
-        print(f"正在发送: {self.command_steps[0]['description']}")
-        self.serial_controller.data_received.connect(self._universal_response_handler)
-        
-        # 发送第一个命令
-        self.serial_controller.send_command(self.command_steps[0]['command'])
-        
-        # 设置超时处理
-        self.response_timer = QTimer(self)
-        self.response_timer.setSingleShot(True)
-        self.response_timer.timeout.connect(self._on_response_timeout)
-        self.response_timer.start(100)  # 100毫秒超时
-
-
-
+            }
+        ])
 
     def _on_stop(self):
         """停止电机"""
         if not self._check_serial_connection():
             return
-        
-        # 清理旧的信号连接
-        try:
-            self.serial_controller.data_received.disconnect()
-        except:
-            pass
 
-        # 记录当前步骤
-        self.current_step = 0
-        self.command_steps = [
+        self._run_steps([
             {
-                'command': "10 02 80 00 00 92 10 03",
+                'command': STOP_COMMAND,
                 'handler': self._handle_stop_response,
                 'description': '电机停止'
             },
             {
-                'command': "10 02 21 00 00 33 10 03",
+                'command': STATUS_QUERY,
                 'handler': self._handle_status_response,
                 'description': '读取状态'
             }
-        ]
-        
-        # 连接通用响应处理函数
-        print(f"正在发送: {self.command_steps[0]['description']}")
-        self.serial_controller.data_received.connect(self._universal_response_handler)
-        
-        # 发送第一个命令
-        self.serial_controller.send_command(self.command_steps[0]['command'])
-        
-        # 设置超时处理
-        self.response_timer = QTimer(self)
-        self.response_timer.setSingleShot(True)
-        self.response_timer.timeout.connect(self._on_response_timeout)
-        self.response_timer.start(100)  # 100毫秒超时
-
-
-        # self.serial_controller.send_command(command)
-        
-        # self.serial_controller.data_received.connect(self._universal_response_handler)
-
-
-        # 连接信号处理器用于启动响应
-        # self.serial_controller.data_received.connect(self.handle_stop_response)
-
-        # 发送读取状态命令获取最新状态
-        # self._on_refresh_status()
-
-    # def handle_stop_response(self, data):
-    #     # 确认停止命令成功
-    #     if len(data) >= 4 and data[2] == 0x80:
-    #         # 处理停止成功
-    #         print("电机停止命令已确认")
-    #     # 断开此信号连接
-    #     self.serial_controller.data_received.disconnect(self.handle_stop_response)
-        
-       
+        ])
 
     def _on_start(self):
-        """启动电机 - 问题修复版"""
+        """启动电机: 先设置速度, 再启动, 最后读取状态"""
         if not self._check_serial_connection():
             return
-        
-        # 清理旧的信号连接
-        try:
-            self.serial_controller.data_received.disconnect()
-        except:
-            pass
-        
-        # 记录当前步骤
-        self.current_step = 0
-        self.command_steps = [
+
+        self._run_steps([
             {
                 'command': self.get_send_speed_command(self.speed_input.value()),
                 'handler': self._handle_speed_response,
                 'description': '设置速度'
             },
             {
-                'command': "10 02 81 00 00 93 10 03", 
+                'command': START_COMMAND,
                 'handler': self._handle_start_response,
                 'description': '启动电机'
             },
             {
-                'command': "10 02 21 00 00 33 10 03",
+                'command': STATUS_QUERY,
                 'handler': self._handle_status_response,
                 'description': '读取状态'
             }
-        ]
-        
-        # 连接通用响应处理函数
-        print(f"正在发送: {self.command_steps[0]['description']}")
-        self.serial_controller.data_received.connect(self._universal_response_handler)
-        
-        # 发送第一个命令
-        self.serial_controller.send_command(self.command_steps[0]['command'])
-        
-        # 设置超时处理
-        self.response_timer = QTimer(self)
-        self.response_timer.setSingleShot(True)
-        self.response_timer.timeout.connect(self._on_response_timeout)
-        self.response_timer.start(100)  # 100毫秒超时
-
+        ])
 
     def _on_send_speed(self):
         """发送速度设定值"""
         if not self._check_serial_connection():
             return
-            
-        speed = self.speed_input.value()
-        
-        # 清理旧的信号连接
-        try:
-            self.serial_controller.data_received.disconnect()
-        except:
-            pass
-        
-        # 记录当前步骤
-        self.current_step = 0
-        self.command_steps = [
+
+        self._run_steps([
             {
-                'command': self.get_send_speed_command(speed),
+                'command': self.get_send_speed_command(self.speed_input.value()),
                 'handler': self._handle_speed_response,
                 'description': '设置速度'
             },
             {
-                'command': "10 02 21 00 00 33 10 03",
+                'command': STATUS_QUERY,
                 'handler': self._handle_status_response,
                 'description': '读取状态'
             }
-        ]
-        
-        # 连接通用响应处理函数
-        print(f"正在发送: {self.command_steps[0]['description']}")
-        self.serial_controller.data_received.connect(self._universal_response_handler)
-        
-        # 发送第一个命令
-        self.serial_controller.send_command(self.command_steps[0]['command'])
-        
-        # 设置超时处理
-        self.response_timer = QTimer(self)
-        self.response_timer.setSingleShot(True)
-        self.response_timer.timeout.connect(self._on_response_timeout)
-        self.response_timer.start(100)  # 100毫秒超时
-
+        ])
 
+    def _run_steps(self, steps):
+        """依次执行命令序列, 每一步在上一步的事务结束 (应答或超时) 后发出; 新序列取代未完成的旧序列"""
+        self._sequence += 1
+        self.command_steps = steps
+        self.current_step = 0
+        self._submit_step()
+
+    def _submit_step(self):
+        step = self.command_steps[self.current_step]
+        print(f"正在发送: {step['description']}")
+        sequence = self._sequence
+        self._submit_command(step['command'], callback=lambda txn: self.command_finished.emit((sequence, txn)))
+
+    def _on_command_finished(self, item):
+        """命令序列中一步的事务结束 (界面线程): 处理应答后发送下一步"""
+        sequence, txn = item
+        if sequence != self._sequence:
+            return  # 已被新的命令序列取代
+        step = self.command_steps[self.current_step]
+        if txn.error:
+            print(f"命令 '{step['description']}' 失败: {txn.error}")
+        else:
+            print(f"收到数据: {to_hex(txn.reply)}")
+            step['handler'](StampedFrame(txn.reply, txn.reply_ns))
 
-
-    def _universal_response_handler(self, data):
-        """通用响应处理函数"""
-        print(f"收到数据: {' '.join([f'{b:02X}' for b in data])}")
-        self.serial_data_controller.record_received_data(data)
-
-        if self.current_step < len(self.command_steps):
-            # 调用当前步骤的处理函数
-            self.command_steps[self.current_step]['handler'](data)
-            
-            # 停止当前超时计时器
-            self.response_timer.stop()
-            
-            # 移至下一步
-            self.current_step += 1
-            if self.current_step < len(self.command_steps):
-                # 发送下一个命令
-                print(f"正在发送: {self.command_steps[self.current_step]['description']}")
-                self.serial_controller.send_command(self.command_steps[self.current_step]['command'])
-                
-                # 重启超时计时器
-                self.response_timer.start(1000)
-            else:
-                # 完成所有步骤，断开信号连接
-                self.serial_controller.data_received.disconnect(self._universal_response_handler)
-                print("完成所有命令序列")
-
-    def _on_response_timeout(self):
-        """响应超时处理 - 修复版"""
-        print(f"命令 '{self.command_steps[self.current_step]['description']}' 响应超时")
-        
-        # 移至下一步
         self.current_step += 1
         if self.current_step < len(self.command_steps):
-            # 发送下一个命令
-            print(f"正在发送: {self.command_steps[self.current_step]['description']}")
-            self.serial_controller.send_command(self.command_steps[self.current_step]['command'])
-            
-            # 重启超时计时器
-            self.response_timer.start(1000)
+            self._submit_step()
         else:
-            # 完成所有步骤，断开信号连接
-            self.serial_controller.data_received.disconnect(self._universal_response_handler)
-            print("超时后完成所有命令序列")
-
-   
-
-    def send_next_command(self):
-        """发送队列中的下一个命令"""
-        if not self.command_queue:
-            return  # 队列为空，结束
-            
-        command_info = self.command_queue.pop(0)  # 取出队列首个元素
-        
-        # 断开之前的所有连接
-        try:
-            self.serial_controller.data_received.disconnect()
-        except:
-            pass
-            
-        # 连接新的响应处理函数
-        self.serial_controller.data_received.connect(command_info['handler'])
-        
-        # 打印调试信息
-        print(f"正在发送: {command_info['description']}")
-        
-        # 发送命令
-        self.serial_controller.send_command(command_info['command'])
-        
-        # 设置超时处理
-        self.response_timer = QTimer()
-        self.response_timer.setSingleShot(True)
-        self.response_timer.timeout.connect(self.handle_response_timeout)
-        self.response_timer.start(100)  # 100毫秒超时
-
-    def handle_response_timeout(self):
-        """处理响应超时"""
-        print("命令响应超时，继续下一个")
-        self.send_next_command()  # 继续处理队列中的下一个命令
+            print("完成所有命令序列")
 
     def _handle_version_response(self, data):
         """处理版本信息响应"""
-        if len(data) >= 4 and data[2] == 0x20:
-            software_version_bytes = data[3:-3]  # Excluding header, cmd, checksum and footer
-            software_version_str = ''.join([chr(b) for b in software_version_bytes])
+        if len(data) >= 4 and data[2] == CMD_VERSION:
+            software_version_str = decode_version(data)
             self.version_label.setText(software_version_str)
             print(f"软件版本: {software_version_str}")
 
-        # 停止超时计时器
-        self.response_timer.stop()
-
     # 各个命令的响应处理函数
     def _handle_speed_response(self, data):
         """处理速度设置响应"""
-        if len(data) >= 4 and data[2] == 0x82:
+        if len(data) >= 4 and data[2] == CMD_SET_SPEED:
             print("速度设置成功")
-        
-        # 停止超时计时器
-        self.response_timer.stop()
-        
 
     def _handle_start_response(self, data):
         """处理启动命令响应"""
-        if len(data) >= 4 and data[2] == 0x81:
+        if len(data) >= 4 and data[2] == CMD_START:
             print("电机启动成功")
-        
-        # 停止超时计时器
-        self.response_timer.stop()
-        
 
     def _handle_stop_response(self, data):
-        """处理启动命令响应"""
-        if len(data) >= 4 and data[2] == 0x80:
+        """处理停止命令响应"""
+        if len(data) >= 4 and data[2] == CMD_STOP:
             print("电机停止成功")
-        
-        # 停止超时计时器
-        self.response_timer.stop()
-        
 
     def _handle_status_response(self, data):
         """处理状态查询响应"""
-        if len(data) >= 13 and data[2] == 0x21:
+        if len(data) >= 13 and data[2] == CMD_STATUS:
             self.update_motor_info(data)
             print("状态查询完成")
-        
-        # 停止超时计时器
-        self.response_timer.stop()
-        
-        # 不要尝试断开这个方法 - 它没有被直接连接
-
-
-
-    def get_send_speed_command(self, speed):
-        if (speed < 600 or speed > 3450):
-            raise ValueError("速度值超出范围 (600-3450 RPM)")
-        # 将速度值转为两个字节
-        speed_high = (speed >> 8) & 0xFF
-        speed_low = speed & 0xFF
-        
-        # 发送设置速度命令
-        command = f"10 02 82 {speed_high:02X} {speed_low:02X} {(0x94 + speed_high + speed_low) & 0xFF:02X} 10 03"
-        
-        return command
 
+    def show_sweep_window(self):
+        """打开转速扫描窗口 (首次打开时创建)"""
+        if self.sweep_window is None:
+            from .sweep_widget import SweepWidget
+            self.sweep_window = SweepWidget(self.serial_controller)
+        self.sweep_window.show()
+        self.sweep_window.raise_()
+
+    def _on_auto_refresh_toggled(self, checked):
+        poller = self.serial_controller.status_poller if self.serial_controller else None
+        if poller is None:
+            return
+        if checked:
+            if not self._check_serial_connection():
+                self.auto_refresh_check.setChecked(False)
+                return
+            self._on_poll_rate_changed(self.poll_rate_input.value())
+            poller.start()
+        else:
+            poller.stop()
 
+    def _on_poll_rate_changed(self, rate):
+        if self.serial_controller:
+            self.serial_controller.status_poller.set_rate(min_interval=1.0 / rate)
 
+    def _submit_command(self, command, callback=None):
+        """经事务引擎发送命令, 与自动轮询共用在途槽位, 应答只交给 callback 不会与轮询应答错配"""
+        frame = parse_hex(command)
+        self.serial_controller.transactions.submit(frame, timeout=COMMAND_TIMEOUT, callback=callback)
+        # 启停和设定转速后进入过渡过程, 自动轮询临时提到最快速率
+        if frame[2] in (CMD_START, CMD_STOP, CMD_SET_SPEED):
+            self.serial_controller.status_poller.boost()
 
+    def get_send_speed_command(self, speed):
+        """构造设定转速命令 (十六进制字符串), 超出 600-3450 RPM 时抛出 ValueError"""
+        return to_hex(build_speed_frame(speed))
 
     def _check_serial_connection(self):
         """检查串口连接状态，如果未连接则显示提示"""
-        if not self.serial_controller or not hasattr(self.serial_controller, 'serial_port') or \
-           not self.serial_controller.serial_port or not self.serial_controller.serial_port.is_open:
+        # 掉线重连期间 serial_port 暂时关闭, 但命令仍可进入暂存队列, 视为已连接
+        if not self.serial_controller or not self.serial_controller.running:
             
             # 如果有serial_widget引用，可以直接检查其is_open属性
             if self.serial_widget and hasattr(self.serial_widget, 'is_open') and not self.serial_widget.is_open:
@@ -697,65 +585,46 @@ class MotorWidget(QWidget):
 
                  
     def update_motor_info(self, data):
-        """根据接收到的数据更新电机信息
-        data格式: [0x10, 0x02, 0x21, status, speed_high, speed_low, voltage_high, voltage_low, temp, power_high, power_low, checksum, 0x10, 0x03]
-        """
-        if len(data) >= 13:  # 确保数据长度足够
-            # 提取状态
-            status = data[3]
-            status_text = "未知"
-            if status == 0x00:
-                status_text = "停止"
-                self.set_light_status('red')  # 红灯表示停止
-            elif status == 0x0B:
-                status_text = "运行"
-                self.set_light_status('green')  # 绿灯表示运行
-            elif status in [0x20, 0x21, 0x22, 0x23, 0x24, 0x25, 0x26, 0x27, 0x28, 0x29, 0x2A, 0x2B, 0x50]:
-                # 故障代码映射字典
-                fault_codes = {
-                    0x20: "系统故障",
-                    0x21: "15V电压低",
-                    0x22: "DC过压",
-                    0x23: "DC欠压",
-                    0x24: "缺相",
-                    0x25: "硬件过流",
-                    0x26: "PCB过温",
-                    0x27: "IPM过温",
-                    0x28: "通讯失联",
-                    0x29: "温度传感器故障",
-                    0x2A: "软件过流",
-                    0x2B: "堵转",
-                    0x50: "未知故障"
-                }
-                                
-                status_text = "故障"
-                # 获取具体错误描述
-                if status in fault_codes:
-                    status_text = f"故障: {fault_codes[status]}"
-                else:
-                    status_text = "故障: 未定义错误"
-                
-                
-                self.set_light_status('blue')  # 蓝灯表示故障
-            
-            # 更新系统状态标签
-            self.system_status_label.setText(status_text)
-
-            # 提取转速 (2字节)
-            speed = (data[4] << 8) | data[5]
-            self.motor_speed_label.setText(f"{speed} RPM")
-
-            # 提取电压 (2字节)
-            voltage = ((data[6] << 8) | data[7])
-            self.voltage_label.setText(f"{voltage:.1f} V")
-
-            # 提取温度 (1字节)
-            temp = data[8]
-            self.temperature_label.setText(f"{temp} °C")
-            
-            # 提取功率 (2字节)
-            power = (data[9] << 8) | data[10]
-            self.power_label.setText(f"{power} W")
+        """根据接收到的 0x21 应答帧更新电机信息"""
+        sample = decode_status(data)
+        if sample is not None:
+            self.show_status(dict(sample, ts_ns=timestamp_of(data)))
+
+    def show_status(self, sample):
+        """显示一个遥测样本 (字段见 core.telemetry), 并计入滑动窗口统计"""
+        self.window_stats.add(sample, sample.get('ts_ns') or time.monotonic_ns())
+        status_text, light_color = status_light(sample['status'])
+        self.system_status_label.setText(status_text)
+        self.set_light_status(light_color)
+        self.motor_speed_label.setText(f"{sample['speed']} RPM")
+        self.voltage_label.setText(f"{sample['voltage']:.1f} V")
+        self.temperature_label.setText(f"{sample['temperature']} °C")
+        self.power_label.setText(f"{sample['power']} W")
+
+    # 统计显示格式: 单位, 小数位数
+    STATS_FORMATS = {'speed': ("RPM", 0), 'voltage': ("V", 1), 'temperature': ("°C", 1), 'power': ("W", 1)}
+
+    def _refresh_window_stats(self):
+        """显示所选窗口的统计值 (只读取增量维护的结果, 不遍历历史样本)"""
+        snapshot = self.window_stats.snapshot(self.stats_window_selector.currentData(), time.monotonic_ns())
+        for field, label in self.stats_labels.items():
+            stats = snapshot[field]
+            if stats is None:
+                label.setText("-")
+                continue
+            unit, digits = self.STATS_FORMATS[field]
+            label.setText(f"{stats['min']:.{digits}f}~{stats['max']:.{digits}f} "
+                          f"均值 {stats['mean']:.{digits}f}±{stats['stddev']:.{digits}f} {unit} "
+                          f"变化率 {stats['rate']:+.{digits}f}/s")
+
+    def handle_alarm_event(self, event):
+        """报警触发/清除 (GUI 线程)"""
+        if event['state'] == EVENT_RAISED:
+            self.active_alarms[event['rule']] = event['message']
+        else:
+            self.active_alarms.pop(event['rule'], None)
+        self.alarm_label.setText("报警: " + "; ".join(self.active_alarms.values()))
+        self.alarm_label.setVisible(bool(self.active_alarms))
 
     def set_light_status(self, color):
         """设置灯光状态
@@ -777,23 +646,3 @@ class MotorWidget(QWidget):
             self.light_indicator.setStyleSheet(style_base % ('#1565c0', '#2196f3'))
         else:  # 默认灰色
             self.light_indicator.setStyleSheet(style_base % ('#999', '#f5f5f5'))
-
-    def _debug_connections(self):
-        """打印当前信号连接状态"""
-        # 在 PyQt 中没有直接方法检查信号连接，但可以尝试断开再连接
-        try:
-            self.serial_controller.data_received.disconnect(self._universal_response_handler)
-            print("_universal_response_handler 已连接")
-            # 重新连接
-            self.serial_controller.data_received.connect(self._universal_response_handler)
-        except:
-            print("_universal_response_handler 未连接")
-            
-        for handler_name in ["_handle_speed_response", "_handle_start_response", "_handle_status_response"]:
-            handler = getattr(self, handler_name)
-            try:
-                self.serial_controller.data_received.disconnect(handler)
-                print(f"{handler_name} 已连接")
-                # 不要重新连接，因为我们只是在调试
-            except:
-                print(f"{handler_name} 未连接")
\ No newline at end of file
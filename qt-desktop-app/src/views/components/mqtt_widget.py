@@ -3,7 +3,13 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                            QFrame, QGridLayout)
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QFont
-import paho.mqtt.client as mqtt
+
+
+def _mqtt():
+    """延迟导入 paho-mqtt, 只有真正连接时才加载"""
+    import paho.mqtt.client as mqtt
+    return mqtt
+
 
 class MqttWidget(QWidget):
     message_received = pyqtSignal(str, str)
@@ -225,7 +231,7 @@ class MqttWidget(QWidget):
             port = int(self.port_input.text())
             
             # 创建客户端
-            self.client = mqtt.Client()
+            self.client = _mqtt().Client()
             
             # 设置回调
             self.client.on_connect = self._on_connect
@@ -268,7 +274,7 @@ class MqttWidget(QWidget):
             
         try:
             result = self.client.publish(topic, message)
-            if result.rc == mqtt.MQTT_ERR_SUCCESS:
+            if result.rc == _mqtt().MQTT_ERR_SUCCESS:
                 self.log_message(f"消息已发布到主题: {topic}")
                 self.log_message(f"消息内容: {message}")
             else:
@@ -291,7 +297,7 @@ class MqttWidget(QWidget):
             
         try:
             result = self.client.subscribe(topic, qos)
-            if result[0] == mqtt.MQTT_ERR_SUCCESS:
+            if result[0] == _mqtt().MQTT_ERR_SUCCESS:
                 self.log_message(f"成功订阅主题: {topic} (QoS {qos})")
             else:
                 self.log_message(f"订阅失败，错误码: {result[0]}")
@@ -312,7 +318,7 @@ class MqttWidget(QWidget):
             
         try:
             result = self.client.unsubscribe(topic)
-            if result[0] == mqtt.MQTT_ERR_SUCCESS:
+            if result[0] == _mqtt().MQTT_ERR_SUCCESS:
                 self.log_message(f"已取消订阅主题: {topic}")
             else:
                 self.log_message(f"取消订阅失败，错误码: {result[0]}")
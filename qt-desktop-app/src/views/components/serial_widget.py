@@ -6,13 +6,29 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont
 from PyQt6 import QtGui
 from controllers.serial_data_controller import SerialDataController
-import serial
-import serial.tools.list_ports
-from datetime import datetime
+from controllers.port_watcher import get_port_watcher
+from core.transport import is_network_url
+from core.clock import format_timestamp, timestamp_of
+from core.journal import KIND_RX, KIND_TX, open_session, recover_sessions
+from core.telemetry import get_telemetry_store
+
+
+class JournaledTextEdit(QTextEdit):
+    """显示框: 追加的每一行同时写入会话日志"""
+
+    journal = None
+
+    def append(self, text):
+        super().append(text)
+        if self.journal is not None:
+            self.journal.record_text(text)
+
 
 class SerialWidget(QWidget):
 
     data_received = QtCore.pyqtSignal(str) 
+    # 串口监视线程推送的端口列表 (PortInfo 列表), 经信号转到 GUI 线程
+    ports_changed = QtCore.pyqtSignal(object)
 
     def __init__(self, serial_controller=None, motor_widget=None, control_widget=None, parent_type=None, parent=None):
         super().__init__(parent)
@@ -37,17 +53,30 @@ class SerialWidget(QWidget):
         # 初始化串口对象
         self.serial = None
         self.is_open = False  # 添加状态追踪
+        self.journal = None   # 当前会话日志 (串口打开期间)
 
         self._create_ui()
 
         self.data_received.connect(self.update_display)
         
-        # 初始化可用串口列表
-        self.refresh_ports()
+        # 初始化可用串口列表, 之后由串口监视器推送热插拔变化
+        self.port_watcher = get_port_watcher()
+        self.ports_changed.connect(self.update_port_list)
+        self.port_watcher.add_listener(self.ports_changed.emit)
+        self.update_port_list(self.port_watcher.ports())
+
+        # 恢复上次异常退出时的显示内容和界面状态
+        self.recover_crashed_session()
 
         # 连接串口控制器的信号
         self.serial_controller.data_received.connect(self.handle_data_received)
-        self.serial_controller.command_sent.connect(self.handle_command_sent)  # 连接新信号
+        self.serial_controller.frame_sent.connect(self.handle_command_sent)  # 携带写出时间戳
+        self.serial_controller.connection_changed.connect(self.handle_connection_changed)
+
+        # 定时刷新发送队列状态
+        self.queue_status_timer = QtCore.QTimer(self)
+        self.queue_status_timer.timeout.connect(self.update_queue_status)
+        self.queue_status_timer.start(1000)
 
     def _create_ui(self):
         """创建用户界面 - 左右布局版本"""
@@ -72,6 +101,7 @@ class SerialWidget(QWidget):
         port_label.setFixedWidth(40)
         self.input_port_name = QComboBox()
         self.input_port_name.setEditable(True)
+        self.input_port_name.setToolTip("本地串口, 网络串口 tcp://主机:端口 / rfc2217://主机:端口, 或经工位代理 agent://串口名")
         port_row.addWidget(port_label)
         port_row.addWidget(self.input_port_name)
         port_layout.addLayout(port_row)
@@ -86,6 +116,16 @@ class SerialWidget(QWidget):
         baud_row.addWidget(baud_label)
         baud_row.addWidget(self.input_baud_rate)
         port_layout.addLayout(baud_row)
+
+        # 工位设置 - 工位号绑定到设备唯一标识, 适配器重新插拔后自动找回
+        slot_row = QHBoxLayout()
+        slot_label = QLabel("工位:")
+        slot_label.setFixedWidth(40)
+        self.input_slot = QLineEdit()
+        self.input_slot.setPlaceholderText("可选, 例如 A1")
+        slot_row.addWidget(slot_label)
+        slot_row.addWidget(self.input_slot)
+        port_layout.addLayout(slot_row)
         
         # 控制按钮区域 - 三个按钮从上到下排列
         buttons_layout = QVBoxLayout()
@@ -126,6 +166,23 @@ class SerialWidget(QWidget):
         buttons_layout.addWidget(self.btn_toggle)
         
         port_layout.addLayout(buttons_layout)
+
+        # 发送队列状态 (队列深度 / 截止超时)
+        self.queue_status_label = QLabel("发送队列: -")
+        self.queue_status_label.setStyleSheet("QLabel { color: #666; font-size: 8pt; }")
+        port_layout.addWidget(self.queue_status_label)
+
+        # 链路状态 (掉线自动重连)
+        self.link_status_label = QLabel("链路: -")
+        self.link_status_label.setStyleSheet("QLabel { color: #666; font-size: 8pt; }")
+        port_layout.addWidget(self.link_status_label)
+
+        # 帧时序分析窗口
+        self.btn_timing = QPushButton("时序分析")
+        self.btn_timing.setFixedHeight(30)
+        self.btn_timing.clicked.connect(self.show_timing_window)
+        port_layout.addWidget(self.btn_timing)
+        self.timing_window = None
         port_layout.addStretch()  # 添加弹性空间
         
         # 添加端口设置到左侧面板
@@ -140,7 +197,7 @@ class SerialWidget(QWidget):
         data_layout.setContentsMargins(8, 8, 8, 8)
         
         # 文本显示区
-        self.data_display = QTextEdit()
+        self.data_display = JournaledTextEdit()
         self.data_display.setReadOnly(True)
         self.data_display.setStyleSheet("""
             QTextEdit {
@@ -253,26 +310,56 @@ class SerialWidget(QWidget):
         self.updateToggleButtonStyle()
 
     def refresh_ports(self):
-        """List available serial ports and add them to the combo box"""
+        """请求串口监视器重新完整扫描, 结果通过 ports_changed 推送"""
+        self.port_watcher.rescan()
+
+    def update_port_list(self, ports):
+        """用缓存的端口列表更新下拉框, 尽量保持当前选择"""
+        current = self.input_port_name.currentText()
+        self.input_port_name.blockSignals(True)
         self.input_port_name.clear()  # Clear existing items
-        ports = serial.tools.list_ports.comports()
-        for port in ports:
-            self.input_port_name.addItem(port.device)
-            print(f"Found port: {port.device} - {port.description}")
-        
-        # Select the first port if available
-        if self.input_port_name.count() > 0:
+        for index, info in enumerate(ports):
+            self.input_port_name.addItem(info.device)
+            self.input_port_name.setItemData(
+                index, f"{info.description}\n{info.stable_id}", Qt.ItemDataRole.ToolTipRole)
+        self.input_port_name.blockSignals(False)
+
+        if current and (self.is_open or is_network_url(current) or self.input_port_name.findText(current) >= 0):
+            self.input_port_name.setCurrentText(current)
+        elif self.input_port_name.count() > 0:
+            # Select the first port if available
             self.input_port_name.setCurrentIndex(0)
-        else:
-            print("No serial ports found")
 
+    def resolve_port_name(self):
+        """根据工位绑定确定要打开的设备名; 工位未绑定时绑定到当前选择的设备
+
+        工位已绑定但设备不在线时返回 None, 不会改绑到当前选择的设备。
+        """
+        port = self.input_port_name.currentText()
+        slot = self.input_slot.text().strip()
+        if not slot:
+            return port
+        device = self.port_watcher.resolve_slot(slot)
+        if device:
+            if device != port:
+                self.data_display.append(f"工位 {slot} 对应设备: {device}")
+            return device
+        if slot in self.port_watcher.slots:
+            self.data_display.append(f"工位设备不在线: {slot}")
+            return None
+        stable_id = self.port_watcher.bind_slot(slot, port)
+        self.data_display.append(f"工位 {slot} 已绑定到 {stable_id}")
+        return port
 
     def toggle_serial(self):
         """切换串口开启/关闭状态"""
         if not self.is_open:
             try:
-                # 获取当前选择的串口和波特率
-                port = self.input_port_name.currentText()
+                # 获取当前选择的串口 (或工位绑定的设备) 和波特率
+                port = self.resolve_port_name()
+                if port is None:
+                    self.btn_clear.setEnabled(True)  # 有数据时启用清空按钮
+                    return
                 baud_rate = int(self.input_baud_rate.currentText())
                 
                 # 打开串口通信
@@ -285,6 +372,8 @@ class SerialWidget(QWidget):
                     self.updateToggleButtonStyle()  # 更新按钮样式
                     self.input_port_name.setEnabled(False)
                     self.input_baud_rate.setEnabled(False)
+                    self.input_slot.setEnabled(False)
+                    self._open_journal(port, baud_rate)
 
                     # 在显示框中添加状态信息
                     self.data_display.append(f"串口已打开: {port}, {baud_rate}波特率")
@@ -310,10 +399,12 @@ class SerialWidget(QWidget):
                 self.updateToggleButtonStyle()  # 更新按钮样式
                 self.input_port_name.setEnabled(True)
                 self.input_baud_rate.setEnabled(True)
+                self.input_slot.setEnabled(True)
                 
                 # 在显示框中添加状态信息
                 self.data_display.append("串口已关闭")
                 self.btn_clear.setEnabled(True)  # 有数据时启用清空按钮
+                self._close_journal()
                 
             except Exception as e:
                 self.data_display.append(f"关闭串口失败: {str(e)}")
@@ -324,9 +415,80 @@ class SerialWidget(QWidget):
         if self.control_widget and hasattr(self.control_widget, 'update_lights_clickable_state'):
             self.control_widget.update_lights_clickable_state()
 
+    def _open_journal(self, port, baud_rate):
+        """为本次串口会话新建日志: 显示文本、收发帧、每秒遥测汇总和界面状态"""
+        slot = self.input_slot.text().strip()
+        try:
+            self.journal = open_session(slot or port, {'parent_type': self.parent_type, 'port': port,
+                                                       'baud_rate': baud_rate, 'slot': slot})
+        except OSError as e:
+            print(f"创建会话日志失败: {e}")
+            return
+        self.journal.attach(get_telemetry_store(), port)
+        self.data_display.journal = self.journal
+
+    def _close_journal(self):
+        if self.journal is not None:
+            self.data_display.journal = None
+            self.journal.close()
+            self.journal = None
+
+    def recover_crashed_session(self):
+        """查找本类面板异常退出的会话, 恢复最近一次的显示内容和串口/波特率/工位选择"""
+        sessions = [session for _, session in recover_sessions(
+            lambda session: session['state'].get('parent_type') == self.parent_type)]
+        if not sessions:
+            return
+        recovered = max(sessions, key=lambda session: session['started_ns'])
+        state = recovered['state']
+        for line in recovered['text']:
+            self.data_display.append(line)
+        self.input_port_name.setCurrentText(state.get('port', ''))
+        self.input_baud_rate.setCurrentText(str(state.get('baud_rate', '')))
+        self.input_slot.setText(state.get('slot', ''))
+        self.data_display.append(
+            f"\n[系统] 已恢复上次异常退出的会话 ({recovered['station']}: 文本 {len(recovered['text'])} 行, "
+            f"帧 {recovered['frames']} 条, 遥测汇总 {len(recovered['rollups'])} 条)")
+        self.btn_clear.setEnabled(True)
+        self.btn_save.setEnabled(True)
+        self.btn_copy.setEnabled(True)
+
+    def show_timing_window(self):
+        """打开帧时序分析窗口"""
+        if self.timing_window is None:
+            from .timing_widget import TimingWidget
+            self.timing_window = TimingWidget(self.serial_controller.timing_analyzer)
+        self.timing_window.show()
+        self.timing_window.raise_()
+
+    def update_queue_status(self):
+        """显示发送队列深度和截止超时次数"""
+        stats = self.serial_controller.write_stats() if self.serial_controller else None
+        if not stats:
+            self.queue_status_label.setText("发送队列: -")
+            self.link_status_label.setText("链路: -")
+            return
+        self.queue_status_label.setText(
+            f"发送队列: {stats['depth']} (峰值 {stats['max_depth']})  超时: {stats['deadline_misses']}  合并: {stats['coalesced']}")
+        state = "在线" if stats['connected'] else f"重连中 (暂存 {stats['pending']})"
+        self.link_status_label.setText(
+            f"链路: {state}  掉线: {stats['disconnects']}  重连: {stats['reconnects']}  丢弃: {stats['dropped_offline']}")
+
+    def handle_connection_changed(self, connected):
+        """设备掉线/重连时提示, 串口保持打开状态, 无需手动重新打开"""
+        if connected:
+            self.data_display.append("串口已自动重新连接, 暂存的命令已补发")
+            self.link_status_label.setStyleSheet("QLabel { color: #666; font-size: 8pt; }")
+        else:
+            self.data_display.append("串口连接断开, 正在自动重连...")
+            self.link_status_label.setStyleSheet("QLabel { color: #F44336; font-size: 8pt; }")
+        self.update_queue_status()
+
     def clear_display(self):
         """清空显示框内容"""
         self.data_display.clear()
+        if self.journal is not None:
+            self.journal.record_state(display_cleared=True)
         self.btn_clear.setEnabled(False)  # 清空后禁用按钮
         self.btn_save.setEnabled(False)   # 清空后禁用按钮
         self.btn_copy.setEnabled(False)   # 清空后禁用按钮
@@ -340,6 +502,8 @@ class SerialWidget(QWidget):
         self.btn_copy.setEnabled(True)   # 有新数据时启用复制按钮
 
     def handle_data_received(self, data):
+        if self.journal is not None:
+            self.journal.record_frame(KIND_RX, data, timestamp_of(data))
         if self.parent_type == "control":
             self.serial_data_controller.control_serial_data_handle(data)
         elif self.parent_type == "motor":
@@ -347,8 +511,10 @@ class SerialWidget(QWidget):
 
     def handle_command_sent(self, command):
         """处理发送的命令"""
+        if self.journal is not None:
+            self.journal.record_frame(KIND_TX, command, timestamp_of(command))
         # 格式化并显示命令
-        display_text = self.format_command(command)
+        display_text = self.format_command(command, timestamp_of(command))
         self.update_display(display_text)
 
 
@@ -357,8 +523,8 @@ class SerialWidget(QWidget):
     def record_received_data(self, data):
         """记录接收到的数据"""
         try:
-            # 获取当前时间戳
-            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+            # 使用读线程在 read() 时记录的时间戳
+            timestamp = format_timestamp(timestamp_of(data))
             
             # 转换数据为十六进制
             hex_data = ' '.join([f"{byte:02X}" for byte in data])
@@ -371,11 +537,10 @@ class SerialWidget(QWidget):
 
 
 
-    def format_command(self, command):
-        """将命令格式化为易读形式"""
+    def format_command(self, command, ts_ns=None):
+        """将命令格式化为易读形式, ts_ns 为写出时的单调时钟时间戳"""
 
-        # 获取当前时间戳
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        timestamp = format_timestamp(ts_ns)
 
         try:
             
@@ -0,0 +1,181 @@
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QLineEdit,
+                             QPushButton, QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog,
+                             QSpinBox, QDoubleSpinBox, QCheckBox, QMessageBox)
+from PyQt6.QtCore import pyqtSignal
+
+from core.codec import SPEED_MAX, SPEED_MIN
+from core.sweep import SpeedSweep, ramp_profile, step_profile
+
+
+class SweepWidget(QWidget):
+    """转速扫描窗口 - 按阶跃/斜坡曲线依次设定转速, 统计每个设定点的动态特性"""
+
+    COLUMNS = ["设定(RPM)", "样本数", "采样率(Hz)", "调节时间(ms)", "超调(%)", "稳态误差(RPM)",
+               "功率", "电压", "故障"]
+
+    # 扫描线程 -> 界面线程
+    progress = pyqtSignal(int, int, dict)
+    finished = pyqtSignal()
+
+    def __init__(self, serial_controller, parent=None):
+        super().__init__(parent)
+        self.serial_controller = serial_controller
+        self.sweep = None
+        self.setWindowTitle("转速扫描")
+        self.resize(820, 460)
+
+        layout = QVBoxLayout(self)
+
+        # 曲线设置
+        profile_row = QHBoxLayout()
+        self.mode_selector = QComboBox()
+        self.mode_selector.addItem("斜坡", "ramp")
+        self.mode_selector.addItem("阶跃", "step")
+        self.mode_selector.currentIndexChanged.connect(self._on_mode_changed)
+        profile_row.addWidget(self.mode_selector)
+        profile_row.addWidget(QLabel("起始:"))
+        self.start_input = self._speed_spinbox(SPEED_MIN)
+        profile_row.addWidget(self.start_input)
+        profile_row.addWidget(QLabel("终止:"))
+        self.stop_input = self._speed_spinbox(SPEED_MAX)
+        profile_row.addWidget(self.stop_input)
+        profile_row.addWidget(QLabel("步长:"))
+        self.step_input = QSpinBox()
+        self.step_input.setRange(10, SPEED_MAX - SPEED_MIN)
+        self.step_input.setValue(500)
+        profile_row.addWidget(self.step_input)
+        self.return_check = QCheckBox("往返")
+        profile_row.addWidget(self.return_check)
+        self.speeds_input = QLineEdit("600, 1500, 3000, 1500")
+        self.speeds_input.setPlaceholderText("设定点, 逗号分隔")
+        self.speeds_input.setVisible(False)
+        profile_row.addWidget(self.speeds_input, 1)
+        profile_row.addWidget(QLabel("停留(s):"))
+        self.dwell_input = QDoubleSpinBox()
+        self.dwell_input.setRange(0.1, 600)
+        self.dwell_input.setValue(3.0)
+        profile_row.addWidget(self.dwell_input)
+        profile_row.addStretch()
+        layout.addLayout(profile_row)
+
+        # 结果表
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+
+        # 底部按钮
+        buttons_row = QHBoxLayout()
+        self.status_label = QLabel("就绪")
+        buttons_row.addWidget(self.status_label)
+        buttons_row.addStretch()
+        self.btn_start = QPushButton("开始扫描")
+        self.btn_start.clicked.connect(self._on_start)
+        buttons_row.addWidget(self.btn_start)
+        self.btn_cancel = QPushButton("停止")
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self._on_cancel)
+        buttons_row.addWidget(self.btn_cancel)
+        self.btn_export = QPushButton("导出")
+        self.btn_export.clicked.connect(self._on_export)
+        buttons_row.addWidget(self.btn_export)
+        layout.addLayout(buttons_row)
+
+        self.progress.connect(self._on_progress)
+        self.finished.connect(self._on_finished)
+
+    def _speed_spinbox(self, value):
+        spinbox = QSpinBox()
+        spinbox.setRange(SPEED_MIN, SPEED_MAX)
+        spinbox.setValue(value)
+        return spinbox
+
+    def _on_mode_changed(self):
+        ramp = self.mode_selector.currentData() == "ramp"
+        for widget in (self.start_input, self.stop_input, self.step_input, self.return_check):
+            widget.setVisible(ramp)
+        self.speeds_input.setVisible(not ramp)
+
+    def _build_profile(self):
+        dwell = self.dwell_input.value()
+        if self.mode_selector.currentData() == "ramp":
+            return ramp_profile(self.start_input.value(), self.stop_input.value(), self.step_input.value(),
+                                dwell, self.return_check.isChecked())
+        speeds = [int(text) for text in self.speeds_input.text().replace('，', ',').split(',') if text.strip()]
+        return step_profile(speeds, dwell)
+
+    def _on_start(self):
+        if not self.serial_controller or not self.serial_controller.running:
+            QMessageBox.warning(self, "串口未连接", "请先连接串口后再进行操作。")
+            return
+        try:
+            profile = self._build_profile()
+            self.sweep = SpeedSweep(self.serial_controller.transactions, profile,
+                                    telemetry=self.serial_controller.telemetry,
+                                    source=self.serial_controller.port_name,
+                                    on_progress=self.progress.emit,
+                                    on_finished=lambda results: self.finished.emit())
+        except ValueError as e:
+            QMessageBox.warning(self, "扫描设置错误", str(e))
+            return
+        self.table.setRowCount(0)
+        self.btn_start.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.status_label.setText(f"扫描中 0/{len(profile)}")
+        self.sweep.start()
+
+    def _on_cancel(self):
+        if self.sweep:
+            self.sweep.cancel()
+            self.status_label.setText("正在停止...")
+
+    def _on_progress(self, index, total, result):
+        self.status_label.setText(f"扫描中 {index}/{total}")
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        values = [
+            str(result['setpoint']),
+            str(result['samples']),
+            self._format(result.get('sample_rate_hz')),
+            self._format(result.get('settling_time_ms')),
+            self._format(result.get('overshoot_pct')),
+            self._format(result.get('steady_state_error_rpm')),
+            self._format(result.get('mean_power')),
+            self._format(result.get('mean_voltage')),
+            ' '.join(f"0x{code:02X}" for code in result.get('faults', [])),
+        ]
+        for col, value in enumerate(values):
+            self.table.setItem(row, col, QTableWidgetItem(value))
+
+    @staticmethod
+    def _format(value):
+        return "-" if value is None else f"{value}"
+
+    def _on_finished(self):
+        self.btn_start.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+        if self.sweep and self.sweep.error:
+            self.status_label.setText(f"扫描中止: {self.sweep.error}")
+        else:
+            self.status_label.setText(f"扫描完成, 共 {len(self.sweep.results)} 个设定点")
+
+    def _on_export(self):
+        if not self.sweep or not self.sweep.results:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出扫描结果", "", "JSON 文件 (*.json);;CSV 文件 (*.csv)",
+            options=QFileDialog.Option.DontUseNativeDialog)
+        if not file_path:
+            return
+        if file_path.endswith('.csv'):
+            self.sweep.export_csv(file_path)
+        else:
+            if not file_path.endswith('.json'):
+                file_path += '.json'
+            self.sweep.export_json(file_path)
+
+    def closeEvent(self, event):
+        if self.sweep and self.sweep.is_running:
+            self.sweep.cancel()
+        super().closeEvent(event)
@@ -0,0 +1,116 @@
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QLineEdit,
+                             QPushButton, QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog,
+                             QDoubleSpinBox)
+from PyQt6.QtCore import QTimer
+
+from controllers.timing_analyzer import KIND_INTERVAL, KIND_LATENCY
+
+
+class TimingWidget(QWidget):
+    """帧时序分析窗口 - 实时显示各 CMD 的帧间隔与应答延迟统计"""
+
+    COLUMNS = ["CMD", "方向", "类型", "次数", "最小(ms)", "平均(ms)", "p50(ms)", "p99(ms)", "最大(ms)", "异常"]
+    KIND_NAMES = {KIND_INTERVAL: "帧间隔", KIND_LATENCY: "应答延迟"}
+
+    def __init__(self, analyzer, parent=None):
+        super().__init__(parent)
+        self.analyzer = analyzer
+        self.setWindowTitle("帧时序分析")
+        self.resize(760, 420)
+
+        layout = QVBoxLayout(self)
+
+        # 门限设置
+        limit_row = QHBoxLayout()
+        limit_row.addWidget(QLabel("CMD:"))
+        self.cmd_input = QLineEdit("21")
+        self.cmd_input.setFixedWidth(50)
+        limit_row.addWidget(self.cmd_input)
+        self.kind_selector = QComboBox()
+        self.kind_selector.addItem("帧间隔", KIND_INTERVAL)
+        self.kind_selector.addItem("应答延迟", KIND_LATENCY)
+        limit_row.addWidget(self.kind_selector)
+        self.direction_selector = QComboBox()
+        self.direction_selector.addItems(["rx", "tx"])
+        limit_row.addWidget(self.direction_selector)
+        limit_row.addWidget(QLabel("下限(ms):"))
+        self.min_input = QDoubleSpinBox()
+        self.min_input.setRange(0, 100000)
+        limit_row.addWidget(self.min_input)
+        limit_row.addWidget(QLabel("上限(ms):"))
+        self.max_input = QDoubleSpinBox()
+        self.max_input.setRange(0, 100000)
+        self.max_input.setValue(60)
+        limit_row.addWidget(self.max_input)
+        self.btn_set_limit = QPushButton("设置门限")
+        self.btn_set_limit.clicked.connect(self._on_set_limit)
+        limit_row.addWidget(self.btn_set_limit)
+        limit_row.addStretch()
+        layout.addLayout(limit_row)
+
+        # 统计表
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+
+        # 底部按钮
+        buttons_row = QHBoxLayout()
+        self.outlier_label = QLabel("异常点: 0")
+        buttons_row.addWidget(self.outlier_label)
+        buttons_row.addStretch()
+        self.btn_reset = QPushButton("清空统计")
+        self.btn_reset.clicked.connect(self.analyzer.reset)
+        buttons_row.addWidget(self.btn_reset)
+        self.btn_export = QPushButton("导出")
+        self.btn_export.clicked.connect(self._on_export)
+        buttons_row.addWidget(self.btn_export)
+        layout.addLayout(buttons_row)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(500)
+
+    def _on_set_limit(self):
+        try:
+            cmd = int(self.cmd_input.text(), 16)
+        except ValueError:
+            return
+        min_ms = self.min_input.value() or None
+        max_ms = self.max_input.value() or None
+        self.analyzer.set_limit(cmd, self.kind_selector.currentData(), min_ms, max_ms,
+                                direction=self.direction_selector.currentText())
+
+    def refresh(self):
+        rows = self.analyzer.snapshot()
+        self.table.setRowCount(len(rows))
+        for row_index, row in enumerate(rows):
+            values = [
+                f"0x{row['cmd']:02X}",
+                row['direction'],
+                self.KIND_NAMES.get(row['kind'], row['kind']),
+                str(row['count']),
+                f"{row['min_ms']:.2f}",
+                f"{row['mean_ms']:.2f}",
+                f"{row['p50_ms']:.2f}",
+                f"{row['p99_ms']:.2f}",
+                f"{row['max_ms']:.2f}",
+                str(row['outliers']),
+            ]
+            for col, value in enumerate(values):
+                self.table.setItem(row_index, col, QTableWidgetItem(value))
+        self.outlier_label.setText(f"异常点: {len(self.analyzer.outliers)}")
+
+    def _on_export(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出时序统计", "", "JSON 文件 (*.json);;CSV 文件 (*.csv)",
+            options=QFileDialog.Option.DontUseNativeDialog)
+        if not file_path:
+            return
+        if file_path.endswith('.csv'):
+            self.analyzer.export_csv(file_path)
+        else:
+            if not file_path.endswith('.json'):
+                file_path += '.json'
+            self.analyzer.export_json(file_path)
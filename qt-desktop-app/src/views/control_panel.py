@@ -13,7 +13,7 @@ class ControlPanel(BasePanel):
 
         
         # 创建串口处理对象
-        self.serial_controller = SerialController()
+        self.serial_controller = SerialController(consumer_name="控制板模拟器", exclusive_writer=True)
         
         # 先创建控制组件
         self.control_widget = ControlWidget(serial_controller=self.serial_controller)
@@ -1,12 +1,93 @@
 from PyQt6.QtWidgets import (QMainWindow, QPushButton, QVBoxLayout, 
-                           QWidget, QLabel, QGridLayout, QSizePolicy)
+                           QWidget, QLabel, QGridLayout, QSizePolicy, QStackedWidget)
 from PyQt6.QtGui import QFont, QPixmap, QPalette, QBrush, QIcon, QPainter, QColor, QImage
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QTimer
+import collections
+import importlib
 import os
+import threading
+
+# 各面板模块 (及其依赖的 pyserial / paho-mqtt) 在操作员选择时才导入
+PANEL_MODULES = {
+    'control': ('views.control_panel', 'ControlPanel'),
+    'motor': ('views.motor_panel', 'MotorPanel'),
+    'net': ('views.net_panel', 'NetPanel'),
+    'station': ('views.station_panel', 'StationPanel'),
+}
+
+# 首帧绘制后在后台预先导入的常用面板
+PREWARM_PANELS = ('control', 'motor')
+
+
+def load_panel_class(key):
+    """导入并返回面板类"""
+    module_name, class_name = PANEL_MODULES[key]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def prewarm_panels(keys=PREWARM_PANELS):
+    """在后台线程中预先导入面板模块 (只导入, 不创建控件)"""
+    def _import_all():
+        for key in keys:
+            try:
+                importlib.import_module(PANEL_MODULES[key][0])
+            except Exception as e:
+                print(f"预加载面板 {key} 失败: {e}")
+    threading.Thread(target=_import_all, name="panel-prewarm", daemon=True).start()
+
+# 背景缓存: 合成后的原图只生成一次, 缩放结果按尺寸档位缓存
+BACKGROUND_BUCKET_PX = 64
+BACKGROUND_CACHE_SIZE = 8
+BACKGROUND_RESIZE_DEBOUNCE_MS = 80
+_background_base = None          # None: 尚未加载; False: 图片不存在
+_background_scaled = collections.OrderedDict()
+
+
+def _composited_background():
+    """加载背景图并叠加半透明白色蒙版, 结果在进程内缓存"""
+    global _background_base
+    if _background_base is None:
+        _background_base = False
+        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        image_path = os.path.join(base_path, "resources", "industrial_background.png")
+        if os.path.exists(image_path):
+            # 创建一个 QImage 来调整透明度
+            image = QImage(image_path)
+            if not image.isNull():
+                image = image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+                # 使用 QPainter 在 QImage 上绘制半透明白色矩形来降低整体亮度
+                painter = QPainter(image)
+                painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+                # 使用白色半透明蒙版来减低透明度 - 调整最后的数字(0-255)来控制透明度
+                # 数字越大，背景越淡
+                painter.fillRect(image.rect(), QColor(255, 255, 255, 150))
+                painter.end()
+                _background_base = QPixmap.fromImage(image)
+    return _background_base or None
+
+
+def _size_bucket(size):
+    """将窗口尺寸向上取整到档位, 相近尺寸共用同一缩放结果"""
+    width = -(-max(size.width(), 1) // BACKGROUND_BUCKET_PX) * BACKGROUND_BUCKET_PX
+    height = -(-max(size.height(), 1) // BACKGROUND_BUCKET_PX) * BACKGROUND_BUCKET_PX
+    return width, height
+
+
+def _scaled_background(bucket):
+    """返回覆盖指定档位尺寸的背景图 (LRU 缓存)"""
+    pixmap = _background_scaled.get(bucket)
+    if pixmap is not None:
+        _background_scaled.move_to_end(bucket)
+        return pixmap
+    pixmap = _composited_background().scaled(
+        bucket[0], bucket[1],
+        Qt.AspectRatioMode.KeepAspectRatioByExpanding,
+        Qt.TransformationMode.SmoothTransformation)
+    _background_scaled[bucket] = pixmap
+    if len(_background_scaled) > BACKGROUND_CACHE_SIZE:
+        _background_scaled.popitem(last=False)
+    return pixmap
 
-from .control_panel import ControlPanel
-from .motor_panel import MotorPanel
-from .net_panel import NetPanel
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -19,11 +100,22 @@ class MainWindow(QMainWindow):
         # 设置窗口图标
         self.set_window_icon()
         
-        # 创建中央部件
+        # 长期存在的应用外壳: 主界面和各面板放在同一个堆叠部件中切换,
+        # 面板 (及其打开的串口) 在切换时保持存活
+        self.stack = QStackedWidget()
+        self.setCentralWidget(self.stack)
+        self.panels = {}  # key -> 面板实例 (首次进入时创建)
+
+        # 主界面页面
         self.central_widget = QWidget()
-        self.setCentralWidget(self.central_widget)
+        self.stack.addWidget(self.central_widget)
         
-        # 设置背景图片
+        # 设置背景图片; 拖动改变大小时去抖, 停止拖动后再按新尺寸更新
+        self._background_bucket = None
+        self._background_timer = QTimer(self)
+        self._background_timer.setSingleShot(True)
+        self._background_timer.setInterval(BACKGROUND_RESIZE_DEBOUNCE_MS)
+        self._background_timer.timeout.connect(self.set_background_image)
         self.set_background_image()
         
         # 创建垂直布局
@@ -37,22 +129,24 @@ class MainWindow(QMainWindow):
         button_layout.setSpacing(20)  # 按钮之间的间距
         button_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)  # 垂直居中
         
-        # 添加三个按钮到按钮容器
+        # 添加按钮到按钮容器
         self.create_button("控制板测试", self.open_control_panel, button_layout)
         self.create_button("电机板测试", self.open_motor_panel, button_layout)
         self.create_button("网络联调", self.open_net_panel, button_layout)
+        self.create_button("多工位测试", self.open_station_panel, button_layout)
         
         # 将按钮容器添加到主布局
         self.layout.addWidget(button_container, 1, Qt.AlignmentFlag.AlignCenter)
         
     def set_background_image(self):
-        """设置窗口背景图片，并调整透明度"""
-        # 获取资源路径
-        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        image_path = os.path.join(base_path, "resources", "industrial_background.png")
-        
+        """设置窗口背景图片，并调整透明度
+
+        合成后的背景只在进程内生成一次, 按尺寸档位缓存缩放结果。
+        """
+        base_pixmap = _composited_background()
+
         # 如果图片不存在，使用默认样式
-        if not os.path.exists(image_path):
+        if base_pixmap is None:
             self.setStyleSheet("""
                 QMainWindow {
                     background-color: qlineargradient(
@@ -61,35 +155,25 @@ class MainWindow(QMainWindow):
                     );
                 }
             """)
-        else:
-            # 创建 QPixmap 对象并加载图像
-            pixmap = QPixmap(image_path)
-            if not pixmap.isNull():
-                # 创建一个 QImage 来调整透明度
-                image = pixmap.toImage()
-                # 使用 QPainter 在 QImage 上绘制半透明白色矩形来降低整体亮度
-                painter = QPainter(image)
-                painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
-                # 使用白色半透明蒙版来减低透明度 - 调整最后的数字(0-255)来控制透明度
-                # 数字越大，背景越淡
-                painter.fillRect(image.rect(), QColor(255, 255, 255, 150))  # 透明度值：120/255
-                painter.end()
-                
-                # 将修改后的图像设置回 pixmap
-                modified_pixmap = QPixmap.fromImage(image)
-                
-                # 创建一个背景 brush
-                brush = QBrush(modified_pixmap)
-                # 创建一个自定义调色板
-                palette = self.palette()
-                # 设置背景
-                palette.setBrush(QPalette.ColorRole.Window, brush)
-                # 应用调色板
-                self.setPalette(palette)
-                
-                # 确保背景图可见
-                self.setAutoFillBackground(True)
-        
+            return
+
+        bucket = _size_bucket(self.size())
+        if bucket == self._background_bucket:
+            return
+        self._background_bucket = bucket
+
+        # 创建一个背景 brush
+        brush = QBrush(_scaled_background(bucket))
+        # 创建一个自定义调色板
+        palette = self.palette()
+        # 设置背景
+        palette.setBrush(QPalette.ColorRole.Window, brush)
+        # 应用调色板
+        self.setPalette(palette)
+
+        # 确保背景图可见
+        self.setAutoFillBackground(True)
+
     def create_button(self, text, callback, parent_layout):
         """创建适中矩形按钮"""
         button = QPushButton(text)
@@ -126,25 +210,56 @@ class MainWindow(QMainWindow):
         
         return button
 
+    def open_panel(self, key):
+        """切换到指定面板, 首次进入时才导入并创建"""
+        panel = self.panels.get(key)
+        if panel is None:
+            panel = load_panel_class(key)()
+            panel.back_requested.connect(self.show_home)
+            panel.release_requested.connect(lambda key=key: self.release_panel(key))
+            self.stack.addWidget(panel)
+            self.panels[key] = panel
+        self.stack.setCurrentWidget(panel)
+        self.setWindowTitle(f"1HP测试软件 - {panel.title}")
+        return panel
+
+    def show_home(self):
+        """返回主界面, 面板保持后台运行"""
+        self.stack.setCurrentWidget(self.central_widget)
+        self.setWindowTitle("1HP测试软件")
+
+    def release_panel(self, key):
+        """按操作员要求释放面板: 关闭串口等资源并销毁面板"""
+        panel = self.panels.pop(key, None)
+        if panel is None:
+            return
+        self.show_home()
+        panel.cleanup()
+        self.stack.removeWidget(panel)
+        panel.deleteLater()
+
     def open_control_panel(self):
-        self.control_panel = ControlPanel()
-        self.control_panel.show()
-        self.close()
-        
+        self.open_panel('control')
+
     def open_motor_panel(self):
-        self.motor_panel = MotorPanel()
-        self.motor_panel.show()
-        self.close()
-        
+        self.open_panel('motor')
+
     def open_net_panel(self):
-        self.net_panel = NetPanel()
-        self.net_panel.show()
-        self.close()
-        
+        self.open_panel('net')
+
+    def open_station_panel(self):
+        self.open_panel('station')
+
+    def closeEvent(self, event):
+        """退出程序时释放所有面板资源"""
+        for key in list(self.panels):
+            self.release_panel(key)
+        super().closeEvent(event)
+
     def resizeEvent(self, event):
-        """窗口大小改变时，更新背景图片"""
+        """窗口大小改变时，延迟更新背景图片 (拖动过程中不重复缩放)"""
         super().resizeEvent(event)
-        self.set_background_image()
+        self._background_timer.start()
         
     def set_window_icon(self):
         """设置窗口图标"""
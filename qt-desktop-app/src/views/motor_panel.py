@@ -14,7 +14,7 @@ class MotorPanel(BasePanel):
         super().__init__("电机板测试")
 
         # 创建串口处理对象
-        self.serial_controller = SerialController()
+        self.serial_controller = SerialController(consumer_name="电机板测试", exclusive_writer=True)
 
         # 创建电机组件，传入串口控制器和串口组件
         self.motor_widget = MotorWidget(serial_controller=self.serial_controller)
@@ -0,0 +1,117 @@
+from PyQt6.QtWidgets import (QHBoxLayout, QLineEdit, QPushButton,
+                             QTableWidget, QTableWidgetItem, QLabel, QHeaderView)
+from PyQt6.QtCore import QTimer
+
+from .base_panel import BasePanel
+from core.alarms import get_alarm_engine
+from core.codec import CMD_STOP, build_frame, status_light
+from controllers.station_workers import StationSupervisor
+
+
+class StationPanel(BasePanel):
+    """多工位面板 - 串口分片到多个工作进程运行"""
+
+    COLUMNS = ["端口", "进程", "连接", "状态", "转速", "电压", "温度", "功率", "接收帧", "错误", "报警"]
+
+    def __init__(self):
+        super().__init__("多工位测试")
+
+        self.supervisor = StationSupervisor()  # 添加第一个工位时才启动工作进程
+        self.alarms = get_alarm_engine()
+        self._stop_frame = build_frame(CMD_STOP)
+        self._stop_funcs = {}  # 端口名 -> 本面板注册的停机函数
+
+        # 端口增删
+        port_bar = QHBoxLayout()
+        self.port_input = QLineEdit()
+        self.port_input.setPlaceholderText("串口名称, 例如 /dev/ttyUSB0 或 COM3")
+        self.btn_add = QPushButton("添加工位")
+        self.btn_remove = QPushButton("移除工位")
+        self.btn_add.clicked.connect(self._on_add_port)
+        self.btn_remove.clicked.connect(self._on_remove_port)
+        port_bar.addWidget(self.port_input)
+        port_bar.addWidget(self.btn_add)
+        port_bar.addWidget(self.btn_remove)
+        self.btn_inventory = QPushButton("固件盘点")
+        self.btn_inventory.clicked.connect(self.show_inventory_window)
+        port_bar.addWidget(self.btn_inventory)
+        self.layout.addLayout(port_bar)
+        self.inventory_window = None
+
+        # 工位状态表
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.layout.addWidget(self.table)
+
+        self.summary_label = QLabel()
+        self.layout.addWidget(self.summary_label)
+
+        # 按快照频率刷新显示
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_table)
+        self.refresh_timer.start(int(self.supervisor.snapshot_interval * 1000))
+
+    def _on_add_port(self):
+        port_name = self.port_input.text().strip()
+        if port_name:
+            self.supervisor.add_port(port_name)
+            if port_name not in self._stop_funcs:
+                self._stop_funcs[port_name] = lambda: self.supervisor.send(port_name, self._stop_frame)
+                self.alarms.register_stop(port_name, self._stop_funcs[port_name])
+            self.port_input.clear()
+
+    def _on_remove_port(self):
+        port_name = self.port_input.text().strip()
+        if not port_name and self.table.currentRow() >= 0:
+            port_name = self.table.item(self.table.currentRow(), 0).text()
+        if port_name:
+            self.supervisor.remove_port(port_name)
+            stop_func = self._stop_funcs.pop(port_name, None)
+            if stop_func is not None:
+                self.alarms.unregister_stop(port_name, stop_func)
+            self.port_input.clear()
+
+    def show_inventory_window(self):
+        """打开固件盘点窗口并盘点一次 (工作进程占用的串口跳过)"""
+        from .components.inventory_widget import InventoryWidget
+        if self.inventory_window is None:
+            self.inventory_window = InventoryWidget(self.supervisor.port_names)
+        self.inventory_window.show()
+        self.inventory_window.raise_()
+        self.inventory_window.start_sweep()
+
+    def refresh_table(self):
+        snapshots = self.supervisor.poll_snapshots()
+        # 所有工位的最新快照一次性批量评估报警规则
+        self.alarms.evaluate_batch({name: state for name, state in snapshots.items() if state['connected']})
+        self.table.setRowCount(len(snapshots))
+        for row, port_name in enumerate(sorted(snapshots)):
+            state = snapshots[port_name]
+            status_text = status_light(state['status'])[0] if state['status'] is not None else "-"
+            values = [
+                port_name,
+                str(state['worker']),
+                "是" if state['connected'] else "否",
+                status_text,
+                f"{state['speed']} RPM" if state['speed'] is not None else "-",
+                f"{state['voltage']} V" if state['voltage'] is not None else "-",
+                f"{state['temperature']} °C" if state['temperature'] is not None else "-",
+                f"{state['power']} W" if state['power'] is not None else "-",
+                str(state['rx_frames']),
+                str(state['errors']),
+                ", ".join(event['rule'] for event in self.alarms.active(port_name)),
+            ]
+            for col, value in enumerate(values):
+                self.table.setItem(row, col, QTableWidgetItem(value))
+        self.summary_label.setText(
+            f"工位数: {len(snapshots)}  工作进程: {self.supervisor.worker_count}  重启次数: {self.supervisor.restart_count}")
+
+    def cleanup(self):
+        """停止所有工作进程"""
+        self.refresh_timer.stop()
+        for port_name, stop_func in self._stop_funcs.items():
+            self.alarms.unregister_stop(port_name, stop_func)
+        self._stop_funcs.clear()
+        self.supervisor.stop()